@@ -1,18 +1,30 @@
 """Base CLI for auto_dev."""
 
 import os
-from dataclasses import dataclass
+import ast
+import json
+import hashlib
+import importlib
+from pathlib import Path
+from dataclasses import field, dataclass
+from importlib.metadata import version as distribution_version
 
 import rich_click as click
-import pkg_resources
+from rich.console import Console
 
-from auto_dev.utils import get_logger
-from auto_dev.constants import PLUGIN_FOLDER, DEFAULT_ENCODING
+from auto_dev.log import get_logger
+from auto_dev.constants import PLUGIN_FOLDER, DEFAULT_ENCODING, AUTO_DEV_CACHE_DIR, COMMAND_MANIFEST_FILE
+from auto_dev.profiling import PROFILE_STARTUP_FLAG, DEFAULT_STARTUP_BUDGET_MS, ImportProfiler
 
 
 click.rich_click.USE_RICH_MARKUP = True
 
 
+def command_module(name: str) -> str:
+    """The module of a command, commands with multiple words are named with dashes."""
+    return name.replace("-", "_")
+
+
 @dataclass
 class CLIs:
     """Base CLI class configurable with plugins."""
@@ -24,18 +36,21 @@ class CLIs:
         results = []
         for filename in os.listdir(self.plugin_folder):
             if filename.endswith(".py") and filename != "__init__.py":
-                results.append(filename[:-3])
+                results.append(filename[:-3].replace("_", "-"))
         results.sort()
         return results
 
     def get_command(self, name):
         """Get the command."""
+        if Path(self.plugin_folder).resolve() == Path(PLUGIN_FOLDER).resolve():
+            # importing lets python reuse the cached bytecode of the module, and the startup profile time it.
+            return getattr(importlib.import_module(f"auto_dev.commands.{command_module(name)}"), command_module(name))
         name_space = {}
-        file_name = os.path.join(self.plugin_folder, name + ".py")
+        file_name = os.path.join(self.plugin_folder, command_module(name) + ".py")
         with open(file_name, encoding=DEFAULT_ENCODING) as file:
             code = compile(file.read(), file_name, "exec")
             eval(code, name_space, name_space)  # pylint: disable=eval-used
-        return name_space[name]
+        return name_space[command_module(name)]
 
     def get_all_commands(
         self,
@@ -45,10 +60,130 @@ class CLIs:
             yield name, self.get_command(name)
 
 
+MANIFEST_VERSION = 1
+
+
+def _extract_help(source: bytes, file_name: str, name: str) -> str:
+    """Extract the docstring of the command function without importing the module."""
+    tree = ast.parse(source, filename=file_name)
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef | ast.AsyncFunctionDef) and node.name == name:
+            return ast.get_docstring(node) or ""
+    return ""
+
+
+@dataclass
+class CommandManifest:
+    """Cached index of the plugin commands and their help text.
+
+    Entries are revalidated on the mtime and size of each command file and only re-parsed
+    when the content hash of the file has changed.
+    """
+
+    plugin_folder: str = PLUGIN_FOLDER
+    cache_dir: Path = AUTO_DEV_CACHE_DIR
+    commands: dict[str, dict] = field(default_factory=dict)
+
+    @property
+    def path(self) -> Path:
+        """The path of the manifest, unique per plugin folder."""
+        folder_hash = hashlib.sha256(str(Path(self.plugin_folder).resolve()).encode()).hexdigest()[:12]
+        return Path(self.cache_dir) / f"{folder_hash}_{COMMAND_MANIFEST_FILE}"
+
+    def load(self) -> "CommandManifest":
+        """Load the manifest, regenerating the entries of any changed command files."""
+        cached = self._read()
+        cached_commands = cached.get("commands", {}) if cached.get("version") == MANIFEST_VERSION else {}
+        commands = {}
+        for name in CLIs(plugin_folder=self.plugin_folder).list_commands():
+            file_name = os.path.join(self.plugin_folder, command_module(name) + ".py")
+            stat = Path(file_name).stat()
+            entry = cached_commands.get(name)
+            if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                commands[name] = entry
+                continue
+            with open(file_name, "rb") as file:
+                source = file.read()
+            digest = hashlib.sha256(source).hexdigest()
+            if not entry or entry["sha256"] != digest:
+                entry = {"help": _extract_help(source, file_name, command_module(name)), "sha256": digest}
+            commands[name] = {**entry, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+        self.commands = commands
+        if commands != cached_commands:
+            self._write()
+        return self
+
+    def _read(self) -> dict:
+        """Read the manifest from disk."""
+        try:
+            with open(self.path, encoding=DEFAULT_ENCODING) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self) -> None:
+        """Write the manifest to disk. A read only cache dir only costs us the speedup."""
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "w", encoding=DEFAULT_ENCODING) as file:
+                json.dump({"version": MANIFEST_VERSION, "commands": self.commands}, file)
+            tmp_path.replace(self.path)
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+
+
+class LazyCommandGroup(click.RichGroup):
+    """Click group which lists the plugin commands from the manifest.
+
+    The module of a command is only imported once the command is resolved for execution.
+    """
+
+    def __init__(self, *args, manifest: CommandManifest | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.manifest = manifest or CommandManifest().load()
+        self.plugins = CLIs(plugin_folder=self.manifest.plugin_folder)
+
+    def list_commands(self, ctx: click.Context) -> list[str]:
+        """List the registered and the plugin commands."""
+        return sorted({*super().list_commands(ctx), *self.manifest.commands})
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> click.Command | None:
+        """Get the command, using a placeholder carrying the help text for plugins which are not loaded."""
+        command = super().get_command(ctx, cmd_name)
+        if command is not None or cmd_name not in self.manifest.commands:
+            return command
+        return click.Command(cmd_name, help=self.manifest.commands[cmd_name]["help"])
+
+    def resolve_command(self, ctx: click.Context, args: list[str]):
+        """Load the plugin command before it is resolved for execution."""
+        cmd_name = args[0] if args else None
+        if cmd_name in self.manifest.commands and cmd_name not in self.commands:
+            self.add_command(self.plugins.get_command(cmd_name), name=cmd_name)
+        return super().resolve_command(ctx, args)
+
+
+def report_startup(logger, budget_ms: float, output: str) -> None:
+    """Report the import profile collected since `auto_dev.cli` was imported, the command included.
+
+    :raises click.ClickException: when the startup exceeded the budget, so CI catches startup regressions.
+    """
+    profiler = ImportProfiler.current
+    if profiler is None:
+        logger.warning(f"Startup profiling is only available when running adev with {PROFILE_STARTUP_FLAG}.")
+        return
+    report = profiler.stop(budget_ms=budget_ms)
+    Console(stderr=True).print(report.render())
+    logger.info(f"Startup profile written to {report.write(output)}")
+    if not report.within_budget:
+        msg = f"Startup took {report.total_ms:.1f} ms, exceeding the budget of {budget_ms:.0f} ms."
+        raise click.ClickException(msg)
+
+
 def build_cli(plugins=False):
     """Build the CLI."""
 
-    @click.group()
+    @click.group(cls=LazyCommandGroup if plugins else click.RichGroup)
     @click.option("-v", "--verbose", is_flag=True, default=False)
     @click.option(
         "-l",
@@ -59,19 +194,53 @@ def build_cli(plugins=False):
     )
     @click.option("-n", "--num-processes", default=0, help="Number of processes to use for linting", type=int)
     @click.option("--remote", is_flag=True, help="Use the remote server wherever possible")
+    @click.option(
+        "--persist-index",
+        is_flag=True,
+        envvar="ADEV_PERSIST_INDEX",
+        help="Keep the file index on disk, shared by lint, fmt and test, re-reading only the changed directories",
+    )
+    @click.option(
+        PROFILE_STARTUP_FLAG, is_flag=True, help="Report the import time of adev and the command, fail over budget"
+    )
+    @click.option(
+        "--startup-budget",
+        default=DEFAULT_STARTUP_BUDGET_MS,
+        envvar="ADEV_STARTUP_BUDGET_MS",
+        help="Startup budget in milliseconds to check the profile against",
+        type=float,
+    )
+    @click.option(
+        "--profile-output",
+        default=str(AUTO_DEV_CACHE_DIR / "startup_profile.json"),
+        help="Path to write the startup profile to",
+        type=click.Path(dir_okay=False),
+    )
     @click.pass_context
-    def cli(ctx, log_level=False, verbose=False, num_processes=1, version=False, remote=False) -> None:
+    def cli(
+        ctx,
+        log_level=False,
+        verbose=False,
+        num_processes=1,
+        version=False,
+        remote=False,
+        persist_index=False,
+        profile_startup=False,
+        startup_budget=DEFAULT_STARTUP_BUDGET_MS,
+        profile_output=None,
+    ) -> None:
         """Cli development tooling."""
         ctx.obj = {}
         ctx.obj["VERBOSE"] = verbose
         ctx.obj["LOGGER"] = get_logger(log_level=log_level)
         ctx.obj["REMOTE"] = remote
+        ctx.obj["PERSIST_INDEX"] = persist_index
         if num_processes == 0:
             # we use all available cores
             num_processes = os.cpu_count()
         ctx.obj["NUM_PROCESSES"] = num_processes
         # get the version from the package
-        version = pkg_resources.get_distribution("autonomy-dev").version
+        version = distribution_version("autonomy-dev")
 
         ctx.obj["LOGGER"].debug(f"Starting Auto Dev v{version} ...")
         # we get the version from the package
@@ -81,18 +250,16 @@ def build_cli(plugins=False):
             ctx.obj["LOGGER"].debug(f"Using {num_processes} processes for processing")
         if log_level:
             ctx.obj["LOGGER"].debug(f"Setting log level to {log_level}")
+        if profile_startup:
+            report_startup(ctx.obj["LOGGER"], startup_budget, profile_output)
 
     # we add a version command
     @cli.command()
     def version() -> None:
         """Print the version."""
-        version = pkg_resources.get_distribution("autonomy-dev").version
+        version = distribution_version("autonomy-dev")
         click.echo(version)
 
     cli.add_command(version)
 
-    if plugins:
-        plugins = CLIs().get_all_commands()
-        for name, plugin in plugins:
-            cli.add_command(plugin, name=name)
     return cli
@@ -0,0 +1,209 @@
+"""On-disk caches shared by the adev commands."""
+
+import json
+import time
+import hashlib
+import sqlite3
+from typing import Any
+from pathlib import Path
+from importlib.metadata import PackageNotFoundError, version
+
+from auto_dev.utils import get_logger
+from auto_dev.constants import AUTO_DEV_CACHE_DIR, DEFAULT_RUFF_CONFIG
+
+
+RESULT_CACHE_FILE = AUTO_DEV_CACHE_DIR / "results.sqlite"
+DEFAULT_MAX_ENTRIES = 50_000
+# sqlite limits the number of parameters of a single query.
+QUERY_BATCH_SIZE = 500
+
+logger = get_logger()
+
+
+def hash_file(path: str | Path) -> str:
+    """Sha256 of the content of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def get_tool_version(tool: str) -> str:
+    """The installed version of a python tool, `unknown` when it is not installed."""
+    try:
+        return version(tool)
+    except PackageNotFoundError:
+        return "unknown"
+
+
+class DiskCache:
+    """A size bounded key value store, evicting the least recently used entries.
+
+    Values must be json serialisable and every namespace is bounded separately. The cache is
+    best effort; when the database cannot be used every lookup is a miss.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        path: str | Path = RESULT_CACHE_FILE,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        self.namespace = namespace
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._connection = None
+
+    @property
+    def connection(self) -> sqlite3.Connection | None:
+        """The connection to the database, created on first use."""
+        if self._connection is None:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._connection = sqlite3.connect(self.path, timeout=10)
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS entries ("
+                    "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, last_used REAL NOT NULL, "
+                    "PRIMARY KEY (namespace, key))"
+                )
+                self._connection.execute("CREATE INDEX IF NOT EXISTS lru ON entries (namespace, last_used)")
+            except (OSError, sqlite3.Error) as error:
+                logger.debug(f"Cache {self.path} unavailable: {error}")
+                self._connection = None
+        return self._connection
+
+    def get(self, key: str) -> Any | None:
+        """Get a value, marking it as recently used."""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: list[str]) -> dict[str, Any]:
+        """Get the values of the keys present in the cache, marking them as recently used."""
+        if not keys or self.connection is None:
+            return {}
+        found = {}
+        try:
+            with self.connection:
+                for i in range(0, len(keys), QUERY_BATCH_SIZE):
+                    batch = keys[i : i + QUERY_BATCH_SIZE]
+                    placeholders = ",".join("?" * len(batch))
+                    rows = self.connection.execute(
+                        f"SELECT key, value FROM entries WHERE namespace = ? AND key IN ({placeholders})",  # noqa: S608
+                        [self.namespace, *batch],
+                    ).fetchall()
+                    found.update({key: json.loads(value) for key, value in rows})
+                self.connection.executemany(
+                    "UPDATE entries SET last_used = ? WHERE namespace = ? AND key = ?",
+                    [(time.time(), self.namespace, key) for key in found],
+                )
+        except sqlite3.Error as error:
+            logger.debug(f"Cache lookup failed: {error}")
+            return {}
+        return found
+
+    def set(self, key: str, value: Any) -> None:
+        """Set a value."""
+        self.set_many({key: value})
+
+    def set_many(self, items: dict[str, Any]) -> None:
+        """Set many values at once, evicting the least recently used entries beyond the bound."""
+        if not items or self.connection is None:
+            return
+        now = time.time()
+        try:
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO entries (namespace, key, value, last_used) VALUES (?, ?, ?, ?)",
+                    [(self.namespace, key, json.dumps(value), now) for key, value in items.items()],
+                )
+            self.prune()
+        except sqlite3.Error as error:
+            logger.debug(f"Cache update failed: {error}")
+
+    def delete(self, key: str) -> None:
+        """Delete a value."""
+        if self.connection is None:
+            return
+        with self.connection:
+            self.connection.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+
+    def prune(self) -> None:
+        """Evict the least recently used entries beyond the bound of the namespace."""
+        if self.connection is None:
+            return
+        with self.connection:
+            self.connection.execute(
+                "DELETE FROM entries WHERE namespace = ? AND key NOT IN ("
+                "SELECT key FROM entries WHERE namespace = ? ORDER BY last_used DESC LIMIT ?)",
+                (self.namespace, self.namespace, self.max_entries),
+            )
+
+    def clear(self) -> None:
+        """Remove every entry of the namespace."""
+        if self.connection is None:
+            return
+        with self.connection:
+            self.connection.execute("DELETE FROM entries WHERE namespace = ?", (self.namespace,))
+
+    def __len__(self) -> int:
+        """Number of entries in the namespace."""
+        if self.connection is None:
+            return 0
+        (count,) = self.connection.execute(
+            "SELECT COUNT(*) FROM entries WHERE namespace = ?", (self.namespace,)
+        ).fetchone()
+        return count
+
+    def close(self) -> None:
+        """Close the connection to the database."""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class FileResultCache:
+    """Remember the files known to pass a check.
+
+    Files are keyed by their path and content along with the configuration and the version of the
+    tool doing the check, so changing any of them invalidates the results.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        config_files: tuple[Path, ...] = (DEFAULT_RUFF_CONFIG,),
+        tools: tuple[str, ...] = ("ruff",),
+        enabled: bool = True,
+        cache: DiskCache | None = None,
+    ):
+        self.enabled = enabled
+        self.cache = cache if cache is not None else DiskCache(namespace)
+        salt = hashlib.sha256()
+        for config_file in config_files:
+            salt.update(hash_file(config_file).encode())
+        for tool in (*tools, "autonomy-dev"):
+            salt.update(f"{tool}=={get_tool_version(tool)}".encode())
+        self.salt = salt.hexdigest()
+
+    def key(self, path: str | Path) -> str | None:
+        """The key of the current content of the file, None when it cannot be read."""
+        try:
+            content_hash = hash_file(path)
+        except OSError:
+            return None
+        return hashlib.sha256(f"{self.salt}:{Path(path).resolve()}:{content_hash}".encode()).hexdigest()
+
+    def filter_unknown(self, paths: list[str]) -> list[str]:
+        """The paths which are not known to pass."""
+        if not self.enabled:
+            return list(paths)
+        keys = {path: self.key(path) for path in paths}
+        known = self.cache.get_many([key for key in keys.values() if key is not None])
+        return [path for path, key in keys.items() if key not in known]
+
+    def record(self, results: dict[str, bool]) -> None:
+        """Remember the paths which passed, keyed by their content after the check."""
+        if not self.enabled:
+            return
+        keys = [self.key(path) for path, passed in results.items() if passed]
+        self.cache.set_many({key: True for key in keys if key is not None})
@@ -0,0 +1,157 @@
+"""Detect the files changed in a git repository with a single git call."""
+
+import os
+import subprocess
+from pathlib import Path
+from dataclasses import dataclass
+
+from auto_dev.exceptions import OperationError
+
+
+@dataclass(frozen=True)
+class FileChange:
+    """A changed file, with its path relative to the working directory."""
+
+    path: str
+    staged: bool = False
+    unstaged: bool = False
+    untracked: bool = False
+    deleted: bool = False
+    original_path: str | None = None
+
+    @property
+    def renamed(self) -> bool:
+        """Whether the file was renamed or copied from `original_path`."""
+        return self.original_path is not None
+
+
+def find_repo_root(cwd: str | Path = ".") -> Path:
+    """The root of the git work tree containing the directory."""
+    directory = Path(cwd).resolve()
+    for candidate in (directory, *directory.parents):
+        if (candidate / ".git").exists():
+            return candidate
+    msg = f"{directory} is not inside a git repository."
+    raise OperationError(msg)
+
+
+def _run_git(args: list[str], cwd: str | Path) -> list[str]:
+    """Run git, returning the nul separated fields of its output."""
+    result = subprocess.run(["git", *args], cwd=cwd, capture_output=True, check=False)
+    if result.returncode != 0:
+        msg = f"git {' '.join(args)} failed: {result.stderr.decode(errors='replace').strip()}"
+        raise OperationError(msg)
+    return [field for field in result.stdout.decode().split("\0") if field]
+
+
+def parse_status(fields: list[str]) -> list[tuple[str, str | None, str]]:
+    """Parse the fields of `git status --porcelain=v2 -z` into (path, original path, XY status) entries."""
+    entries = []
+    fields = iter(fields)
+    for field in fields:
+        kind = field[0]
+        if kind == "1":
+            # 1 XY sub mH mI mW hH hI path
+            _, xy, *_, path = field.split(" ", 8)
+            entries.append((path, None, xy))
+        elif kind == "2":
+            # 2 XY sub mH mI mW hH hI score path, followed by the original path
+            _, xy, *_, path = field.split(" ", 9)
+            entries.append((path, next(fields), xy))
+        elif kind == "u":
+            # u XY sub m1 m2 m3 mW h1 h2 h3 path
+            _, xy, *_, path = field.split(" ", 10)
+            entries.append((path, None, xy))
+        elif kind == "?":
+            entries.append((field[2:], None, "??"))
+    return entries
+
+
+def parse_name_status(fields: list[str]) -> list[tuple[str, str | None, str]]:
+    """Parse the fields of `git diff --name-status -z` into (path, original path, status) entries."""
+    entries = []
+    fields = iter(fields)
+    for status in fields:
+        if status[0] in {"R", "C"}:
+            original_path = next(fields)
+            entries.append((next(fields), original_path, status[0]))
+        else:
+            entries.append((next(fields), None, status[0]))
+    return entries
+
+
+def get_changes(base: str | None = None, cwd: str | Path = ".") -> list[FileChange]:
+    """Get the changed files of the repository.
+
+    :param base: Compare the work tree with the merge-base of this ref and HEAD,
+        instead of reporting the staged, unstaged and untracked files of the status.
+    :param cwd: A directory inside the repository, the paths are relative to it.
+    :return: The changed files, including the deleted ones.
+    """
+    root = find_repo_root(cwd)
+    changes = []
+    if base is None:
+        for path, original_path, xy in parse_status(
+            _run_git(["status", "--porcelain=v2", "-z", "--untracked-files=all"], cwd=root)
+        ):
+            untracked = xy == "??"
+            changes.append(
+                (
+                    path,
+                    original_path,
+                    {
+                        "staged": not untracked and xy[0] != ".",
+                        "unstaged": not untracked and xy[1] != ".",
+                        "untracked": untracked,
+                        "deleted": "D" in xy,
+                    },
+                )
+            )
+    else:
+        for path, original_path, status in parse_name_status(
+            _run_git(["diff", "--name-status", "-z", "-M", "--merge-base", base], cwd=root)
+        ):
+            changes.append((path, original_path, {"unstaged": True, "deleted": status == "D"}))
+        for path in _run_git(["ls-files", "--others", "--exclude-standard", "-z"], cwd=root):
+            changes.append((path, None, {"untracked": True}))
+
+    directory = Path(cwd).resolve()
+
+    def relative(path: str) -> str:
+        return os.path.relpath(root / path, directory)
+
+    return [
+        FileChange(
+            path=relative(path),
+            original_path=relative(original_path) if original_path is not None else None,
+            **flags,
+        )
+        for path, original_path, flags in changes
+    ]
+
+
+def index_changes(changes: list[FileChange], packages: list[Path]) -> dict[Path, list[FileChange]]:
+    """Index the changes by the package containing them.
+
+    Renamed files are indexed under the packages of both their current and their original path.
+
+    :param changes: The changed files, relative to the working directory.
+    :param packages: The package directories, relative to the working directory.
+    :return: The changes of every package with changes.
+    """
+    package_paths = {Path(os.path.normpath(package)): Path(package) for package in packages}
+    index = {}
+    for change in changes:
+        owners = []
+        for path in filter(None, (change.path, change.original_path)):
+            path = Path(os.path.normpath(path))
+            if path.parts[0] == os.pardir:
+                # outside of the working directory, so outside of the packages.
+                continue
+            for parent in path.parents:
+                if parent in package_paths and package_paths[parent] not in owners:
+                    owners.append(package_paths[parent])
+                    break
+        for owner in owners:
+            index.setdefault(owner, []).append(change)
+    return index
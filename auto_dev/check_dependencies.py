@@ -35,9 +35,10 @@ from collections.abc import Iterator
 import toml
 import click
 from aea.package_manager.v1 import PackageManagerV1
-from aea.package_manager.base import load_configuration
 from aea.configurations.data_types import Dependency
 
+from auto_dev.package_config import configuration_cache
+
 
 ANY_SPECIFIER = "*"
 
@@ -287,18 +288,22 @@ class PyProjectToml:
 
 
 def load_packages_dependencies(packages_dir: Path) -> list[Dependency]:
-    """Returns a list of package dependencies."""
+    """Returns a list of package dependencies.
+
+    The configurations are loaded in parallel through the configuration cache, then checked for conflicting
+    versions in a single pass.
+    """
     package_manager = PackageManagerV1.from_dir(packages_dir=packages_dir)
+    packages = [
+        package for package in package_manager.iter_dependency_tree() if package.package_type.value != "service"
+    ]
+    configurations = configuration_cache.load_many(
+        (package.package_type, package_manager.package_path_from_package_id(package_id=package)) for package in packages
+    )
     dependencies: dict[str, Dependency] = {}
     issues = []
-    for package in package_manager.iter_dependency_tree():
-        if package.package_type.value == "service":
-            continue
-        _dependencies = load_configuration(  # type: ignore
-            package_type=package.package_type,
-            package_path=package_manager.package_path_from_package_id(package_id=package),
-        ).dependencies
-        for key, value in _dependencies.items():
+    for package, configuration in zip(packages, configurations, strict=True):
+        for key, value in configuration.dependencies.items():
             if key not in dependencies:
                 dependencies[key] = value
             else:
@@ -310,8 +315,8 @@ def load_packages_dependencies(packages_dir: Path) -> list[Dependency]:
                     continue
                 issues.append(f"Actual: {key} {value} vs Expected: {dependencies[key]} in {package!s}")
 
-    for _issue in issues:
-        pass
+    for issue in issues:
+        logging.error(issue)
     if issues:
         sys.exit(1)
     return list(dependencies.values())
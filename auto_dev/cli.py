@@ -1,5 +1,14 @@
 """Simple cli to allow users to perform the following actions against an autonomy repo."""
 
+import sys
+
+from auto_dev.profiling import PROFILE_STARTUP_FLAG, ImportProfiler
+
+
+if PROFILE_STARTUP_FLAG in sys.argv:
+    # the hook has to be in place before the rest of auto_dev is imported.
+    ImportProfiler.install()
+
 from auto_dev.base import build_cli
 
 
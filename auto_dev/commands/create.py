@@ -11,6 +11,7 @@ from auto_dev.utils import change_dir, get_packages, update_author
 from auto_dev.constants import AUTO_DEV_FOLDER, AUTONOMY_PACKAGES_FILE
 from auto_dev.exceptions import OperationError
 from auto_dev.cli_executor import CommandExecutor
+from auto_dev.venv_resolver import tool_command
 from auto_dev.services.package_manager.index import PackageManager
 
 
@@ -110,12 +111,12 @@ def create(ctx, public_id: str, template: str, force: bool, publish: bool, clean
     ipfs_hash = available_agents[template]
 
     create_commands = [
-        f"poetry run autonomy fetch {ipfs_hash} --alias {agent_name}",
+        tool_command("autonomy", "fetch", ipfs_hash, "--alias", agent_name),
     ]
 
     for command in create_commands:
         command = CommandExecutor(
-            command.split(" "),
+            command,
         )
         logger.debug(
             f"Executing command: {command.command}",
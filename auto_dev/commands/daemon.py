@@ -0,0 +1,133 @@
+"""Commands to manage the warm adev daemon."""
+
+import os
+import sys
+import time
+
+import rich_click as click
+
+from auto_dev.base import build_cli
+from auto_dev.daemon import DEFAULT_SOCKET_PATH, AdevDaemon, request_control
+
+
+cli = build_cli(plugins=False)
+
+STARTUP_TIMEOUT = 60
+
+
+@cli.group()
+def daemon() -> None:
+    """Commands for managing the warm adev daemon.
+
+    Available Commands:
+        start: Start the daemon
+        stop: Stop the daemon
+        status: Show whether the daemon is running
+
+    Notes
+    -----
+        - The daemon keeps aea, web3 and jinja imported in a single interpreter
+        - The `adev-client` entry point forwards argv, cwd and env to the daemon
+        - Each invocation runs in a forked child, with the stdio of the client
+        - `adev-client` runs adev locally when no daemon is listening
+        - Restart the daemon after upgrading auto_dev, it serves the code it started with
+
+    """
+
+
+@daemon.command()
+@click.option("--socket", "socket_path", default=str(DEFAULT_SOCKET_PATH), help="Path of the unix socket.")
+@click.option("--foreground", is_flag=True, default=False, help="Serve in the foreground.")
+@click.pass_context
+def start(ctx, socket_path: str, foreground: bool) -> None:
+    """Start the warm adev daemon.
+
+    Optional Parameters:
+        socket_path: Path of the unix socket to listen on. Default: $XDG_RUNTIME_DIR/adev-<uid>.sock
+        foreground: Serve in the foreground instead of detaching. Default: False
+
+    Usage:
+        Start the daemon in the background:
+            adev daemon start
+
+        Use the daemon from a pre-commit hook:
+            adev-client lint -p path/to/file.py
+
+        Serve in the foreground:
+            adev daemon start --foreground
+    """
+    logger = ctx.obj["LOGGER"]
+    status = request_control("status", socket_path)
+    if status is not None:
+        logger.info(f"Daemon already running with pid {status['pid']}.")
+        return
+    adev_daemon = AdevDaemon(socket_path)
+    if foreground:
+        logger.info(f"Serving on {socket_path}")
+        adev_daemon.serve_forever()
+        return
+    if os.fork() == 0:
+        _detach()
+        adev_daemon.serve_forever()
+        os._exit(0)
+
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while (status := request_control("status", socket_path)) is None:
+        if time.monotonic() > deadline:
+            msg = f"Daemon did not start listening on {socket_path} within {STARTUP_TIMEOUT}s."
+            raise click.ClickException(msg)
+        time.sleep(0.1)
+    logger.info(f"Daemon started with pid {status['pid']} on {socket_path}")
+
+
+def _detach() -> None:
+    """Detach the daemon from the terminal it was started from."""
+    os.setsid()
+    if os.fork() != 0:
+        os._exit(0)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    os.close(devnull)
+
+
+@daemon.command()
+@click.option("--socket", "socket_path", default=str(DEFAULT_SOCKET_PATH), help="Path of the unix socket.")
+@click.pass_context
+def stop(ctx, socket_path: str) -> None:
+    """Stop the warm adev daemon.
+
+    Optional Parameters:
+        socket_path: Path of the unix socket the daemon listens on.
+
+    Usage:
+        adev daemon stop
+    """
+    logger = ctx.obj["LOGGER"]
+    response = request_control("stop", socket_path)
+    if response is None:
+        logger.info("Daemon is not running.")
+        return
+    logger.info(f"Stopped daemon with pid {response['pid']}.")
+
+
+@daemon.command()
+@click.option("--socket", "socket_path", default=str(DEFAULT_SOCKET_PATH), help="Path of the unix socket.")
+@click.pass_context
+def status(ctx, socket_path: str) -> None:
+    """Show whether the warm adev daemon is running.
+
+    Optional Parameters:
+        socket_path: Path of the unix socket the daemon listens on.
+
+    Usage:
+        adev daemon status
+    """
+    logger = ctx.obj["LOGGER"]
+    response = request_control("status", socket_path)
+    if response is None:
+        msg = "Daemon is not running."
+        raise click.ClickException(msg)
+    logger.info(f"Daemon running with pid {response['pid']} on {response['socket']}")
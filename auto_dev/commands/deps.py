@@ -29,36 +29,80 @@ We want to be able to update the hash of the package.
 
 import os
 import sys
-import shutil
 import logging
 import traceback
 from copy import deepcopy
 from enum import Enum
 from pathlib import Path
+from functools import cache
 from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
 
-import toml
-import yaml
-import requests
 import rich_click as click
-from rich import print_json
 from rich.progress import track
 
 from auto_dev.base import build_cli
 from auto_dev.utils import FileType, FileLoader, write_to_file
 from auto_dev.constants import DEFAULT_TIMEOUT, DEFAULT_ENCODING
+from auto_dev.reconcile import PYPROJECT, PACKAGES_JSON, Manifests, Reconciler
 from auto_dev.exceptions import AuthenticationError, NetworkTimeoutError
+from auto_dev.http_cache import DEFAULT_TTL, HttpCache
+from auto_dev.package_sync import sync_packages
+from auto_dev.package_config import load_yaml_documents
+from auto_dev.dependency_graph import DependencyIndex, find_cycles, reverse_graph, find_dependents, topological_order
 
 
 PARENT = Path("repo_1")
 CHILD = Path("repo_2")
+# the lookups of the dependencies are independent, so are all issued at once.
+MAX_CONCURRENT_REQUESTS = 8
+
+# the responses of github are kept on disk and revalidated, saving its rate limit.
+http_cache = HttpCache()
+
+
+def github_headers() -> dict[str, str]:
+    """The headers of the requests to the github api."""
+    return {
+        "Accept": "application/vnd.github+json",
+        "X-GitHub-Api-Version": "2022-11-28",
+        "Authorization": f"Bearer {os.getenv('GITHUB_TOKEN')}",
+    }
+
+
+@cache
+def fetch_latest_release(url: str) -> str:
+    """The tag of the latest release of a repository, looked up once per run."""
+    res = http_cache.get(f"{url}/releases", headers=github_headers(), timeout=DEFAULT_TIMEOUT)
+    if res.status_code != 200:
+        if res.status_code == 403:
+            msg = "Error: Rate limit exceeded. Please add a github token."
+            raise AuthenticationError(msg)
+        msg = f"Error: {res.status_code} {res.text}"
+        raise NetworkTimeoutError(msg)
+    data = res.json()
+    return data[0]["tag_name"]
+
+
+@cache
+def fetch_autonomy_packages(url: str, tag: str) -> dict[str, str]:
+    """The dev packages of the packages.json of a repository at a tag, looked up once per run."""
+    file_path = "packages/packages.json"
+    remote_url = f"{url}/contents/{file_path}?ref={tag}"
+    data = http_cache.get(remote_url, headers=github_headers(), timeout=DEFAULT_TIMEOUT)
+
+    if data.status_code != 200:
+        msg = f"Error: {data.status_code} {data.text}"
+        raise NetworkTimeoutError(msg)
+    dl_url = data.json()["download_url"]
+    data = http_cache.get(dl_url, headers=github_headers(), timeout=DEFAULT_TIMEOUT).json()
+    return data["dev"]
 
 
 def get_package_json(repo: Path) -> dict[str, dict[str, str]]:
     """We get the package json."""
     package_json = repo / "packages" / "packages.json"
-    with open(package_json, encoding=DEFAULT_ENCODING) as file_pointer:
-        return yaml.safe_load(file_pointer)
+    return load_yaml_documents(package_json)[0]
 
 
 def write_package_json(repo: Path, package_dict: dict[str, dict[str, str]]) -> None:
@@ -115,21 +159,14 @@ def from_key_to_path(key: str) -> Path:
     return Path(*path_list)
 
 
-def remove_old_package(repo: Path, proposed_dependency_updates: dict[str, str]) -> None:
-    """We remove the old package directories."""
-    for package_name in proposed_dependency_updates:
-        path = from_key_to_path(package_name)
-        path = repo / path
-        if path.exists():
-            shutil.rmtree(path, ignore_errors=True)
-
-
 def main(
     parent_repo: Path,
     child_repo: Path,
     logger: logging.Logger,
     auto_confirm: bool = False,
     manual: bool = False,
+    dry_run: bool = False,
+    hardlink: bool = False,
 ) -> None:
     """We run the main function."""
     try:
@@ -149,19 +186,21 @@ def main(
             if not incude:
                 proposed.pop(package_name)
 
+    pairs = [(parent_repo / from_key_to_path(name), child_repo / from_key_to_path(name)) for name in proposed]
+    if dry_run:
+        logger.info("Dry run, the packages would be synced as follows... 📝")
+        for plan in sync_packages(pairs, dry_run=True):
+            logger.info(f"{plan.target}: {plan.summary}")
+        return True
+
     if not auto_confirm:
         click.confirm("Do you want to update the package?", abort=True)
     logger.info("Updating the packages json... 📝")
     update_package_json(repo=child_repo, proposed_dependency_updates=proposed)
-    logger.info("Removing the old packages directories... 🗑")
-    remove_old_package(repo=child_repo, proposed_dependency_updates=proposed)
-    # we now copy the new packages over.
-    logger.info("Copying the new packages over... 📝")
-    for package_name in proposed:
-        path = from_key_to_path(package_name)
-        parent_path = parent_repo / path
-        child_path = child_repo / path
-        shutil.copytree(parent_path, child_path)
+    # only the files which differ are copied over, and the stale ones removed.
+    logger.info("Syncing the new packages over... 📝")
+    for plan in sync_packages(pairs, hardlink=hardlink):
+        logger.debug(f"{plan.target}: {plan.summary}")
     logger.info("Done. 😎")
     return True
 
@@ -220,11 +259,7 @@ class GitDependency(Dependency):
     @property
     def headers(self) -> dict[str, str]:
         """Get the headers."""
-        return {
-            "Accept": "application/vnd.github+json",
-            "X-GitHub-Api-Version": "2022-11-28",
-            "Authorization": f"Bearer {os.getenv('GITHUB_TOKEN')}",
-        }
+        return github_headers()
 
     def get_latest_version(self) -> str:
         """Get the latest version."""
@@ -234,30 +269,24 @@ class GitDependency(Dependency):
 
     def _get_latest_remote_version(self) -> str:
         """Get the latest remote version."""
-        tag_url = f"{self.url}/releases"
-        res = requests.get(tag_url, headers=self.headers, timeout=DEFAULT_TIMEOUT)
-        if res.status_code != 200:
-            if res.status_code == 403:
-                msg = "Error: Rate limit exceeded. Please add a github token."
-                raise AuthenticationError(msg)
-            msg = f"Error: {res.status_code} {res.text}"
-            raise NetworkTimeoutError(msg)
-        data = res.json()
-        return data[0]["tag_name"]
+        return fetch_latest_release(self.url)
 
     def get_all_autonomy_packages(self):
         """Read in the autonomy packages. the are located in the remote url."""
-        tag = self.get_latest_version()
-        file_path = "packages/packages.json"
-        remote_url = f"{self.url}/contents/{file_path}?ref={tag}"
-        data = requests.get(remote_url, headers=self.headers, timeout=DEFAULT_TIMEOUT)
+        return fetch_autonomy_packages(self.url, self.get_latest_version())
+
 
-        if data.status_code != 200:
-            msg = f"Error: {data.status_code} {data.text}"
-            raise NetworkTimeoutError(msg)
-        dl_url = data.json()["download_url"]
-        data = requests.get(dl_url, headers=self.headers, timeout=DEFAULT_TIMEOUT).json()
-        return data["dev"]
+def prefetch_dependencies(autonomy_dependencies: list[GitDependency], poetry_dependencies: list[GitDependency]) -> None:
+    """Issue the github lookups of all of the dependencies concurrently.
+
+    The results are memoized, so the verification which follows reads them without waiting on the network,
+    and verifying takes a round trip per step rather than per dependency.
+    """
+    with ThreadPoolExecutor(MAX_CONCURRENT_REQUESTS) as executor:
+        # the latest releases first, once per repository, as the packages are read at those tags.
+        repositories = {dependency.url: dependency for dependency in [*autonomy_dependencies, *poetry_dependencies]}
+        list(executor.map(GitDependency.get_latest_version, repositories.values()))
+        list(executor.map(GitDependency.get_all_autonomy_packages, autonomy_dependencies))
 
 
 @cli.group()
@@ -271,6 +300,7 @@ def deps(
         update: Update packages.json from parent repo and packages in child repo.
         generate_gitignore: Generate .gitignore entries from packages.json.
         verify: Verify dependencies against version set and update if needed.
+        graph: Query the dependency graph of the packages.
     """
 
 
@@ -307,6 +337,18 @@ def deps(
     help="Auto approve the changes.",
     is_flag=True,
 )
+@click.option(
+    "--dry-run",
+    default=False,
+    help="Report the files and bytes the update would touch, without changing anything.",
+    is_flag=True,
+)
+@click.option(
+    "--hardlink",
+    default=False,
+    help="Hardlink the package files of the child repo to those of the parent repo instead of copying them.",
+    is_flag=True,
+)
 @deps.command()
 @click.pass_context
 def update(
@@ -316,6 +358,8 @@ def update(
     location: DependencyLocation = DependencyLocation.LOCAL,
     auto_confirm: bool = False,
     manual: bool = False,
+    dry_run: bool = False,
+    hardlink: bool = False,
 ) -> None:
     """Update dependencies from parent repo to child repo.
 
@@ -327,6 +371,12 @@ def update(
         location: Location of dependencies (local or remote). Default: local
         auto_confirm: Skip confirmation prompts. Default: False
         manual: Enable manual mode for updates. Default: False
+        dry_run: Only report the files and bytes to copy and remove. Default: False
+        hardlink: Hardlink the files instead of copying them. Default: False
+            - Edits to a hardlinked file in place show in both repos
+
+    Only the files which differ from the parent repo are copied, reflinked where the file system allows,
+    and files missing from the parent repo are removed. The packages are synced in parallel.
 
     Usage:
         Update with defaults:
@@ -337,6 +387,9 @@ def update(
 
         Manual mode:
             adev deps update -p /path/to/parent -c /path/to/child --manual
+
+        Report the changes without making them:
+            adev deps update -p /path/to/parent -c /path/to/child --dry-run
     """
     logger = ctx.obj["LOGGER"]
     logger.info("Updating the dependencies... 📝")
@@ -349,7 +402,13 @@ def update(
     logger.info("Updating the dependencies... 📝")
 
     result = main(
-        parent_repo=parent_repo, child_repo=child_repo, auto_confirm=auto_confirm, logger=logger, manual=manual
+        parent_repo=parent_repo,
+        child_repo=child_repo,
+        auto_confirm=auto_confirm,
+        logger=logger,
+        manual=manual,
+        dry_run=dry_run,
+        hardlink=hardlink,
     )
     if not result:
         sys.exit(1)
@@ -390,6 +449,103 @@ def generate_gitignore(
     ctx.obj["LOGGER"].info("Done. 😎")
 
 
+@deps.command()
+@click.option(
+    "--packages-dir",
+    default=Path("packages"),
+    help="The packages directory.",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+)
+@click.option(
+    "--order",
+    default=False,
+    help="List the packages, each after all of its dependencies.",
+    is_flag=True,
+)
+@click.option(
+    "--cycles",
+    default=False,
+    help="List the packages depending on each other, failing when there are any.",
+    is_flag=True,
+)
+@click.option(
+    "--dependents",
+    "dependents_of",
+    default=None,
+    help="List the packages depending on this package, as a path or <type>/<author>/<name>.",
+)
+@click.option(
+    "--direct",
+    default=False,
+    help="Only list the packages depending on the package directly.",
+    is_flag=True,
+)
+@click.pass_context
+def graph(
+    ctx: click.Context,
+    packages_dir: Path,
+    order: bool = False,
+    cycles: bool = False,
+    dependents_of: str | None = None,
+    direct: bool = False,
+) -> None:
+    """Query the dependency graph of the packages.
+
+    Optional Parameters:
+        packages_dir: The packages directory. Default: packages
+        order: List the packages in dependency order. Default: False
+        cycles: List the cycles of the graph, exiting with an error when there are any. Default: False
+        dependents_of: List the packages depending on this package. Default: None
+            - Given as a path or as <type>/<author>/<name>
+        direct: Only list the direct dependents. Default: False
+
+    Usage:
+        Summarise the graph:
+            adev deps graph
+
+        List the packages in the order to build them:
+            adev deps graph --order
+
+        List what depends on a protocol:
+            adev deps graph --dependents protocol/valory/abci
+
+    Notes
+    -----
+        - The graph is read from the aea-config.yaml, skill.yaml, contract.yaml, service.yaml
+          and component.yaml files of the packages
+        - The graph is kept on disk, only the configurations changed since the last query are read
+
+    """
+    logger = ctx.obj["LOGGER"]
+    index = DependencyIndex(packages_dir).refresh()
+    dependency_graph = index.graph
+    found_cycles = find_cycles(dependency_graph)
+    if order:
+        for package in topological_order(dependency_graph):
+            click.echo(package)
+    if dependents_of is not None:
+        package = index.resolve(dependents_of)
+        if package is None:
+            msg = f"Package {dependents_of} not found in {packages_dir}"
+            raise click.ClickException(msg)
+        dependents = (
+            reverse_graph(dependency_graph)[package] if direct else find_dependents(dependency_graph, [package])
+        )
+        for dependent in sorted(dependents - {package}):
+            click.echo(dependent)
+    if cycles:
+        for cycle in found_cycles:
+            click.echo(", ".join(str(package) for package in cycle))
+        if found_cycles:
+            sys.exit(1)
+    if not (order or cycles or dependents_of):
+        logger.info(
+            f"{len(dependency_graph)} packages, "
+            f"{sum(len(dependencies) for dependencies in dependency_graph.values())} dependencies, "
+            f"{len(found_cycles)} cycles"
+        )
+
+
 @dataclass
 class AutonomyDependencies:
     """A set of autonomy versions."""
@@ -539,8 +695,7 @@ class VersionSetLoader:
 
     def load_config(self):
         """Load the config file."""
-        with open(self.config_file, encoding="utf-8") as file_pointer:
-            data = yaml.safe_load(file_pointer)
+        data = load_yaml_documents(self.config_file)[0]
         self.autonomy_dependencies = AutonomyDependencies(
             upstream_dependency=[
                 GitDependency(
@@ -583,29 +738,24 @@ def handle_output(issues, changes) -> None:
         sys.exit(1)
 
 
-def get_update_command(poetry_dependencies: Dependency) -> str:
-    """Get the update command."""
-    issues = []
-    cmd = "poetry add "
-    for dependency in track(poetry_dependencies):
+def require_version_set(reconciler: Reconciler, version_set_loader: "VersionSetLoader", has_packages: bool) -> None:
+    """Require the manifests to pin the latest releases of the version set."""
+    if has_packages:
+        click.echo("Verifying autonomy dependencies... 📝")
+        for dependency in track(version_set_loader.autonomy_dependencies.upstream_dependency):
+            click.echo(f"   Verifying:   {dependency.name}")
+            for package_name, package_hash in dependency.get_all_autonomy_packages().items():
+                reconciler.require_package_hash(package_name, package_hash)
+
+    click.echo("Verifying poetry dependencies... 📝")
+    for dependency in track(version_set_loader.poetry_dependencies.poetry_dependencies):
         click.echo(f"   Verifying:   {dependency.name}")
-        raw = toml.load("pyproject.toml")["tool"]["poetry"]["dependencies"]
-
-        current_version = str(raw[dependency.name])
-        expected_version = f"=={dependency.get_latest_version()[1:]}"
-        if current_version.find(expected_version) == -1:
-            issues.append(
-                f"Update the poetry version of {dependency.name} from `{current_version}` to `{expected_version}`\n"
-            )
-            if dependency.extras is not None:
-                extras = ",".join(dependency.extras)
-                cmd += f"{dependency.name}[{extras}]@{expected_version} "
-            else:
-                cmd += f"{dependency.name}@{expected_version} "
-            if dependency.plugins:
-                for plugin in dependency.plugins:
-                    cmd += f"{plugin}@{expected_version} "
-    return cmd, issues
+        reconciler.require_poetry(
+            dependency.name,
+            f"=={dependency.get_latest_version()[1:]}",
+            extras=dependency.extras,
+            plugins=dependency.plugins,
+        )
 
 
 @deps.command()
@@ -615,10 +765,24 @@ def get_update_command(poetry_dependencies: Dependency) -> str:
     help="Auto approve the changes.",
     is_flag=True,
 )
+@click.option(
+    "--offline",
+    default=False,
+    help="Only use the github responses cached by previous runs.",
+    is_flag=True,
+)
+@click.option(
+    "--cache-ttl",
+    default=DEFAULT_TTL,
+    help="Seconds to use cached github responses for without revalidating them, by default always revalidated.",
+    type=click.IntRange(min=0),
+)
 @click.pass_context
 def verify(
     ctx: click.Context,
     auto_approve: bool = False,
+    offline: bool = False,
+    cache_ttl: int = DEFAULT_TTL,
 ) -> None:
     """Verify and optionally update package dependencies.
 
@@ -627,6 +791,12 @@ def verify(
             - Automatically applies all updates
             - No interactive prompts
             - Use with caution in production
+        offline: Only use github responses cached by previous runs. Default: False
+            - Fails for any lookup never made before
+        cache_ttl: Seconds before cached github responses are revalidated. Default: 0
+            - By default every response is revalidated, so new releases are never missed
+            - Revalidation uses ETag and Last-Modified
+            - Unchanged responses do not count against the rate limit
 
     Usage:
         Verify with prompts:
@@ -635,10 +805,13 @@ def verify(
         Auto-approve updates:
             adev deps verify --auto-approve
 
+        Verify against the cached github responses:
+            adev deps verify --offline
+
     Notes
     -----
         - Authentication:
-            - Requires GITHUB_TOKEN environment variable
+            - Requires GITHUB_TOKEN environment variable, unless offline
             - Token needs repo and packages read access
             - Can be generated at github.com/settings/tokens
 
@@ -649,13 +822,15 @@ def verify(
             - Validates dependency compatibility
 
         - Update Process:
+            - Reads pyproject.toml, Pipfile and packages.json once
+            - Shows every change as one diff, confirmed at once
             - Updates packages.json for autonomy packages
-            - Updates pyproject.toml for poetry dependencies
+            - Updates pyproject.toml for poetry dependencies, with a single poetry add
             - Handles dependency resolution
             - Maintains version consistency
 
         - Features:
-            - Parallel version checking
+            - Parallel version checking, every release looked up once
             - Detailed diff viewing
             - Selective update approval
             - Dependency tree analysis
@@ -668,51 +843,49 @@ def verify(
             - Version pinning enforcement
     """
 
-    if not os.getenv("GITHUB_TOKEN"):
+    http_cache.offline = offline
+    http_cache.ttl = cache_ttl
+    if not os.getenv("GITHUB_TOKEN") and not offline:
         ctx.obj["LOGGER"].error("Error: GITHUB_TOKEN environment variable is not set.")
         ctx.obj["LOGGER"].error("Please set it with: export GITHUB_TOKEN=<your_token>")
         ctx.obj["LOGGER"].error("You can generate a token at: https://github.com/settings/tokens")
         sys.exit(1)
 
     ctx.obj["LOGGER"].info("Verifying the dependencies against the version set specified. 📝")
-    issues = []
-    changes = []
-    click.echo("Verifying autonomy dependencies... 📝")
 
     version_set_loader = VersionSetLoader()
     version_set_loader.load_config()
-    if (Path("packages") / "packages.json").exists():
-        version_set_loader.load_config()
-        for dependency in track(version_set_loader.autonomy_dependencies.upstream_dependency):
-            click.echo(f"   Verifying:   {dependency.name}")
-            remote_packages = dependency.get_all_autonomy_packages()
-            local_packages = get_package_json(Path())["third_party"]
-            diffs = {}
-            for package_name, package_hash in remote_packages.items():
-                if package_name in local_packages and package_hash != local_packages[package_name]:
-                    diffs[package_name] = package_hash
-
-            if diffs:
-                print_json(data=diffs)
-                if not auto_approve:
-                    click.confirm("Do you want to update all the packages?\n", abort=True)
-                update_package_json(repo=Path(), proposed_dependency_updates=diffs)
-                remove_old_package(repo=Path(), proposed_dependency_updates=diffs)
-                changes.append(dependency.name)
-
-    click.echo("Verifying poetry dependencies... 📝")
-    cmd, poetry_issues = get_update_command(version_set_loader.poetry_dependencies.poetry_dependencies)
-    issues.extend(poetry_issues)
+    reconciler = Reconciler(Manifests())
+    has_packages = reconciler.manifests.packages_json is not None
+    prefetch_dependencies(
+        version_set_loader.autonomy_dependencies.upstream_dependency if has_packages else [],
+        version_set_loader.poetry_dependencies.poetry_dependencies,
+    )
+    require_version_set(reconciler, version_set_loader, has_packages)
 
-    if issues:
-        click.echo("Please run the following command to update the poetry dependencies.")
-        click.echo(f"{cmd}\n")
+    changes = reconciler.changes()
+    issues = [
+        f"Update the poetry version of {change.name} from `{change.current}` to `{change.expected}`\n"
+        for change in changes
+        if change.manifest == PYPROJECT
+    ]
+    if changes:
+        updated = reconciler.updated_manifests(changes)
+        click.echo(reconciler.diff(updated))
+        cmd = reconciler.poetry_add_command(changes)
+        if cmd:
+            click.echo(f"The poetry dependencies are updated with:\n\n    {cmd}\n")
         if not auto_approve:
-            click.confirm("Do you want to update the poetry dependencies now?", abort=True)
-        os.system(cmd)  # noqa
-        changes.append("poetry dependencies")
-
-    handle_output(issues, changes)
+            click.confirm("Do you want to apply these changes?", abort=True)
+        reconciler.write(updated, skip=(PYPROJECT,) if cmd else ())
+        # the upstream packages are not available locally, `autonomy packages sync` fetches them at the new hashes.
+        outdated = [(None, from_key_to_path(change.name)) for change in changes if change.manifest == PACKAGES_JSON]
+        for plan in sync_packages(outdated):
+            ctx.obj["LOGGER"].debug(f"Removed {plan.target}: {plan.summary}")
+        if cmd:
+            os.system(cmd)  # noqa
+
+    handle_output(issues, [str(change) for change in changes])
 
 
 if __name__ == "__main__":
@@ -1,10 +1,17 @@
 """This module contains the logic for the fmt command."""
 
+from pathlib import Path
+from functools import partial
+from contextlib import nullcontext
+from multiprocessing import Pool
+
 import rich_click as click
 
 from auto_dev.fmt import multi_thread_fmt, single_thread_fmt
 from auto_dev.base import build_cli
-from auto_dev.utils import get_paths
+from auto_dev.cache import FileResultCache
+from auto_dev.utils import get_paths, get_packages, is_lintable_file
+from auto_dev.watch import watch as watch_paths, report_results
 
 
 cli = build_cli()
@@ -25,8 +32,33 @@ cli = build_cli()
     is_flag=True,
     default=False,
 )
+@click.option(
+    "--base",
+    help="With --changed-only, format the files changed since the merge-base with this git ref.",
+    default=None,
+)
+@click.option(
+    "--no-cache",
+    help="Format every file, ignoring the files already known to be formatted.",
+    is_flag=True,
+    default=False,
+)
+@click.option(
+    "-w",
+    "--watch",
+    help="Keep watching the files, re-formatting the ones which change.",
+    is_flag=True,
+    default=False,
+)
+@click.option("--fail-fast", help="Stop at the first file failing to format.", is_flag=True, default=False)
+@click.option(
+    "--max-failures",
+    help="Stop once this many files failed to format.",
+    type=click.IntRange(min=1),
+    default=None,
+)
 @click.pass_context
-def fmt(ctx, path, changed_only) -> None:
+def fmt(ctx, path, changed_only, base, no_cache, watch, fail_fast, max_failures) -> None:
     """Format code using the configured formatters.
 
     Optional Parameters:
@@ -37,7 +69,19 @@ def fmt(ctx, path, changed_only) -> None:
         changed_only: Only format files that have changed. Default: False
             - Uses git to detect changes
             - Only formats files with uncommitted changes
-            - Ignores untracked files
+            - Includes staged, unstaged and untracked files, but not deleted ones
+        base: Git ref to compare against with changed_only. Default: None
+            - Uses the files changed since the merge-base of the ref and HEAD
+            - e.g. origin/main in CI
+        no_cache: Format every file, ignoring the result cache. Default: False
+            - Files are cached on their content, the ruff config and the tool versions
+        watch: Keep watching and re-format the files which change. Default: False
+            - Uses inotify on linux, polling elsewhere
+            - Bursts of changes are debounced into a single run
+        fail_fast: Stop at the first file failing to format. Default: False
+            - Same as --max-failures 1
+        max_failures: Stop once this many files failed. Default: None
+            - The files not formatted yet are skipped and reported
 
     Usage:
         Format all packages:
@@ -52,6 +96,18 @@ def fmt(ctx, path, changed_only) -> None:
         Format specific path and only changed files:
             adev fmt -p ./my_package --changed-only
 
+        Format the files changed since branching from main:
+            adev fmt --changed-only --base origin/main
+
+        Format every file, ignoring the cache:
+            adev fmt --no-cache
+
+        Re-format files as they are saved:
+            adev -n 4 fmt --watch
+
+        Stop at the first failure in CI:
+            adev -n 8 fmt --fail-fast
+
     Notes
     -----
         - Uses multiple formatters:
@@ -59,6 +115,7 @@ def fmt(ctx, path, changed_only) -> None:
             - isort: Import sorting
             - docformatter: Docstring formatting
         - Supports parallel processing for faster formatting
+        - `adev --remote fmt` formats against a server started with `adev fmt-server`
         - Shows formatting statistics on completion
         - Exits with error if any formatting fails
         - Can be integrated into pre-commit hooks
@@ -70,15 +127,53 @@ def fmt(ctx, path, changed_only) -> None:
     remote = ctx.obj["REMOTE"]
     logger.info("Formatting Open Autonomy Packages...")
     logger.info(f"Remote: {remote}")
-    paths = get_paths(path, changed_only)
-    logger.info(f"Formatting {len(paths)} files...")
-    if num_processes > 1:
-        results = multi_thread_fmt(paths, verbose, num_processes, remote=remote)
-    else:
-        results = single_thread_fmt(paths, verbose, logger, remote=remote)
+    paths = get_paths(path, changed_only, base=base, persist_index=ctx.obj["PERSIST_INDEX"])
+    cache = FileResultCache("fmt", enabled=not no_cache)
+    run = partial(
+        fmt_paths,
+        cache=cache,
+        verbose=verbose,
+        logger=logger,
+        num_processes=num_processes,
+        remote=remote,
+        max_failures=1 if fail_fast else max_failures,
+    )
+    # the pool is kept across the runs of the watch mode.
+    with Pool(num_processes) if num_processes > 1 else nullcontext() as pool:
+        results = run(paths, pool=pool)
+        if watch:
+            report_results(results)
+            watch_paths(
+                [Path(path)] if path else get_packages(),
+                lambda changed: report_results(run(changed, pool=pool)),
+                is_lintable_file,
+            )
+            return
     passed = sum(results.values())
     failed = len(results) - passed
     logger.info(f"Formatting completed with {passed} passed and {failed} failed")
     if failed > 0:
         msg = "Formatting failed!"
         raise click.ClickException(msg)
+
+
+def fmt_paths(paths, cache, verbose, logger, num_processes, remote, pool=None, max_failures=None):
+    """Format the paths not known to be formatted, on the pool when given.
+
+    The paths left unformatted once `max_failures` is reached are missing from the results.
+    """
+    unknown_paths = cache.filter_unknown(paths)
+    logger.info(f"Formatting {len(unknown_paths)} files, {len(paths) - len(unknown_paths)} known to be formatted...")
+    if num_processes > 1:
+        results = multi_thread_fmt(
+            unknown_paths, verbose, num_processes, remote=remote, pool=pool, max_failures=max_failures
+        )
+    else:
+        results = single_thread_fmt(unknown_paths, verbose, logger, remote=remote, max_failures=max_failures)
+    cache.record(results)
+    if len(results) < len(unknown_paths):
+        logger.warning(
+            f"Stopped after {max_failures} failures, {len(unknown_paths) - len(results)} files not formatted"
+        )
+    known_paths = set(paths) - set(unknown_paths)
+    return {**{path: True for path in paths if path in known_paths}, **results}
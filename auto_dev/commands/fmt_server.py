@@ -0,0 +1,51 @@
+"""This module contains the logic for the fmt-server command."""
+
+import rich_click as click
+
+from auto_dev.fmt import DEFAULT_FORMAT_SERVER_PORT
+from auto_dev.base import build_cli
+from auto_dev.fmt_server import DEFAULT_HOST, FormatServer
+
+
+cli = build_cli()
+
+
+@cli.command()
+@click.option("--host", default=DEFAULT_HOST, help="Host to listen on.")
+@click.option("--port", default=DEFAULT_FORMAT_SERVER_PORT, help="Port to listen on.", type=int)
+@click.pass_context
+def fmt_server(ctx, host: str, port: int) -> None:
+    """Serve the formatter for `adev --remote fmt`.
+
+    Optional Parameters:
+        host: Host to listen on. Default: localhost
+            - Use 0.0.0.0 to share the server across a team
+        port: Port to listen on. Default: 26659
+
+    Usage:
+        Start the format server:
+            adev fmt-server
+
+        Format against the server:
+            adev --remote fmt
+
+        Format against a shared server:
+            ADEV_FORMAT_SERVER_URL=http://formatter:26659 adev --remote fmt
+
+    Notes
+    -----
+        - `POST /format/batch` formats the json object `{"files": {name: content}}`
+        - `POST /format` formats the single file in the body
+        - Each batch is sorted and formatted with a single ruff process per step
+        - Clients fall back to formatting locally the files the server failed to format
+
+    """
+    logger = ctx.obj["LOGGER"]
+    server = FormatServer(host, port, verbose=ctx.obj["VERBOSE"])
+    logger.info(f"Serving the formatter on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Stopping the format server.")
+    finally:
+        server.server_close()
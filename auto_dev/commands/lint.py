@@ -5,15 +5,18 @@
 - build
 """
 
+from pathlib import Path
 from functools import partial
-from multiprocessing import Pool
+from contextlib import nullcontext
+from multiprocessing.pool import ThreadPool
 
 import rich_click as click
-from rich.progress import track
 
 from auto_dev.base import build_cli
-from auto_dev.lint import check_path
-from auto_dev.utils import get_paths
+from auto_dev.lint import CHUNKS_PER_PROCESS, check_paths, chunk_paths, collect_results
+from auto_dev.cache import FileResultCache
+from auto_dev.utils import get_paths, get_packages, is_lintable_file
+from auto_dev.watch import watch as watch_paths, report_results
 
 
 cli = build_cli()
@@ -34,8 +37,33 @@ cli = build_cli()
     is_flag=True,
     default=False,
 )
+@click.option(
+    "--base",
+    help="With --changed-only, lint the files changed since the merge-base with this git ref.",
+    default=None,
+)
+@click.option(
+    "--no-cache",
+    help="Lint every file, ignoring the files already known to be clean.",
+    is_flag=True,
+    default=False,
+)
+@click.option(
+    "-w",
+    "--watch",
+    help="Keep watching the files, re-linting the ones which change.",
+    is_flag=True,
+    default=False,
+)
+@click.option("--fail-fast", help="Stop at the first file failing the checks.", is_flag=True, default=False)
+@click.option(
+    "--max-failures",
+    help="Stop once this many files failed the checks.",
+    type=click.IntRange(min=1),
+    default=None,
+)
 @click.pass_context
-def lint(ctx, path, changed_only) -> None:
+def lint(ctx, path, changed_only, base, no_cache, watch, fail_fast, max_failures) -> None:
     """Run linting checks on code.
 
     Optional Parameters:
@@ -46,7 +74,20 @@ def lint(ctx, path, changed_only) -> None:
         changed_only: Only lint files that have changed. Default: False
             - Uses git to detect changes
             - Only lints files with uncommitted changes
-            - Ignores untracked files
+            - Includes staged, unstaged and untracked files, but not deleted ones
+        base: Git ref to compare against with changed_only. Default: None
+            - Uses the files changed since the merge-base of the ref and HEAD
+            - e.g. origin/main in CI
+        no_cache: Lint every file, ignoring the result cache. Default: False
+            - Files are cached on their content, the ruff config and the tool versions
+            - Only files known to be clean are skipped
+        watch: Keep watching and re-lint the files which change. Default: False
+            - Uses inotify on linux, polling elsewhere
+            - Bursts of changes are debounced into a single run
+        fail_fast: Stop at the first failing file. Default: False
+            - Same as --max-failures 1
+        max_failures: Stop once this many files failed. Default: None
+            - The files not checked yet are skipped and reported
 
     Usage:
         Lint all packages:
@@ -61,9 +102,21 @@ def lint(ctx, path, changed_only) -> None:
         Lint specific path and only changed files:
             adev lint -p ./my_package --changed-only
 
+        Lint the files changed since branching from main:
+            adev lint --changed-only --base origin/main
+
         Lint with verbose output:
             adev lint -v
 
+        Lint every file, ignoring the cache:
+            adev lint --no-cache
+
+        Re-lint files as they are saved:
+            adev -n 4 lint --watch
+
+        Stop at the first failure in CI:
+            adev -n 8 lint --fail-fast
+
     Notes
     -----
         - Linting Tools:
@@ -94,13 +147,27 @@ def lint(ctx, path, changed_only) -> None:
     logger.info("Linting Open Autonomy Packages")
     if changed_only:
         logger.info("Checking for changed files...")
-    paths = get_paths(path=path, changed_only=changed_only)
-
-    logger.info(f"Linting {len(paths)} files...")
-    if num_processes > 1:
-        results = multi_thread_lint(paths, verbose, num_processes)
-    else:
-        results = single_thread_lint(paths, verbose, logger)
+    paths = get_paths(path=path, changed_only=changed_only, base=base, persist_index=ctx.obj["PERSIST_INDEX"])
+    cache = FileResultCache("lint", enabled=not no_cache)
+    run = partial(
+        lint_paths,
+        cache=cache,
+        verbose=verbose,
+        logger=logger,
+        num_processes=num_processes,
+        max_failures=1 if fail_fast else max_failures,
+    )
+    # the pool is kept across the runs of the watch mode.
+    with ThreadPool(num_processes) if num_processes > 1 else nullcontext() as pool:
+        results = run(paths, pool=pool)
+        if watch:
+            report_results(results)
+            watch_paths(
+                [Path(path)] if path else get_packages(),
+                lambda changed: report_results(run(changed, pool=pool)),
+                is_lintable_file,
+            )
+            return
     passed = sum(results.values())
     failed = len(results) - passed
     logger.info(f"Linting completed with {passed} passed and {failed} failed")
@@ -113,23 +180,45 @@ def lint(ctx, path, changed_only) -> None:
         raise click.ClickException(msg)
 
 
-def single_thread_lint(paths, verbose, logger):
-    """Run the linting in a single thread."""
-    results = {}
-    for package in track(range(len(paths)), description="Linting..."):
-        path = paths[package]
-        if verbose:
-            logger.info(f"Linting: {path}")
-        result = check_path(path, verbose=verbose)
-        results[path] = result
-    return results
-
+def lint_paths(paths, cache, verbose, logger, num_processes, pool=None, max_failures=None):
+    """Lint the paths not known to be clean, on the pool when given.
 
-def multi_thread_lint(paths, verbose, num_processes):
-    """Run the linting in parallel."""
-    with Pool(num_processes) as pool:
-        results = pool.map(partial(check_path, verbose=verbose), paths)
-    return dict(zip(paths, results, strict=False))
+    The paths left unchecked once `max_failures` is reached are missing from the results.
+    """
+    unknown_paths = cache.filter_unknown(paths)
+    logger.info(f"Linting {len(unknown_paths)} files, {len(paths) - len(unknown_paths)} known to be clean...")
+    if num_processes > 1:
+        results = multi_thread_lint(unknown_paths, verbose, num_processes, pool=pool, max_failures=max_failures)
+    else:
+        results = single_thread_lint(unknown_paths, verbose, logger, max_failures=max_failures)
+    cache.record(results)
+    if len(results) < len(unknown_paths):
+        logger.warning(f"Stopped after {max_failures} failures, {len(unknown_paths) - len(results)} files not checked")
+    known_paths = set(paths) - set(unknown_paths)
+    return {**{path: True for path in paths if path in known_paths}, **results}
+
+
+def single_thread_lint(paths, verbose, logger, max_failures=None):
+    """Run the linting in a single thread, one ruff process per chunk of files."""
+    chunks = chunk_paths(paths, num_chunks=1)
+
+    def lint_chunks():
+        for chunk in chunks:
+            if verbose:
+                logger.info(f"Linting: {len(chunk)} files")
+            yield check_paths(chunk, verbose=verbose)
+
+    return collect_results(lint_chunks(), len(chunks), "Linting...", max_failures)
+
+
+def multi_thread_lint(paths, verbose, num_processes, pool=None, max_failures=None):
+    """Run the linting in parallel, streaming the results of the chunks of files as they complete."""
+    chunks = chunk_paths(paths, num_processes * CHUNKS_PER_PROCESS)
+    # each ruff process does the work, so threads are enough to drive them.
+    # leaving an owned pool terminates it, cancelling the chunks not started once max_failures is reached.
+    with nullcontext(pool) if pool is not None else ThreadPool(num_processes) as workers:
+        chunk_results = workers.imap_unordered(partial(check_paths, verbose=verbose), chunks)
+        return collect_results(chunk_results, len(chunks), "Linting...", max_failures)
 
 
 if __name__ == "__main__":
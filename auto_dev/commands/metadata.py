@@ -6,7 +6,6 @@
 import sys
 import json
 
-import yaml
 import rich_click as click
 from rich import print_json
 from aea.helpers.cid import to_v1
@@ -30,6 +29,7 @@ from auto_dev.base import build_cli
 from auto_dev.enums import FileType
 from auto_dev.utils import write_to_file
 from auto_dev.constants import DEFAULT_ENCODING
+from auto_dev.package_config import load_yaml_documents
 
 
 cli = build_cli()
@@ -37,8 +37,7 @@ cli = build_cli()
 
 def read_yaml_file(file_path):
     """Reads a yaml file and returns the data."""
-    with open(file_path, encoding=DEFAULT_ENCODING) as file:
-        return next(iter(yaml.safe_load_all(file)))
+    return load_yaml_documents(file_path)[0]
 
 
 def read_json_file(file_path):
@@ -30,6 +30,7 @@ from auto_dev.constants import (
     SAMPLE_PYTHON_MAIN_FILE,
     CheckResult,
 )
+from auto_dev.reconcile import PYPROJECT, Manifests, Reconciler
 from auto_dev.cli_executor import CommandExecutor
 
 
@@ -297,46 +298,22 @@ class AutonomyVersionSet:
 
 
 def update_against_version_set(logger, dry_run: bool = False) -> list[str]:
-    """Update the dependencies in the pyproject.toml file against the version set."""
-    pyproject = Path("pyproject.toml")
-    if not pyproject.exists():
+    """Update the dependencies in the pyproject.toml and Pipfile against the version set."""
+    manifests = Manifests()
+    if manifests.read(PYPROJECT) is None:
         logger.error("No pyproject.toml found in current directory.")
         sys.exit(1)
-    # We read in the contents of the file
-    content = pyproject.read_text(encoding=DEFAULT_ENCODING)
-    # We split the content by lines
-    lines = content.split("\n")
-    # We find the index of the dependencies section
-    start_index = lines.index("[tool.poetry.dependencies]") + 1
-    # We find the index of the end of the dependencies section
-    end_index = start_index + 1
-
-    for i in range(start_index + 1, len(lines)):
-        if lines[i].startswith("["):
-            end_index = i
-            break
-    # We extract the dependencies section
-    dependencies = lines[start_index:end_index]
-    # We extract the dependencies
-    dependencies = [dep.split("=")[0].strip() for dep in dependencies if dep.strip()]
-    # We create a new set of dependencies
-    new_dependencies = AutonomyVersionSet().dependencies
-    # We update the dependencies
-    updates = []
-    for dep in dependencies:
-        # We check if the dependency is in the new set of dependencies and if the version string is in the line.
-        if dep in new_dependencies and new_dependencies[dep] not in lines[start_index + dependencies.index(dep)]:
-            # We update the version string
-            lines[start_index + dependencies.index(dep)] = f'{dep} = "{new_dependencies[dep]}"'
-            updates.append(dep)
-    if updates:
+    reconciler = Reconciler(manifests)
+    for dependency, version in AutonomyVersionSet().dependencies.items():
+        reconciler.require_poetry(dependency, version)
+    changes = reconciler.changes()
+    if changes:
         logger.info("The following dependencies have been updated:")
-        for dep in updates:
-            logger.info(f"{dep} -> {new_dependencies[dep]}")
+        for change in changes:
+            logger.info(f"{change.name} -> {change.expected} in {change.manifest}")
     if not dry_run:
-        with open("pyproject.toml", "w", encoding=DEFAULT_ENCODING) as f:
-            f.write("\n".join(lines))
-    return updates
+        reconciler.write()
+    return sorted({change.name for change in changes})
 
 
 @repo.command()
@@ -1,18 +1,46 @@
 """Test command cli module."""
 
+import tempfile
+
 import rich_click as click
 from rich.progress import track
 
 from auto_dev.base import build_cli
-from auto_dev.test import COVERAGE_COMMAND, test_path
+from auto_dev.test import (
+    DURATIONS_FILE,
+    TestDurations,
+    TestResultCache,
+    CoverageCollector,
+    has_tests,
+    run_tests,
+    test_path,
+    merge_junit,
+    select_shard,
+    read_package_hashes,
+)
 from auto_dev.utils import get_packages
-from auto_dev.exceptions import OperationError
-from auto_dev.cli_executor import CommandExecutor
+from auto_dev.dependency_graph import affected_packages
 
 
 cli = build_cli()
 
 
+def parse_shard(ctx, param, value):
+    """Parse a shard given as i/N into the index, from 1, and the number of shards."""
+    del ctx, param
+    if value is None:
+        return None
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError as error:
+        msg = f"Expected a shard as i/N, got: {value}"
+        raise click.BadParameter(msg) from error
+    if not 1 <= index <= count:
+        msg = f"The shard index must be between 1 and {count}, got: {index}"
+        raise click.BadParameter(msg)
+    return index, count
+
+
 @cli.command()
 @click.option(
     "-p",
@@ -28,9 +56,64 @@ cli = build_cli()
     is_flag=True,
     default=False,
 )
-@click.option("-c", "--coverage-report", help="Run the coverage report", is_flag=True, default=True)
+@click.option(
+    "-c",
+    "--coverage-report/--no-coverage-report",
+    help="Collect the coverage of the tested packages and report it.",
+    default=True,
+)
+@click.option(
+    "--cov-source",
+    help="A source root to measure the coverage of, by default the package or the working directory for a path.",
+    type=click.Path(exists=True, file_okay=False),
+    multiple=True,
+)
+@click.option(
+    "-m",
+    "--multiple",
+    help="Distribute the tests of every package over the cpus with pytest-xdist.",
+    is_flag=True,
+    default=False,
+)
+@click.option(
+    "--junit-xml",
+    help="Write the JUnit XML reports of all the packages merged into this file.",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+)
+@click.option(
+    "--affected",
+    help="Only test the changed packages and the packages depending on them.",
+    is_flag=True,
+    default=False,
+)
+@click.option(
+    "--base",
+    help="With --affected, use the files changed since the merge-base with this git ref.",
+    default=None,
+)
+@click.option(
+    "--no-cache",
+    help="Test every package, ignoring the packages known to pass.",
+    is_flag=True,
+    default=False,
+)
+@click.option(
+    "--shard",
+    help="Only test the i-th of N shards of the packages, balanced by their durations, as i/N.",
+    callback=parse_shard,
+    default=None,
+)
+@click.option(
+    "--durations",
+    help="The file keeping the durations of the packages and their tests, required with --shard.",
+    type=click.Path(dir_okay=False),
+    default=None,
+)
 @click.pass_context
-def test(ctx, path, watch, coverage_report) -> None:
+def test(
+    ctx, path, watch, coverage_report, cov_source, multiple, junit_xml, affected, base, no_cache, shard, durations
+) -> None:
     """Run tests for packages.
 
     Optional Parameters:
@@ -43,9 +126,37 @@ def test(ctx, path, watch, coverage_report) -> None:
             - Re-runs tests when files are modified
             - Useful for test-driven development
         coverage_report: Generate test coverage report. Default: True
-            - Creates detailed coverage analysis
-            - Shows line-by-line coverage stats
-            - Generates HTML report for visualization
+            - Collects the coverage of every package in its own data file
+            - Measures the package itself, or the working directory when testing a path
+            - Shows the coverage of the packages tested in this run
+            - Writes the combined report of all packages to coverage-report.txt
+        cov_source: Source roots to measure the coverage of. Default: None
+            - Can be given multiple times, e.g. --cov-source auto_dev
+        multiple: Distribute the tests of every package with pytest-xdist. Default: False
+            - The cpus are shared out between the packages tested at once
+        junit_xml: File to write the merged JUnit XML report to. Default: None
+            - One testsuite per package
+        affected: Only test the packages affected by the changes. Default: False
+            - Uses git to detect the changed packages
+            - Adds every package depending on them, transitively
+            - Dependencies are read from the package configurations
+            - A change outside of the packages, documentation aside, affects every package
+        base: Git ref to compare against with affected. Default: None
+            - Uses the files changed since the merge-base of the ref and HEAD
+            - e.g. origin/main in CI
+        no_cache: Test every package, ignoring previous results. Default: False
+            - By default packages whose tests passed before are skipped
+            - Only the packages of packages.json are cached, a path is always tested
+            - Results are keyed by the hash of the package, its files and dependencies
+            - The interpreter and lock files are part of the key
+        shard: Only test one shard of the packages, as i/N. Default: None
+            - Splits the packages into N shards of about equal duration
+            - Uses the durations of previous runs, longest packages first
+            - Every CI node computes the same shards from the same durations file
+            - Requires an explicit durations file, which the shards do not update
+        durations: File keeping the durations of previous runs. Default: the adev cache
+            - Updated after every run but sharded ones
+            - Share it between CI nodes for balanced shards
 
     Usage:
         Test all packages:
@@ -60,9 +171,24 @@ def test(ctx, path, watch, coverage_report) -> None:
         Test without coverage report:
             adev test --no-coverage-report
 
+        Test a tests directory, measuring the coverage of the code it tests:
+            adev test -p tests --cov-source auto_dev
+
         Test specific directory with watching:
             adev test -p ./my_package -w
 
+        Test 4 packages at a time, writing a merged JUnit report:
+            adev -n 4 test --junit-xml report.xml
+
+        Test the packages affected by the changes of a branch:
+            adev test --affected --base origin/main
+
+        Test every package, even those which passed before:
+            adev test --no-cache
+
+        Test the second of 4 shards on a CI node:
+            adev test --shard 2/4 --durations test_durations.json
+
     Notes
     -----
         - Test Framework:
@@ -70,37 +196,56 @@ def test(ctx, path, watch, coverage_report) -> None:
             - Supports fixtures and markers
             - Handles async tests
         - Coverage:
-            - Tracks line and branch coverage
+            - Tracks line coverage with pytest-cov, xdist workers included
             - Excludes test files from coverage
-            - Sets minimum coverage thresholds
+            - Reuses the coverage of packages skipped as known to pass
+            - Combined into .coverage after the run
         - Features:
-            - Parallel test execution
+            - Parallel test execution, every package in its own pytest process
+            - The longest packages are started first
             - JUnit XML reports
             - Integration with CI/CD
             - Detailed failure reporting
             - Test categorization with markers
+            - Packages without test modules are skipped
     """
     verbose = ctx.obj["VERBOSE"]
+    persist_index = ctx.obj["PERSIST_INDEX"]
     click.echo(
         f"Testing path: `{path or 'All dev packages/packages.json'}` ⌛",
     )
 
-    if coverage_report:
-        cli_runner = CommandExecutor(COVERAGE_COMMAND)
-        if not cli_runner.execute(stream=True, shell=True):
-            msg = "Unable to successfully execute coverage report"
-            raise OperationError(msg)
+    packages = select_packages(path, affected, base)
+    testable = []
+    for package in packages:
+        if has_tests(str(package), persist_index=persist_index):
+            testable.append(str(package))
+        else:
+            click.echo(f"💤 - {package} has no tests")
+    if shard and durations is None:
+        msg = "Every shard must be computed from the same durations, so --shard requires --durations."
+        raise click.UsageError(msg)
+    test_durations = TestDurations(durations or DURATIONS_FILE)
+    if shard:
+        testable = select_shard(testable, test_durations, shard)
+        click.echo(f"Testing {len(testable)} packages of shard {shard[0]}/{shard[1]}")
 
-    try:
-        packages = get_packages() if not path else [path]
-    except FileNotFoundError as error:
-        msg = f"Unable to get packages are you in the right directory? {error}"
-        raise click.ClickException(msg) from error
-    results = {}
-    for package in track(range(len(packages)), description="Testing..."):
-        result = test_path(str(packages[package]), verbose=verbose, watch=watch)
-        results[packages[package]] = result
-        click.echo(f"{'👌' if result else '❗'} - {packages[package]}")
+    if watch:
+        results = {package: test_path(package, verbose=verbose, watch=watch, multiple=multiple) for package in testable}
+    else:
+        cache = TestResultCache(read_package_hashes(), enabled=not no_cache, persist_index=persist_index)
+        coverage = CoverageCollector(cache, sources=cov_source) if coverage_report else None
+        results = test_packages(
+            testable,
+            cache,
+            test_durations,
+            coverage,
+            ctx.obj["NUM_PROCESSES"],
+            verbose,
+            multiple,
+            junit_xml,
+            save_durations=not shard,
+        )
 
     raises = []
     for package, result in results.items():
@@ -114,5 +259,70 @@ def test(ctx, path, watch, coverage_report) -> None:
     click.echo("Testing completed successfully! ✅")
 
 
+def select_packages(path, affected, base):
+    """The packages to test, the path or the packages of packages.json, only the affected ones with `affected`."""
+    if path and affected:
+        msg = "The affected packages are found among all of the packages, so --affected cannot be used with --path."
+        raise click.ClickException(msg)
+    try:
+        packages = get_packages() if not path else [path]
+    except FileNotFoundError as error:
+        msg = f"Unable to get packages are you in the right directory? {error}"
+        raise click.ClickException(msg) from error
+    if affected:
+        packages = affected_packages(packages, base=base)
+        click.echo(f"Testing {len(packages)} packages affected by the changes")
+    return packages
+
+
+def test_packages(
+    packages, cache, durations, coverage, num_processes, verbose, multiple, junit_xml, save_durations=True
+):
+    """Test the packages not known to pass in parallel, reporting each package as it completes.
+
+    With coverage, the packages known to pass are tested again when their coverage was never collected.
+    Without `save_durations`, as for a shard, the durations the other shards are computed from are left as they are.
+    """
+    unknown_packages = cache.filter_unknown(packages)
+    if coverage is not None:
+        unknown_packages = [
+            package for package in packages if package in unknown_packages or not coverage.has_data(package)
+        ]
+    results = {}
+    for package in packages:
+        if package not in unknown_packages:
+            click.echo(f"👌 - {package} (cached)")
+            results[package] = True
+    packages = unknown_packages
+    completed = []
+    with tempfile.TemporaryDirectory() as junit_dir:
+        package_results = run_tests(
+            packages,
+            junit_dir,
+            num_processes=num_processes,
+            verbose=verbose,
+            multiple=multiple,
+            durations=durations,
+            coverage=coverage,
+        )
+        for result in track(package_results, total=len(packages), description="Testing..."):
+            if verbose or not result.passed:
+                click.echo(result.output)
+            click.echo(f"{'👌' if result.passed else '❗'} - {result.package} ({result.summary})")
+            results[result.package] = result.passed
+            completed.append(result)
+        if junit_xml:
+            merge_junit(completed, junit_xml)
+    if save_durations:
+        durations.update(completed)
+        durations.save()
+    cache.record(results)
+    if coverage is not None:
+        total = coverage.report(list(results), [result.package for result in completed])
+        if total is not None:
+            click.echo(f"Total coverage: {total:.1f}%, reported to {coverage.report_file}")
+    return results
+
+
 if __name__ == "__main__":
     cli()  # pylint: disable=no-value-for-parameter
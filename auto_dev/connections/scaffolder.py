@@ -12,6 +12,7 @@ from aea import AEA_DIR
 from aea.helpers.yaml_utils import yaml_dump
 from aea.configurations.data_types import PublicId
 
+from auto_dev.fmt import format_later, format_session
 from auto_dev.enums import FileType
 from auto_dev.utils import get_logger, write_to_file, folder_swapper
 from auto_dev.constants import AEA_CONFIG, DEFAULT_ENCODING
@@ -160,6 +161,13 @@ class ConnectionFolderTemplate:  # pylint: disable=R0902  # Too many instance at
             "PERFORMATIVE": speech_acts[0].upper(),
         }
 
+    @property
+    def python_files(self) -> list[Path]:
+        """The python files written by the template, relative to it."""
+        return [
+            path.relative_to(self.path) for path in (self.connection, self.test_connection, self.test_connection_init)
+        ]
+
     def augment(self) -> None:
         """(Over)write the connection files."""
         self.tests.mkdir()
@@ -236,8 +244,14 @@ class ConnectionScaffolder:
                 self.logger.error(f"Command failed: {command}")
                 sys.exit(1)
 
-        self.update_config()
-        self.update_readme()
+        # aea scaffold copies the template, so the files are formatted where it puts them.
+        connection_path = Path.cwd() / "connections" / self.name
+        with format_session() as session:
+            format_later(*(connection_path / path for path in template.python_files))
+            self.update_config()
+            self.update_readme()
+            # the fingerprints are of the formatted files.
+            session.flush()
 
         connection_id = PublicId(AEA_CONFIG["author"], self.name, "0.1.0")
         cli_executor = CommandExecutor(f"aea fingerprint connection {connection_id}".split())
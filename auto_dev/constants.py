@@ -2,18 +2,15 @@
 
 import os
 from enum import Enum
+from typing import Any
 from pathlib import Path
 
-from aea.cli.utils.config import get_or_create_cli_config
-from aea.configurations.data_types import PublicId
-
 
 DEFAULT_ENCODING = "utf-8"
 DEFAULT_TZ = "UTC"
 DEFAULT_TIMEOUT = 10
 DEFAULT_AUTHOR = "author"
 DEFAULT_AGENT_NAME = "agent"
-DEFAULT_PUBLIC_ID = PublicId.from_str(f"{DEFAULT_AUTHOR}/{DEFAULT_AGENT_NAME}")
 # package directory
 PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
 DEFAULT_RUFF_CONFIG = Path(PACKAGE_DIR) / "data" / "ruff.toml"
@@ -27,6 +24,14 @@ JINJA_TEMPLATE_FOLDER = os.path.join(
     "templates",
 )
 
+AUTO_DEV_CACHE_DIR = Path(
+    os.environ.get(
+        "ADEV_CACHE_DIR",
+        Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "auto_dev",
+    )
+)
+COMMAND_MANIFEST_FILE = "command_manifest.json"
+
 DOCKERCOMPOSE_TEMPLATE_FOLDER = os.path.join(
     AUTO_DEV_FOLDER,
     "data",
@@ -34,7 +39,6 @@ DOCKERCOMPOSE_TEMPLATE_FOLDER = os.path.join(
     "compose",
 )
 
-AEA_CONFIG = get_or_create_cli_config()
 NAME_PATTERN = r"[a-z_][a-z0-9_]{0,127}"
 
 SAMPLE_PACKAGES_JSON = {
@@ -164,3 +168,20 @@ class Network(Enum):
     OPTIMISM = "optimism"
     OPTIMISM_GOERLI = "optimismGoerli"
     GNOSIS = "gnosis"
+
+
+def __getattr__(name: str) -> Any:
+    """The constants needing aea, only imported when used, so the cli starts without importing aea."""
+    if name == "DEFAULT_PUBLIC_ID":
+        from aea.configurations.data_types import PublicId  # noqa: PLC0415
+
+        value = PublicId.from_str(f"{DEFAULT_AUTHOR}/{DEFAULT_AGENT_NAME}")
+    elif name == "AEA_CONFIG":
+        from aea.cli.utils.config import get_or_create_cli_config  # noqa: PLC0415
+
+        value = get_or_create_cli_config()
+    else:
+        msg = f"module {__name__!r} has no attribute {name!r}"
+        raise AttributeError(msg)
+    globals()[name] = value
+    return value
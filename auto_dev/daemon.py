@@ -0,0 +1,243 @@
+"""A warm adev daemon and the thin client which forwards invocations to it.
+
+The client is imported on every invocation, so this module only depends on the standard library.
+The daemon imports the cli and all of the commands once, then forks a child per invocation. The
+client hands its stdio file descriptors over the unix socket, so the output of the command and of
+any subprocess it spawns is written straight to the terminal of the caller.
+"""
+
+import os
+import sys
+import json
+import signal
+import socket
+import struct
+import tempfile
+import traceback
+import contextlib
+from pathlib import Path
+
+
+DEFAULT_SOCKET_PATH = Path(
+    os.environ.get(
+        "ADEV_DAEMON_SOCKET",
+        Path(os.environ.get("XDG_RUNTIME_DIR", tempfile.gettempdir())) / f"adev-{os.getuid()}.sock",
+    )
+)
+HEADER = struct.Struct("!I")
+MAX_MESSAGE_SIZE = 1 << 22
+STDIO_FDS = (0, 1, 2)
+FORWARDED_SIGNALS = (signal.SIGINT, signal.SIGTERM, signal.SIGHUP)
+
+
+def send_message(sock: socket.socket, message: dict, fds=()) -> None:
+    """Send a length prefixed json message, passing the file descriptors along with the header."""
+    payload = json.dumps(message).encode("utf-8")
+    socket.send_fds(sock, [HEADER.pack(len(payload))], list(fds))
+    sock.sendall(payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    """Receive exactly `size` bytes."""
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            msg = "Connection closed before the message was received."
+            raise ConnectionError(msg)
+        data += chunk
+    return data
+
+
+def receive_message(sock: socket.socket, maxfds: int = 0) -> tuple[dict, list[int]]:
+    """Receive a message sent with `send_message` along with any file descriptors."""
+    header, fds, _, _ = socket.recv_fds(sock, HEADER.size, maxfds)
+    if not header:
+        msg = "Connection closed before the message was received."
+        raise ConnectionError(msg)
+    (size,) = HEADER.unpack(header + _recv_exact(sock, HEADER.size - len(header)))
+    if size > MAX_MESSAGE_SIZE:
+        msg = f"Message of {size} bytes exceeds the maximum of {MAX_MESSAGE_SIZE} bytes."
+        raise ValueError(msg)
+    return json.loads(_recv_exact(sock, size)), fds
+
+
+def connect(socket_path: str | Path = DEFAULT_SOCKET_PATH) -> socket.socket:
+    """Connect to the daemon."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(socket_path))
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def request_control(command: str, socket_path: str | Path = DEFAULT_SOCKET_PATH) -> dict | None:
+    """Send a control command to the daemon, returning None when no daemon is listening."""
+    try:
+        sock = connect(socket_path)
+    except OSError:
+        return None
+    with sock:
+        send_message(sock, {"command": command})
+        response, _ = receive_message(sock)
+    return response
+
+
+def forward(argv: list[str], socket_path: str | Path = DEFAULT_SOCKET_PATH, fds=STDIO_FDS) -> int:
+    """Run the invocation on the daemon and return its exit code.
+
+    Raises OSError when no daemon is listening on the socket.
+    """
+    with connect(socket_path) as sock:
+        send_message(sock, {"argv": argv, "cwd": os.getcwd(), "env": dict(os.environ)}, fds=fds)
+        started, _ = receive_message(sock)
+        previous_handlers = {
+            signum: signal.signal(signum, lambda signum, _: os.kill(started["pid"], signum))
+            for signum in FORWARDED_SIGNALS
+        }
+        try:
+            finished, _ = receive_message(sock)
+        except ConnectionError:
+            return 1
+        finally:
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+    return finished["exit_code"]
+
+
+def client_main() -> None:
+    """Entry point of the thin client, running adev locally when the daemon is not running."""
+    try:
+        exit_code = forward(sys.argv[1:])
+    except OSError:
+        from auto_dev.cli import cli  # noqa: PLC0415
+
+        cli()  # pylint: disable=no-value-for-parameter
+        return
+    sys.exit(exit_code)
+
+
+class AdevDaemon:
+    """Serve adev invocations from a warm interpreter."""
+
+    def __init__(self, socket_path: str | Path = DEFAULT_SOCKET_PATH, cli=None):
+        self.socket_path = Path(socket_path)
+        self.cli = cli
+        self.server = None
+        self.running = False
+
+    def warm_up(self) -> None:
+        """Import the cli along with every command, so the children never pay for an import."""
+        if self.cli is not None:
+            return
+        from auto_dev.cli import cli  # noqa: PLC0415
+
+        for name in cli.manifest.commands:
+            cli.add_command(cli.plugins.get_command(name), name=name)
+        self.cli = cli
+
+    def serve_forever(self) -> None:
+        """Listen on the socket until a stop command or SIGTERM is received."""
+        self.warm_up()
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        self.socket_path.unlink(missing_ok=True)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # only the owner may connect, anyone else could run commands as them.
+        previous_umask = os.umask(0o177)
+        try:
+            self.server.bind(str(self.socket_path))
+        finally:
+            os.umask(previous_umask)
+        self.server.listen()
+        # wake up regularly so a SIGTERM is acted upon without waiting for a connection.
+        self.server.settimeout(1.0)
+        signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, lambda *_: self.stop())
+        self.running = True
+        try:
+            while self.running:
+                try:
+                    conn, _ = self.server.accept()
+                except TimeoutError:  # noqa: S112
+                    continue
+                self._handle(conn)
+        finally:
+            self.server.close()
+            self.socket_path.unlink(missing_ok=True)
+
+    def stop(self) -> None:
+        """Stop serving once the current connection is handled."""
+        self.running = False
+
+    def _handle(self, conn: socket.socket) -> None:
+        """Handle a control command or fork a child to run the invocation."""
+        with conn:
+            try:
+                request, fds = receive_message(conn, maxfds=len(STDIO_FDS))
+            except (OSError, ValueError):
+                return
+            if request.get("command") == "status":
+                send_message(conn, {"pid": os.getpid(), "socket": str(self.socket_path)})
+                return
+            if request.get("command") == "stop":
+                send_message(conn, {"pid": os.getpid()})
+                self.stop()
+                return
+            if os.fork() == 0:
+                self._run_child(conn, request, fds)
+            for fd in fds:
+                os.close(fd)
+
+    def _run_child(self, conn: socket.socket, request: dict, fds: list[int]) -> None:
+        """Run the invocation in the forked child, in the environment of the client."""
+        exit_code = 1
+        try:
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            self.server.close()
+            for target, fd in zip(STDIO_FDS, fds, strict=False):
+                os.dup2(fd, target)
+                os.close(fd)
+            sys.stdin = open(0, encoding="utf-8", closefd=False)  # noqa: SIM115
+            sys.stdout = open(1, "w", encoding="utf-8", buffering=1, closefd=False)  # noqa: SIM115
+            sys.stderr = open(2, "w", encoding="utf-8", buffering=1, closefd=False)  # noqa: SIM115
+            os.chdir(request["cwd"])
+            os.environ.clear()
+            os.environ.update(request["env"])
+            sys.argv = ["adev", *request["argv"]]
+            self._reset_logging()
+            send_message(conn, {"pid": os.getpid()})
+            exit_code = self.invoke(request["argv"])
+        except KeyboardInterrupt:
+            exit_code = 130
+        except BaseException:  # noqa: BLE001  # pylint: disable=broad-except
+            traceback.print_exc()
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            with contextlib.suppress(OSError):
+                send_message(conn, {"exit_code": exit_code})
+            os._exit(exit_code)
+
+    @staticmethod
+    def _reset_logging() -> None:
+        """Drop the logger configured by the daemon, so the child logs to the terminal of the client."""
+        from auto_dev import log  # noqa: PLC0415
+
+        log.LOGGER = None
+
+    def invoke(self, argv: list[str]) -> int:
+        """Invoke the cli, returning the exit code."""
+        try:
+            self.cli.main(args=argv, prog_name="adev")
+        except SystemExit as exc:
+            if exc.code is None:
+                return 0
+            if isinstance(exc.code, int):
+                return exc.code
+            print(exc.code, file=sys.stderr)  # noqa: T201
+            return 1
+        return 0
@@ -9,6 +9,7 @@ import yaml
 from jinja2 import Environment, FileSystemLoader
 from aea.configurations.base import PublicId
 
+from auto_dev.fmt import format_later, format_session
 from auto_dev.enums import FileType
 from auto_dev.utils import write_to_file, camel_to_snake, read_from_file, validate_openapi_spec
 from auto_dev.constants import JINJA_TEMPLATE_FOLDER
@@ -73,16 +74,17 @@ class DAOScaffolder:
             test_dummy_data = self._generate_single_dummy_data(models)
 
             dao_classes = self._generate_dao_classes(models, paths)
-            self._generate_and_save_test_script(dao_classes, test_dummy_data)
+            with format_session():
+                self._generate_and_save_test_script(dao_classes, test_dummy_data)
 
-            self._save_aggregated_dummy_data(aggregated_dummy_data)
-            self._save_dao_classes(dao_classes)
+                self._save_aggregated_dummy_data(aggregated_dummy_data)
+                self._save_dao_classes(dao_classes)
 
-            self._generate_and_save_init_file(dao_classes)
+                self._generate_and_save_init_file(dao_classes)
 
-            base_dao_template = self.env.get_template("base_dao.jinja")
-            base_dao_content = base_dao_template.render()
-            self._save_base_dao(base_dao_content)
+                base_dao_template = self.env.get_template("base_dao.jinja")
+                base_dao_content = base_dao_template.render()
+                self._save_base_dao(base_dao_content)
 
             self.logger.info("DAO scaffolding and test script generation completed successfully.")
         except Exception as e:
@@ -214,6 +216,7 @@ class DAOScaffolder:
                 snake_case_name = camel_to_snake(class_name[:-3]) + "_dao"
                 file_path = dao_dir / f"{snake_case_name}.py"
                 write_to_file(file_path, class_code, FileType.PYTHON)
+                format_later(file_path)
                 self.logger.info(f"Saved DAO class: {file_path}")
         except OSError as e:
             self.logger.exception(f"Error saving generated files: {e!s}")
@@ -225,6 +228,7 @@ class DAOScaffolder:
             dao_dir.mkdir(parents=True, exist_ok=True)
             file_path = dao_dir / "base_dao.py"
             write_to_file(file_path, content, FileType.PYTHON)
+            format_later(file_path)
             self.logger.info(f"Saved BaseDAO class: {file_path}")
         except OSError as e:
             self.logger.exception(f"Error saving BaseDAO class: {e!s}")
@@ -252,6 +256,7 @@ class DAOScaffolder:
         test_script_path = Path("tests/test_dao.py")
         test_script_path.parent.mkdir(parents=True, exist_ok=True)
         write_to_file(test_script_path, test_script, FileType.PYTHON)
+        format_later(test_script_path)
         self.logger.info(f"Test script saved to: {test_script_path}")
 
     def _generate_and_save_init_file(self, dao_classes: dict[str, str]) -> None:
@@ -264,6 +269,7 @@ class DAOScaffolder:
             dao_dir = Path("daos")
             init_file_path = dao_dir / "__init__.py"
             write_to_file(init_file_path, init_content, FileType.PYTHON)
+            format_later(init_file_path)
             self.logger.info(f"Generated and saved __init__.py: {init_file_path}")
         except Exception as e:
             self.logger.exception(f"Error generating and saving __init__.py: {e!s}")
@@ -0,0 +1,255 @@
+"""The dependency graph of the packages of a repository, from the dependencies listed in their configurations."""
+
+import heapq
+from pathlib import Path
+from collections import deque
+from collections.abc import Iterable
+
+import yaml
+from aea.configurations.base import PublicId
+from aea.configurations.constants import (
+    AGENT,
+    CUSTOM,
+    SKILLS,
+    CUSTOMS,
+    SERVICE,
+    CONTRACTS,
+    PROTOCOLS,
+    CONNECTIONS,
+    DEFAULT_AEA_CONFIG_FILE,
+)
+
+from auto_dev.cache import DiskCache
+from auto_dev.utils import get_logger
+from auto_dev.changes import get_changes, index_changes
+from auto_dev.package_config import load_yaml_documents
+
+
+DEPENDENCY_KEYS = (PROTOCOLS, CONTRACTS, CONNECTIONS, SKILLS, CUSTOMS)
+CONFIG_FILES = {AGENT: DEFAULT_AEA_CONFIG_FILE, SERVICE: "service.yaml", CUSTOM: "component.yaml"}
+MAX_INDEXED_DIRECTORIES = 100
+# changes outside of the packages to these files cannot affect any test, any other one, such as a lock file,
+# pyproject.toml or a root conftest.py, may affect every package.
+DOCUMENTATION_SUFFIXES = (".md", ".rst")
+
+logger = get_logger()
+
+
+def package_config_file(package_path: Path) -> Path:
+    """The configuration file of a package at packages/<author>/<type>s/<name>."""
+    component_type = package_path.parent.name[:-1]
+    return package_path / CONFIG_FILES.get(component_type, f"{component_type}.yaml")
+
+
+def dependency_path(packages_dir: Path, component_type: str, dependency: str) -> Path:
+    """The path of a dependency, given as <author>/<name>:<version>:<hash>, within the packages directory."""
+    public_id = PublicId.from_str(dependency)
+    return packages_dir / public_id.author / f"{component_type}s" / public_id.name
+
+
+def read_dependencies(package_path: Path) -> set[Path]:
+    """The paths of the packages a package directly depends on.
+
+    The protocols, contracts, connections, skills and customs of the configuration are dependencies,
+    as is the agent of a service.
+    """
+    package_path = Path(package_path)
+    if len(package_path.parents) < 3:
+        # not laid out as packages/<author>/<type>s/<name>, so not a package with a configuration.
+        return set()
+    packages_dir = package_path.parents[2]
+    try:
+        config = next(iter(load_yaml_documents(package_config_file(package_path))), None) or {}
+    except (OSError, yaml.YAMLError) as error:
+        logger.debug(f"Unable to read the dependencies of {package_path}: {error}")
+        return set()
+    dependencies = set()
+    for key in DEPENDENCY_KEYS:
+        dependencies.update(dependency_path(packages_dir, key[:-1], dependency) for dependency in config.get(key) or [])
+    if config.get(AGENT):
+        dependencies.add(dependency_path(packages_dir, AGENT, config[AGENT]))
+    return dependencies
+
+
+def build_dependency_graph(packages: Iterable[Path]) -> dict[Path, set[Path]]:
+    """The direct dependencies of every package, restricted to the given packages."""
+    packages = [Path(package) for package in packages]
+    known = set(packages)
+    return {package: read_dependencies(package) & known for package in packages}
+
+
+def reverse_graph(graph: dict[Path, set[Path]]) -> dict[Path, set[Path]]:
+    """The direct dependents of every package of a dependency graph."""
+    dependents = {package: set() for package in graph}
+    for package, dependencies in graph.items():
+        for dependency in dependencies:
+            dependents.setdefault(dependency, set()).add(package)
+    return dependents
+
+
+def find_dependents(graph: dict[Path, set[Path]], packages: Iterable[Path]) -> set[Path]:
+    """The packages and all of their transitive dependents."""
+    dependents = reverse_graph(graph)
+    found = set()
+    queue = deque(Path(package) for package in packages)
+    while queue:
+        package = queue.popleft()
+        if package in found:
+            continue
+        found.add(package)
+        queue.extend(dependents.get(package, ()))
+    return found
+
+
+def affected_packages(packages: list[Path], base: str | None = None) -> list[Path]:
+    """The packages changed in git, staged, unstaged, untracked or since the merge-base with `base`,
+    and the packages which transitively depend on them, in the order of `packages`.
+
+    Every package is affected by a change outside of the packages, documentation aside.
+    """
+    packages = [Path(package) for package in packages]
+    changes = get_changes(base=base)
+    index = index_changes(changes, packages)
+    indexed = {change for package_changes in index.values() for change in package_changes}
+    for change in changes:
+        if change not in indexed and Path(change.path).suffix not in DOCUMENTATION_SUFFIXES:
+            logger.info(f"{change.path} is outside of the packages, so every package is affected.")
+            return packages
+    changed = list(index)
+    affected = find_dependents(build_dependency_graph(packages), changed)
+    return [package for package in packages if package in affected]
+
+
+def find_packages(packages_dir: Path) -> list[Path]:
+    """The packages of a packages directory, laid out as <author>/<type>s/<name> with a configuration file."""
+    return sorted(
+        package
+        for package in Path(packages_dir).glob("*/*s/*")
+        if package.is_dir() and package_config_file(package).is_file()
+    )
+
+
+def topological_order(graph: dict[Path, set[Path]]) -> list[Path]:
+    """The packages, each after all of its dependencies and otherwise by path.
+
+    The packages on a cycle, and those depending on one, have no such order and are left out.
+    """
+    remaining = {package: len(dependencies & graph.keys()) for package, dependencies in graph.items()}
+    dependents = reverse_graph(graph)
+    ready = [package for package, count in remaining.items() if count == 0]
+    heapq.heapify(ready)
+    order = []
+    while ready:
+        package = heapq.heappop(ready)
+        order.append(package)
+        for dependent in dependents.get(package, ()):
+            remaining[dependent] -= 1
+            if remaining[dependent] == 0:
+                heapq.heappush(ready, dependent)
+    return order
+
+
+def find_cycles(graph: dict[Path, set[Path]]) -> list[list[Path]]:
+    """The groups of packages depending on each other, the strongly connected components of the graph."""
+    index: dict[Path, int] = {}
+    lowlink: dict[Path, int] = {}
+    stack: list[Path] = []
+    on_stack: set[Path] = set()
+    cycles = []
+
+    def visit(package: Path) -> None:
+        index[package] = lowlink[package] = len(index)
+        stack.append(package)
+        on_stack.add(package)
+
+    # tarjan's algorithm, with an explicit stack as the graphs can be deeper than the recursion limit.
+    for root in sorted(graph):
+        if root in index:
+            continue
+        visit(root)
+        work = [(root, iter(sorted(graph[root] & graph.keys())))]
+        while work:
+            package, dependencies = work[-1]
+            for dependency in dependencies:
+                if dependency not in index:
+                    visit(dependency)
+                    work.append((dependency, iter(sorted(graph[dependency] & graph.keys()))))
+                    break
+                if dependency in on_stack:
+                    lowlink[package] = min(lowlink[package], index[dependency])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[package])
+                if lowlink[package] != index[package]:
+                    continue
+                component = []
+                while not component or component[-1] != package:
+                    component.append(stack.pop())
+                    on_stack.discard(component[-1])
+                if len(component) > 1 or package in graph[package]:
+                    cycles.append(sorted(component))
+    return sorted(cycles)
+
+
+class DependencyIndex:
+    """The dependency graph of the packages of a directory, kept on disk and refreshed incrementally.
+
+    The direct dependencies of every package are stored with the modification time and size of its
+    configuration, so a refresh only reads the configurations which changed since the last one.
+    """
+
+    def __init__(self, packages_dir: str | Path = "packages", cache: DiskCache | None = None):
+        self.packages_dir = Path(packages_dir)
+        self.cache = cache if cache is not None else DiskCache("dependency_graph", max_entries=MAX_INDEXED_DIRECTORIES)
+        # the relative path of every package, to the stamp of its configuration and its dependencies.
+        self.entries: dict[str, list] = {}
+        self.refreshed = 0
+
+    def refresh(self) -> "DependencyIndex":
+        """Bring the index up to date with the configurations, reading only the changed ones."""
+        key = str(self.packages_dir.resolve())
+        stored = self.cache.get(key) or {}
+        entries = {}
+        self.refreshed = 0
+        for package in find_packages(self.packages_dir):
+            name = package.relative_to(self.packages_dir).as_posix()
+            stat = package_config_file(package).stat()
+            stamp = f"{stat.st_mtime_ns}:{stat.st_size}"
+            entry = stored.get(name)
+            if entry is None or entry[0] != stamp:
+                dependencies = read_dependencies(package)
+                entry = [stamp, sorted(path.relative_to(self.packages_dir).as_posix() for path in dependencies)]
+                self.refreshed += 1
+            entries[name] = entry
+        if entries != stored:
+            self.cache.set(key, entries)
+        self.entries = entries
+        return self
+
+    @property
+    def graph(self) -> dict[Path, set[Path]]:
+        """The direct dependencies of every package, restricted to the packages of the directory."""
+        return {
+            self.packages_dir / name: {
+                self.packages_dir / dependency for dependency in dependencies if dependency in self.entries
+            }
+            for name, (_, dependencies) in self.entries.items()
+        }
+
+    def resolve(self, package: str) -> Path | None:
+        """The path of a package given as a path or as <type>/<author>/<name>, optionally with a version."""
+        path = Path(package)
+        candidates = [path, self.packages_dir / path]
+        parts = package.split(":")[0].split("/")
+        if len(parts) == 3:
+            component_type, author, name = parts
+            candidates.append(self.packages_dir / author / f"{component_type}s" / name)
+        packages_dir = self.packages_dir.resolve()
+        for candidate in candidates:
+            resolved = candidate.resolve()
+            relative = resolved.relative_to(packages_dir).as_posix() if resolved.is_relative_to(packages_dir) else None
+            if relative in self.entries:
+                return self.packages_dir / relative
+        return None
@@ -0,0 +1,244 @@
+"""A gitignore aware index of the files of a directory tree."""
+
+import os
+import re
+from pathlib import Path
+from functools import cache
+from dataclasses import replace, dataclass
+
+from auto_dev.constants import DEFAULT_ENCODING
+
+
+# directories which never hold code to lint, format or test, so are never descended into.
+SKIPPED_DIRECTORIES = frozenset(
+    {
+        "__pycache__",
+        ".git",
+        ".hg",
+        ".venv",
+        ".tox",
+        ".mypy_cache",
+        ".pytest_cache",
+        ".ruff_cache",
+        "node_modules",
+        "vendor",
+    }
+)
+GITIGNORE_FILE = ".gitignore"
+
+
+@dataclass(frozen=True)
+class IgnoreRule:
+    """A single pattern of a .gitignore file, relative to the directory of the file."""
+
+    base: str
+    pattern: re.Pattern
+    negated: bool
+    directory_only: bool
+    # the path of the indexed root from a .gitignore above it.
+    prefix: str = ""
+
+    def matches(self, path: str, is_dir: bool) -> bool:
+        """Whether the rule matches the path, relative to the indexed root."""
+        if self.directory_only and not is_dir:
+            return False
+        path = self.prefix + path
+        if self.base:
+            if not path.startswith(self.base + "/"):
+                return False
+            path = path[len(self.base) + 1 :]
+        return self.pattern.fullmatch(path) is not None
+
+
+def _translate(pattern: str) -> str:
+    """Translate the glob of a gitignore pattern into a regular expression."""
+    result = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            result.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            result.append("/.*")
+            i += 3
+        elif pattern.startswith("**", i):
+            result.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            result.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            result.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and (end := pattern.find("]", i + 1)) != -1:
+            content = pattern[i + 1 : end]
+            if content.startswith("!"):
+                content = "^" + content[1:]
+            result.append(f"[{content}]")
+            i = end + 1
+        elif pattern[i] == "\\" and i + 1 < len(pattern):
+            result.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            result.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(result)
+
+
+def parse_gitignore(content: str, base: str = "") -> list[IgnoreRule]:
+    """Parse the content of a .gitignore file.
+
+    :param content: The content of the file.
+    :param base: The directory of the file, relative to the indexed root.
+    :return: The rules of the file, in order.
+    """
+    rules = []
+    for line in content.splitlines():
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negated = line.startswith("!")
+        if negated:
+            line = line[1:]
+        directory_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        # patterns with a separator are relative to the .gitignore, the others match at any depth.
+        anchored = "/" in line
+        regex = _translate(line.lstrip("/"))
+        if not anchored:
+            regex = f"(?:.*/)?{regex}"
+        rules.append(IgnoreRule(base, re.compile(regex), negated, directory_only))
+    return rules
+
+
+@cache
+def _read_gitignore(path: str, mtime_ns: int) -> str:
+    """The content of a .gitignore file."""
+    del mtime_ns
+    return Path(path).read_text(encoding=DEFAULT_ENCODING)
+
+
+def _load_rules(directory: Path, base: str) -> list[IgnoreRule]:
+    """The rules of the .gitignore of a directory."""
+    gitignore = directory / GITIGNORE_FILE
+    try:
+        content = _read_gitignore(str(gitignore), gitignore.stat().st_mtime_ns)
+    except OSError:
+        return []
+    return parse_gitignore(content, base)
+
+
+def is_ignored(rules: list[IgnoreRule], path: str, is_dir: bool) -> bool:
+    """Whether the path is ignored, the last matching rule deciding."""
+    ignored = False
+    for rule in rules:
+        if rule.negated == ignored and rule.matches(path, is_dir):
+            ignored = not rule.negated
+    return ignored
+
+
+class FileIndex:
+    """Index the files below a directory, skipping the ignored ones without descending into them.
+
+    The .gitignore files from the root of the repository down to the indexed directory are respected.
+    When persisted, the listing of every directory is kept on disk and only re-read from the file system
+    once the mtime of the directory changes; the ignore rules are always applied afresh.
+    """
+
+    def __init__(
+        self,
+        root: str | Path = ".",
+        persist: bool = False,
+        skipped_directories: frozenset[str] = SKIPPED_DIRECTORIES,
+        cache=None,
+    ):
+        self.root = Path(root)
+        self.skipped_directories = skipped_directories
+        self.cache = None
+        if persist:
+            # imported here as the cache depends on auto_dev.utils, which lists its files with the index.
+            from auto_dev.cache import DiskCache  # noqa: PLC0415
+
+            self.cache = cache if cache is not None else DiskCache("file_index")
+        self._listings = {}
+
+    def files(self, suffixes: tuple[str, ...] = (".py",)) -> list[str]:
+        """The files of the tree with one of the suffixes, as paths prefixed with the root."""
+        if self.root.is_file():
+            return [str(self.root)] if self.root.name.endswith(suffixes) else []
+        if not self.root.is_dir():
+            return []
+        key = str(self.root.resolve())
+        if self.cache is not None:
+            self._listings = self.cache.get(key) or {}
+        results = []
+        visited = {}
+        stack = [("", self._parent_rules())]
+        while stack:
+            relative, rules = stack.pop()
+            directory = self.root / relative if relative else self.root
+            rules = [*rules, *_load_rules(directory, relative)]
+            listing = self._list(directory, relative)
+            if listing is None:
+                continue
+            visited[relative] = listing
+            _, file_names, directory_names = listing
+            for name in sorted(file_names):
+                path = f"{relative}/{name}" if relative else name
+                if name.endswith(suffixes) and not is_ignored(rules, path, is_dir=False):
+                    results.append(os.path.join(str(self.root), path))
+            for name in sorted(directory_names, reverse=True):
+                path = f"{relative}/{name}" if relative else name
+                if name not in self.skipped_directories and not is_ignored(rules, path, is_dir=True):
+                    stack.append((path, rules))
+        if self.cache is not None and visited != self._listings:
+            self.cache.set(key, visited)
+        return sorted(results)
+
+    def _list(self, directory: Path, relative: str) -> list | None:
+        """The mtime, file names and directory names of a directory, from the index while it is unchanged."""
+        try:
+            mtime_ns = directory.stat().st_mtime_ns
+        except OSError:
+            return None
+        listing = self._listings.get(relative)
+        if listing is not None and listing[0] == mtime_ns:
+            return listing
+        file_names, directory_names = [], []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        directory_names.append(entry.name)
+                    elif entry.is_file():
+                        file_names.append(entry.name)
+        except OSError:
+            return None
+        return [mtime_ns, file_names, directory_names]
+
+    def _parent_rules(self) -> list[IgnoreRule]:
+        """The rules of the .gitignore files of the parents of the root, up to the root of the repository."""
+        root = self.root.resolve()
+        parents = []
+        for parent in root.parents:
+            parents.append(parent)
+            if (parent / ".git").exists():
+                break
+        else:
+            # not inside a repository, so only the rules within the root apply.
+            return []
+        rules = []
+        for parent in reversed(parents):
+            prefix = root.relative_to(parent).as_posix() + "/"
+            rules.extend(replace(rule, prefix=prefix) for rule in _load_rules(parent, ""))
+        return rules
+
+
+def index_files(paths: list[str | Path], suffixes: tuple[str, ...] = (".py",), persist: bool = False) -> list[str]:
+    """The files of many trees with one of the suffixes."""
+    results = []
+    for path in paths:
+        results.extend(FileIndex(path, persist=persist).files(suffixes))
+    return results
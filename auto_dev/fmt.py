@@ -1,112 +1,331 @@
 """Module to format the code."""
 
+import os
+import re
+import hashlib
+import subprocess
+from pathlib import Path
+from functools import partial
+from contextlib import nullcontext, contextmanager
+from contextvars import ContextVar
+from dataclasses import field, dataclass
+from collections.abc import Iterator
 from multiprocessing import Pool
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
-from rich.progress import track
+from requests.adapters import HTTPAdapter
 
+from auto_dev.lint import CHUNKS_PER_PROCESS, chunk_paths, collect_results
+from auto_dev.utils import get_logger
 from auto_dev.constants import DEFAULT_ENCODING, DEFAULT_RUFF_CONFIG
 from auto_dev.cli_executor import CommandExecutor
+from auto_dev.venv_resolver import tool_command
+
+
+# ruff reports the files it could not parse relative to the working directory.
+PARSE_ERROR_PATTERN = re.compile(r"Failed to parse (?P<path>.+?):\d+:\d+:")
+DEFAULT_FORMAT_SERVER_PORT = 26659
+DEFAULT_FORMAT_SERVER_URL = os.environ.get("ADEV_FORMAT_SERVER_URL", f"http://localhost:{DEFAULT_FORMAT_SERVER_PORT}")
+REMOTE_BATCH_SIZE = 64
+# number of batches in flight at once, and so of pooled connections, per process.
+REMOTE_CONCURRENCY = 4
+REMOTE_TIMEOUT = 150
+
+logger = get_logger()
+_sessions: dict[int, requests.Session] = {}
+_format_session: ContextVar["FormatSession | None"] = ContextVar("format_session", default=None)
+
+
+def get_session() -> requests.Session:
+    """A session per process, reusing its connections to the format server across requests."""
+    session = _sessions.get(os.getpid())
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=REMOTE_CONCURRENCY)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _sessions[os.getpid()] = session
+    return session
+
+
+@dataclass
+class FormatResult:
+    """The result of formatting a batch of files."""
+
+    results: dict[str, bool] = field(default_factory=dict)
+    changed: list[str] = field(default_factory=list)
+
+
+def _digest(path: str) -> str | None:
+    """Sha256 of the content of a file, None when it cannot be read."""
+    try:
+        return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+    except OSError:
+        return None
 
 
 class Formatter:
     """Formatter class to run the formatter."""
 
-    def __init__(self, verbose, remote):
+    def __init__(self, verbose, remote, url=DEFAULT_FORMAT_SERVER_URL):
         self.verbose = verbose
         self.remote = remote
+        self.url = url
 
     def format(self, path):
         """Format the path."""
-        func = self._format_path if not self.remote else self._remote_format_path
-        return func(path, verbose=self.verbose)
+        func = self.format_paths if not self.remote else self.format_remote
+        return func([str(path)], verbose=self.verbose).results[str(path)]
 
-    def _remote_format_path(self, path, verbose=False):
-        """Format the path."""
-        # pylint: disable=R1732
-        with requests.Session() as session, open(path, encoding=DEFAULT_ENCODING) as file:
-            data = file.read()
-            result = session.post(
-                "http://localhost:26659/format",
-                data=data.encode(DEFAULT_ENCODING),
-                timeout=150,
-            )
-        if verbose:
-            pass
-
-        if result.json():
-            if "new_data" in result.json():
-                with open(path, "w", encoding=DEFAULT_ENCODING) as file:
-                    file.write(result.json()["new_data"])
-                return True
-            if "result" in result.json():
-                return result.json()["result"]
-
-        return False
-
-    def _format_path(self, path, verbose=False):
-        """Format the path."""
+    def format_paths(self, paths: list[str], verbose: bool = False) -> FormatResult:
+        """Sort the imports of and format a batch of paths, one ruff process per step for the whole batch.
+
+        :param paths: The paths to format.
+        :return: Whether each of the paths was formatted and which of them changed on disk.
+        """
+        if not paths:
+            return FormatResult()
+        before = {path: _digest(path) for path in paths}
+        self.run_sort(*paths, verbose=verbose)
+        command = CommandExecutor(tool_command("ruff", "format", "--config", str(DEFAULT_RUFF_CONFIG), *paths))
+        command.execute(verbose=verbose)
+        # ruff exits with 2 when some of the files could not be formatted, the others are still formatted.
+        unparsable = {
+            Path(match.group("path")).resolve()
+            for line in command.stderr
+            if (match := PARSE_ERROR_PATTERN.search(line)) is not None
+        }
+        if command.return_code not in {0, 2} or (command.return_code == 2 and not unparsable):
+            logger.error(f"Unable to format {len(paths)} files:\n{command.output}")
+            return FormatResult(results=dict.fromkeys(paths, False))
 
-        return all(
-            [
-                self.run_sort(path, verbose=verbose),
-                self.run_format(path, verbose=verbose),
-            ]
+        result = FormatResult()
+        for path in paths:
+            result.results[path] = Path(path).resolve() not in unparsable
+            if _digest(path) != before[path]:
+                result.changed.append(path)
+        return result
+
+    def format_remote(self, paths: list[str], verbose: bool = False) -> FormatResult:
+        """Format the paths with the format server, falling back to the local formatter per file.
+
+        The files are sent in batches, with several requests in flight over the pooled connections.
+
+        :param paths: The paths to format.
+        :return: Whether each of the paths was formatted and which of them changed on disk.
+        """
+        contents = {}
+        for path in paths:
+            try:
+                contents[path] = Path(path).read_text(encoding=DEFAULT_ENCODING)
+            except OSError:
+                logger.exception(f"Unable to read {path}")
+        batches = [
+            dict(list(contents.items())[i : i + REMOTE_BATCH_SIZE]) for i in range(0, len(contents), REMOTE_BATCH_SIZE)
+        ]
+        formatted = {}
+        with ThreadPoolExecutor(max_workers=REMOTE_CONCURRENCY) as executor:
+            for batch_result in executor.map(self._post_batch, batches):
+                formatted.update(batch_result)
+
+        result = FormatResult(results=dict.fromkeys(paths, False))
+        failed = []
+        for path, content in contents.items():
+            new_content = formatted.get(path)
+            if new_content is None:
+                failed.append(path)
+                continue
+            result.results[path] = True
+            if new_content != content:
+                Path(path).write_text(new_content, encoding=DEFAULT_ENCODING)
+                result.changed.append(path)
+        if failed:
+            logger.warning(f"Failed to format {len(failed)} files remotely, trying locally")
+            local = self.format_paths(failed, verbose=verbose)
+            result.results.update(local.results)
+            result.changed.extend(local.changed)
+        return result
+
+    def _post_batch(self, files: dict[str, str]) -> dict[str, str | None]:
+        """Post a batch of files to the format server, nothing is formatted when the server is unavailable."""
+        try:
+            response = get_session().post(f"{self.url}/format/batch", json={"files": files}, timeout=REMOTE_TIMEOUT)
+            response.raise_for_status()
+            return response.json()["files"]
+        except (requests.RequestException, ValueError, KeyError) as error:
+            logger.debug(f"Format server {self.url} failed: {error}")
+            return {}
+
+    def format_content(self, content: str, path: str | Path) -> str:
+        """Sort the imports of and format source code in memory.
+
+        :param content: The source code to format.
+        :param path: The path the code is destined for, used to resolve the configuration.
+        :return: The formatted code, or the code unchanged when it cannot be formatted.
+        """
+        formatted = content
+        for command in (self._sort_command("--stdin-filename", str(path), "-"), self._format_command(path)):
+            result = subprocess.run(command, input=formatted, capture_output=True, text=True, check=False)
+            if result.returncode != 0:
+                if self.verbose:
+                    logger.error(f"Unable to format {path}:\n{result.stderr}")
+                return content
+            formatted = result.stdout
+        return formatted
+
+    def write(self, path: str | Path, content: str) -> bool:
+        """Format the content and write it to the path, unless the file already holds the formatted content.
+
+        :return: Whether the file changed.
+        """
+        path = Path(path)
+        formatted = self.format_content(content, path)
+        if path.exists() and path.read_text(encoding=DEFAULT_ENCODING) == formatted:
+            return False
+        path.write_text(formatted, encoding=DEFAULT_ENCODING)
+        return True
+
+    @staticmethod
+    def _sort_command(*args) -> list[str]:
+        """The command sorting the imports."""
+        return tool_command(
+            "ruff",
+            "check",
+            "--select",
+            "I",
+            "--fix-only",
+            "--exit-zero",
+            "--config",
+            str(DEFAULT_RUFF_CONFIG),
+            *args,
         )
 
     @staticmethod
-    def run_format(path, verbose=False):
-        """Run black on the path."""
-        command = CommandExecutor(["poetry", "run", "ruff", "format", str(path), "--config", str(DEFAULT_RUFF_CONFIG)])
-        return command.execute(verbose=verbose)
+    def _format_command(path) -> list[str]:
+        """The command formatting code read from stdin."""
+        return tool_command("ruff", "format", "--config", str(DEFAULT_RUFF_CONFIG), "--stdin-filename", str(path), "-")
 
     @staticmethod
-    def run_sort(path, verbose=False):
-        """Run sort on the path."""
+    def run_format(*paths, verbose=False):
+        """Run ruff format on the paths."""
         command = CommandExecutor(
-            [
-                "poetry",
-                "run",
-                "ruff",
-                "check",
-                "--select",
-                "I",
-                "--fix",
-                str(path),
-                "--config",
-                str(DEFAULT_RUFF_CONFIG),
-            ]
+            tool_command("ruff", "format", "--config", str(DEFAULT_RUFF_CONFIG), *map(str, paths))
         )
         return command.execute(verbose=verbose)
 
+    @staticmethod
+    def run_sort(*paths, verbose=False):
+        """Run the import sorting on the paths."""
+        command = CommandExecutor(Formatter._sort_command(*map(str, paths)))
+        return command.execute(verbose=verbose)
+
+
+class FormatSession:
+    """Collect the files written while scaffolding, to format them all at once with a single batch.
+
+    Files are written as generated and only formatted when the session is flushed, so a file modified by
+    several steps is formatted once rather than after every step.
+    """
+
+    def __init__(self, verbose: bool = False, remote: bool = False):
+        self.formatter = Formatter(verbose, remote=remote)
+        # an ordered set of the resolved paths, the working directory may change before the session is flushed.
+        self.paths: dict[str, None] = {}
+
+    def add(self, *paths: str | Path) -> None:
+        """Format the paths when the session is flushed."""
+        self.paths.update(dict.fromkeys(str(Path(path).resolve()) for path in paths))
+
+    def write(self, path: str | Path, content: str) -> bool:
+        """Write the content to the path, unless the file already holds it, and format it when flushed.
+
+        :return: Whether the file changed.
+        """
+        path = Path(path)
+        self.add(path)
+        if path.exists() and path.read_text(encoding=DEFAULT_ENCODING) == content:
+            return False
+        path.write_text(content, encoding=DEFAULT_ENCODING)
+        return True
+
+    def flush(self) -> FormatResult:
+        """Format the collected files which still exist in one batch, and start collecting anew."""
+        paths = [path for path in self.paths if Path(path).is_file()]
+        self.paths = {}
+        return _format_chunk(self.formatter, paths)
+
+
+@contextmanager
+def format_session(verbose: bool = False, remote: bool = False) -> Iterator[FormatSession]:
+    """A session collecting the files to format, flushed when the outermost session exits without an error.
+
+    A session opened within another joins it, so a scaffolder used by another one formats along with it.
+    Steps depending on the formatted files, such as fingerprinting, flush the session before they run.
+    """
+    session = _format_session.get()
+    if session is not None:
+        yield session
+        return
+    session = FormatSession(verbose, remote=remote)
+    token = _format_session.set(session)
+    try:
+        yield session
+    finally:
+        _format_session.reset(token)
+    session.flush()
+
 
-def single_thread_fmt(paths, verbose, logger, remote=False):
+def write_formatted(path: str | Path, content: str) -> bool:
+    """Write formatted content to the path, deferring the formatting to the current session if there is one.
+
+    :return: Whether the file changed.
+    """
+    session = _format_session.get()
+    if session is not None:
+        return session.write(path, content)
+    return Formatter(verbose=False, remote=False).write(path, content)
+
+
+def format_later(*paths: str | Path) -> None:
+    """Format the paths with the current session, or right away when there is none."""
+    session = _format_session.get()
+    if session is not None:
+        session.add(*paths)
+        return
+    Formatter(verbose=False, remote=False).format_paths([str(path) for path in paths])
+
+
+def _format_chunk(formatter: Formatter, paths: list[str]) -> FormatResult:
+    """Format a chunk of paths."""
+    func = formatter.format_paths if not formatter.remote else formatter.format_remote
+    return func(paths, verbose=formatter.verbose)
+
+
+def _format_chunk_results(formatter: Formatter, paths: list[str]) -> dict[str, bool]:
+    """Whether each path of a chunk was formatted."""
+    return _format_chunk(formatter, paths).results
+
+
+def single_thread_fmt(paths, verbose, logger, remote=False, max_failures=None):
     """Run the formatting in a single thread."""
-    results = {}
-    formatter = Formatter(verbose, remote=remote)
-    local_formatter = Formatter(verbose, remote=False)
-    for package in track(range(len(paths)), description="Formatting..."):
-        path = paths[package]
-        if verbose:
-            logger.info(f"Formatting: {path}")
-        result = formatter.format(path)
-        if not result and remote:
-            logger.error(f"Failed to format {path} remotely, trying locally")
-            result = local_formatter.format(path)
-        results[package] = result
-    return results
-
-
-def multi_thread_fmt(paths, verbose, num_processes, remote=False):
-    """Run the formatting in multiple threads."""
     formatter = Formatter(verbose, remote=remote)
-    with Pool(num_processes) as pool:
-        results = pool.map(formatter.format, paths)
+    chunks = chunk_paths(paths, 1)
 
-    # We chekc with the local formatter if the remote formatter fails
-    local_formatter = Formatter(verbose, remote=False)
-    for i, result in enumerate(results):
-        if not result:
-            results[i] = local_formatter.format(paths[i])
+    def format_chunks():
+        for chunk in chunks:
+            if verbose:
+                logger.info(f"Formatting: {len(chunk)} files")
+            yield _format_chunk_results(formatter, chunk)
 
-    return dict(zip(paths, results, strict=False))
+    return collect_results(format_chunks(), len(chunks), "Formatting...", max_failures)
+
+
+def multi_thread_fmt(paths, verbose, num_processes, remote=False, pool=None, max_failures=None):
+    """Run the formatting in multiple processes, streaming the results of the chunks as they complete."""
+    formatter = Formatter(verbose, remote=remote)
+    chunks = chunk_paths(paths, num_processes * CHUNKS_PER_PROCESS)
+    # leaving an owned pool terminates it, cancelling the chunks not started once max_failures is reached.
+    with nullcontext(pool) if pool is not None else Pool(num_processes) as workers:
+        chunk_results = workers.imap_unordered(partial(_format_chunk_results, formatter), chunks)
+        return collect_results(chunk_results, len(chunks), "Formatting...", max_failures)
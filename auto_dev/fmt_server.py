@@ -0,0 +1,95 @@
+"""A format server keeping the formatter warm for the `--remote` formatting of many clients."""
+
+import json
+import tempfile
+from http import HTTPStatus
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from auto_dev.fmt import DEFAULT_FORMAT_SERVER_PORT, Formatter
+from auto_dev.utils import get_logger
+from auto_dev.constants import DEFAULT_ENCODING
+from auto_dev.venv_resolver import tool_command
+
+
+DEFAULT_HOST = "localhost"
+# guards the server against clients sending unbounded payloads.
+MAX_REQUEST_SIZE = 64 * 1024 * 1024
+
+logger = get_logger()
+
+
+def format_batch(formatter: Formatter, files: dict[str, str]) -> dict[str, str | None]:
+    """Format the contents of many files at once.
+
+    :param formatter: The formatter to use.
+    :param files: The content of the files keyed by their name.
+    :return: The formatted content keyed by the name, None for the files which could not be formatted.
+    """
+    with tempfile.TemporaryDirectory(prefix="adev-fmt-") as tmp_dir:
+        # the names are only used for their suffix, so clients cannot write outside of the directory.
+        paths = {name: Path(tmp_dir) / f"{i}{Path(name).suffix or '.py'}" for i, name in enumerate(files)}
+        for name, path in paths.items():
+            path.write_text(files[name], encoding=DEFAULT_ENCODING)
+        result = formatter.format_paths([str(path) for path in paths.values()])
+        return {
+            name: path.read_text(encoding=DEFAULT_ENCODING) if result.results[str(path)] else None
+            for name, path in paths.items()
+        }
+
+
+class FormatRequestHandler(BaseHTTPRequestHandler):
+    """Handle the format requests.
+
+    `POST /format` formats the single file in the body, `POST /format/batch` formats the json
+    object `{"files": {name: content}}` and answers with the formatted contents under the same names.
+    """
+
+    # keeps the connections of the pooled clients alive between requests.
+    protocol_version = "HTTP/1.1"
+    server: "FormatServer"
+
+    def do_POST(self) -> None:  # noqa: N802
+        """Format the files of the request."""
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_REQUEST_SIZE:
+            self._respond(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Request too large."})
+            return
+        body = self.rfile.read(length).decode(DEFAULT_ENCODING)
+        if self.path == "/format":
+            formatted = format_batch(self.server.formatter, {"file.py": body})["file.py"]
+            self._respond(HTTPStatus.OK, {"result": False} if formatted is None else {"new_data": formatted})
+        elif self.path == "/format/batch":
+            try:
+                files = json.loads(body)["files"]
+            except (ValueError, KeyError, TypeError):
+                self._respond(HTTPStatus.BAD_REQUEST, {"error": "Expected a json object with the files."})
+                return
+            self._respond(HTTPStatus.OK, {"files": format_batch(self.server.formatter, files)})
+        else:
+            self._respond(HTTPStatus.NOT_FOUND, {"error": f"Unknown endpoint {self.path}."})
+
+    def _respond(self, status: HTTPStatus, payload: dict) -> None:
+        """Send a json response."""
+        data = json.dumps(payload).encode(DEFAULT_ENCODING)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args) -> None:
+        """Log the requests through the adev logger."""
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+class FormatServer(ThreadingHTTPServer):
+    """Serve the format requests of many clients concurrently with a single warm formatter."""
+
+    daemon_threads = True
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_FORMAT_SERVER_PORT, verbose: bool = False):
+        super().__init__((host, port), FormatRequestHandler)
+        self.formatter = Formatter(verbose=verbose, remote=False)
+        # resolves the virtualenv of the tools before the first request.
+        tool_command("ruff")
@@ -11,6 +11,7 @@ from jinja2 import Environment, FileSystemLoader
 from pydantic import BaseModel, ValidationError
 from aea.configurations.base import PublicId
 
+from auto_dev.fmt import format_later, format_session
 from auto_dev.enums import FileType
 from auto_dev.utils import change_dir, get_logger, write_to_file, camel_to_snake
 from auto_dev.constants import DEFAULT_ENCODING, JINJA_TEMPLATE_FOLDER
@@ -65,13 +66,16 @@ class HandlerScaffolder:
 
         try:
             self.generate_handler()
-            with self._change_dir():
-                self.save_handler()
-                self.update_skill_yaml(Path("skill.yaml"))
-                self.move_and_update_my_model()
-                self.remove_behaviours()
-                self.create_dialogues()
-                self.create_exceptions()
+            with format_session() as session:
+                with self._change_dir():
+                    self.save_handler()
+                    self.update_skill_yaml(Path("skill.yaml"))
+                    self.move_and_update_my_model()
+                    self.remove_behaviours()
+                    self.create_dialogues()
+                    self.create_exceptions()
+                # the fingerprints are of the formatted files.
+                session.flush()
             self.fingerprint()
             self.aea_install()
         except ScaffolderError as e:
@@ -360,6 +364,7 @@ class HandlerScaffolder:
     def save_handler(self) -> None:
         """Save handler to file."""
         write_to_file(Path("handlers.py"), self.handler_code, file_type=FileType.PYTHON)
+        format_later(Path("handlers.py"))
 
     def update_skill_yaml(self, file) -> None:
         """Update the skill.yaml file."""
@@ -403,6 +408,7 @@ class HandlerScaffolder:
             ):
                 my_model_file.unlink()
                 strategy_file.write_text(strategy_code, encoding=DEFAULT_ENCODING)
+                format_later(strategy_file)
             else:
                 pass
 
@@ -423,6 +429,7 @@ class HandlerScaffolder:
         dialogues_template = self.jinja_env.get_template("dialogues.jinja")
         with open(dialogues_file, "w", encoding=DEFAULT_ENCODING) as f:
             f.write(dialogues_template.render())
+        format_later(dialogues_file)
 
     def fingerprint(self):
         """Fingerprint the skill."""
@@ -452,6 +459,7 @@ class HandlerScaffolder:
         """Create the exceptions file."""
         exceptions_template = self.jinja_env.get_template("exceptions.jinja").render()
         write_to_file(Path("exceptions.py"), exceptions_template, file_type=FileType.PYTHON)
+        format_later(Path("exceptions.py"))
 
     def present_actions(self):
         """Present the scaffold summary."""
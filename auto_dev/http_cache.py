@@ -0,0 +1,128 @@
+"""An on-disk cache of http responses, revalidated with their ETag and Last-Modified headers."""
+
+import os
+import json
+import time
+import threading
+from typing import Any
+from pathlib import Path
+from dataclasses import dataclass
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from auto_dev.cache import RESULT_CACHE_FILE, DiskCache
+from auto_dev.utils import get_logger
+from auto_dev.constants import DEFAULT_TIMEOUT
+from auto_dev.exceptions import NetworkTimeoutError
+
+
+# responses younger than this are served without asking the server at all, by default every response is
+# revalidated, as a stale "latest release" silently hides updates while an unchanged one costs nothing.
+DEFAULT_TTL = 0
+MAX_CACHED_RESPONSES = 1_000
+POOL_SIZE = 8
+# statuses of an exhausted rate limit, which a stale response is better than.
+RATE_LIMITED = frozenset({403, 429})
+
+logger = get_logger()
+
+
+@dataclass
+class CachedResponse:
+    """The status and body of a response, either fresh from the server or from the cache."""
+
+    status_code: int
+    text: str
+    from_cache: bool = False
+
+    def json(self) -> Any:
+        """The body, parsed as json."""
+        return json.loads(self.text)
+
+
+class HttpCache:
+    """Get urls through a persistent cache of their responses.
+
+    Successful responses are kept with their ETag and Last-Modified headers and revalidated with a conditional
+    request, which github does not count against its rate limit when the response is still current. Within an
+    explicit ttl they are served without a request. Offline, responses are only served from the cache.
+    """
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_TTL,
+        offline: bool = False,
+        path: str | Path = RESULT_CACHE_FILE,
+        namespace: str = "http",
+    ):
+        self.ttl = ttl
+        self.offline = offline
+        self.path = path
+        self.namespace = namespace
+        self._local = threading.local()
+        self._sessions: dict[int, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self) -> DiskCache:
+        """The cache of the current thread, as sqlite connections cannot be shared between threads."""
+        if getattr(self._local, "cache", None) is None:
+            self._local.cache = DiskCache(self.namespace, path=self.path, max_entries=MAX_CACHED_RESPONSES)
+        return self._local.cache
+
+    @property
+    def session(self) -> requests.Session:
+        """A session per process, reusing its connections across the requests."""
+        with self._lock:
+            session = self._sessions.get(os.getpid())
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_maxsize=POOL_SIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[os.getpid()] = session
+            return session
+
+    def get(self, url: str, headers: dict[str, str] | None = None, timeout: float = DEFAULT_TIMEOUT) -> CachedResponse:
+        """Get the url, from the cache while it is fresh or unchanged on the server.
+
+        :raises NetworkTimeoutError: offline, when the url was never cached.
+        """
+        headers = dict(headers or {})
+        key = f"{headers.get('Accept', '')} {url}"
+        entry = self.cache.get(key)
+        if self.offline:
+            if entry is None:
+                msg = f"Offline and no cached response for {url}"
+                raise NetworkTimeoutError(msg)
+            return CachedResponse(entry["status_code"], entry["text"], from_cache=True)
+        if entry is not None and time.time() - entry["fetched_at"] < self.ttl:
+            return CachedResponse(entry["status_code"], entry["text"], from_cache=True)
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = self.session.get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304 and entry is not None:
+            self.cache.set(key, {**entry, "fetched_at": time.time()})
+            return CachedResponse(entry["status_code"], entry["text"], from_cache=True)
+        if response.status_code in RATE_LIMITED and entry is not None:
+            logger.warning(
+                f"Rate limited by {url}, using the response cached {time.time() - entry['fetched_at']:.0f}s ago"
+            )
+            return CachedResponse(entry["status_code"], entry["text"], from_cache=True)
+        if response.status_code == 200:
+            self.cache.set(
+                key,
+                {
+                    "status_code": response.status_code,
+                    "text": response.text,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "fetched_at": time.time(),
+                },
+            )
+        return CachedResponse(response.status_code, response.text)
@@ -1,18 +1,33 @@
 """Simple linting tooling for autonomy repos."""
 
+import json
+import math
+from pathlib import Path
+from collections.abc import Iterable
+
+from rich.progress import track
+
+from auto_dev.utils import get_logger
 from auto_dev.constants import DEFAULT_RUFF_CONFIG
+from auto_dev.venv_resolver import tool_command
 
 from .cli_executor import CommandExecutor
 
 
+# keeps the command line of a single ruff process well within the argument limits.
+MAX_CHUNK_SIZE = 256
+# more chunks than processes, so results stream in as they complete and the work can stop early.
+CHUNKS_PER_PROCESS = 4
+
+logger = get_logger()
+
+
 def check_path(path: str, verbose: bool = False) -> bool:
     """Check the path for linting errors.
     :param path: The path to check.
     """
     command = CommandExecutor(
-        [
-            "poetry",
-            "run",
+        tool_command(
             "ruff",
             "check",
             "--fix",
@@ -20,7 +35,84 @@ def check_path(path: str, verbose: bool = False) -> bool:
             path,
             "--config",
             str(DEFAULT_RUFF_CONFIG),
-        ]
+        )
     )
     # We now
     return command.execute(verbose=verbose)
+
+
+def chunk_paths(paths: list[str], num_chunks: int) -> list[list[str]]:
+    """Split the paths into at most `num_chunks` chunks, none larger than MAX_CHUNK_SIZE."""
+    if not paths:
+        return []
+    chunk_size = min(max(math.ceil(len(paths) / max(num_chunks, 1)), 1), MAX_CHUNK_SIZE)
+    return [paths[i : i + chunk_size] for i in range(0, len(paths), chunk_size)]
+
+
+def check_paths(paths: list[str], verbose: bool = False) -> dict[str, bool]:
+    """Check a batch of paths for linting errors with a single ruff process.
+    :param paths: The paths to check.
+    :return: Whether each of the paths passed.
+    """
+    command = CommandExecutor(
+        tool_command(
+            "ruff",
+            "check",
+            "--fix",
+            "--unsafe-fixes",
+            "--output-format",
+            "json",
+            "--config",
+            str(DEFAULT_RUFF_CONFIG),
+            *paths,
+        )
+    )
+    command.execute(verbose=False)
+    # ruff exits with 1 when violations remain and with 2 when it could not run at all.
+    diagnostics = None
+    if command.return_code in {0, 1}:
+        try:
+            diagnostics = json.loads("\n".join(command.stdout) or "[]")
+        except ValueError:
+            diagnostics = None
+    if diagnostics is None:
+        logger.error(f"Unable to lint {len(paths)} files:\n{command.output}")
+        return dict.fromkeys(paths, False)
+
+    failed = {}
+    for diagnostic in diagnostics:
+        failed.setdefault(Path(diagnostic["filename"]).resolve(), []).append(diagnostic)
+    results = {}
+    for path in paths:
+        path_diagnostics = failed.get(Path(path).resolve(), [])
+        results[path] = not path_diagnostics
+        if verbose:
+            for diagnostic in path_diagnostics:
+                location = diagnostic["location"]
+                logger.error(
+                    f"{path}:{location['row']}:{location['column']}: {diagnostic['code'] or ''} {diagnostic['message']}"
+                )
+    return results
+
+
+def collect_results(
+    chunk_results: Iterable[dict[str, bool]],
+    total: int,
+    description: str,
+    max_failures: int | None = None,
+) -> dict[str, bool]:
+    """Collect the results of the chunks as they complete, with a progress bar.
+
+    :param chunk_results: The results of every chunk, in the order they complete.
+    :param total: The number of chunks.
+    :param max_failures: Stop once this many files failed, the remaining chunks are not collected.
+    :return: Whether each of the collected paths passed.
+    """
+    results = {}
+    failures = 0
+    for chunk_result in track(chunk_results, total=total, description=description):
+        results.update(chunk_result)
+        failures += sum(not passed for passed in chunk_result.values())
+        if max_failures is not None and failures >= max_failures:
+            break
+    return results
@@ -0,0 +1,65 @@
+"""The logger of auto_dev, kept apart from the utilities so the cli starts without importing aea."""
+
+import logging
+
+from rich.logging import RichHandler
+
+
+def reset_logging():
+    """Forcefully remove any existing logging configuration."""
+    # Clear all handlers from the root logger
+    for handler in logging.root.handlers[:]:
+        logging.root.removeHandler(handler)
+
+    # Optionally, reset the root logger's level
+    logging.root.setLevel(logging.NOTSET)
+
+
+# Call reset_logging before applying your new configuration
+
+
+LOGGER = None
+# the name the logger had before it moved out of auto_dev.utils.
+LOGGER_NAME = "auto_dev.utils"
+
+
+def get_logger(name: str = LOGGER_NAME, log_level: str = "INFO") -> logging.Logger:
+    """Get the configured logger.
+
+    Args:
+    ----
+        name (str): The name of the logger.
+        log_level (str): The logging level.
+
+    Returns:
+    -------
+        logging.Logger: Configured logger instance.
+
+    """
+    global LOGGER  # noqa
+    if LOGGER:
+        return LOGGER
+    reset_logging()
+    # Reset any existing logging configuration
+    for handler in logging.root.handlers[:]:
+        logging.root.removeHandler(handler)
+    logging.root.setLevel(logging.NOTSET)  # Reset root logger level
+
+    handler = RichHandler(
+        rich_tracebacks=True,
+        markup=True,
+        show_path=False,
+        tracebacks_show_locals=True,
+        enable_link_path=True,
+    )
+
+    datefmt = "%H:%M:%S"
+    logging.basicConfig(
+        level=getattr(logging, log_level.upper(), "INFO"),
+        datefmt=datefmt,
+        format="%(message)s",
+        handlers=[handler],
+    )
+    log = logging.getLogger(name)
+    log.setLevel(getattr(logging, log_level.upper(), "INFO"))
+    return log
@@ -0,0 +1,148 @@
+"""Cached loading of package yaml configurations, keyed by the path, modification time and size of their files."""
+
+import copy
+import json
+import threading
+from pathlib import Path
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+
+import yaml
+from aea.configurations.base import (
+    PackageConfiguration,
+    _get_default_configuration_file_name_from_type,  # noqa
+)
+from aea.configurations.loader import ConfigLoader
+from aea.configurations.data_types import PackageType
+
+from auto_dev.cache import RESULT_CACHE_FILE, DiskCache
+from auto_dev.utils import get_logger
+from auto_dev.constants import DEFAULT_ENCODING
+
+
+# the libyaml parser is an order of magnitude faster than the pure python one, when installed.
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+MAX_CACHED_FILES = 10_000
+MAX_WORKERS = 8
+
+logger = get_logger()
+
+
+def configuration_file(package_type: PackageType, package_path: str | Path) -> Path:
+    """The configuration file of a package of the given type."""
+    return Path(package_path) / _get_default_configuration_file_name_from_type(PackageType(package_type))
+
+
+def file_key(path: Path) -> str:
+    """Identify a version of a file by its path, modification time and size.
+
+    :raises FileNotFoundError: when the file does not exist.
+    """
+    stat = path.stat()
+    return f"{path.resolve()}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def configuration_from_documents(package_type: PackageType, documents: list[dict]) -> PackageConfiguration:
+    """Validate the documents of a configuration file and build the configuration of the package type.
+
+    The same as `aea.package_manager.base.load_configuration`, given the already parsed documents.
+    """
+    package_type = PackageType(package_type)
+    loader = ConfigLoader.from_configuration_type(package_type)
+    if package_type == PackageType.AGENT:
+        return loader.load_agent_config_from_json(documents)
+    if not documents:
+        msg = f"The {package_type.value} configuration file was empty."
+        raise ValueError(msg)
+    configuration_json, *overrides = documents
+    loader.validate(configuration_json)
+    configuration = loader.configuration_class.from_json(configuration_json)
+    configuration._key_order = list(configuration_json)  # noqa: SLF001
+    if package_type == PackageType.SERVICE:
+        configuration.overrides = overrides
+    return configuration
+
+
+def _json_round_trips(documents: list) -> bool:
+    """Whether the documents survive the json the disk cache stores, unlike dates or non string keys."""
+    try:
+        return json.loads(json.dumps(documents)) == documents
+    except (TypeError, ValueError):
+        return False
+
+
+class ConfigurationCache:
+    """Parse every version of a yaml file once, keeping the documents in memory and on disk.
+
+    A file is known by its path, modification time and size, so an edited file is parsed again. The documents
+    are handed out as copies, so callers are free to modify them.
+    """
+
+    def __init__(self, path: str | Path = RESULT_CACHE_FILE, namespace: str = "configurations"):
+        self.path = path
+        self.namespace = namespace
+        self._documents: dict[str, list] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self) -> DiskCache:
+        """The cache of the current thread, as sqlite connections cannot be shared between threads."""
+        if getattr(self._local, "cache", None) is None:
+            self._local.cache = DiskCache(self.namespace, path=self.path, max_entries=MAX_CACHED_FILES)
+        return self._local.cache
+
+    def load_documents(self, path: str | Path) -> list:
+        """The documents of a yaml file.
+
+        :raises FileNotFoundError: when the file does not exist.
+        """
+        path = Path(path)
+        key = file_key(path)
+        with self._lock:
+            documents = self._documents.get(key)
+        if documents is None:
+            documents = self.cache.get(key)
+            if documents is None:
+                with open(path, encoding=DEFAULT_ENCODING) as file:
+                    documents = list(yaml.load_all(file, Loader=YAML_LOADER))
+                if _json_round_trips(documents):
+                    self.cache.set(key, documents)
+                else:
+                    logger.debug(f"Not caching {path} on disk, its documents have no exact json representation")
+            with self._lock:
+                self._documents[key] = documents
+        return copy.deepcopy(documents)
+
+    def load(self, package_type: PackageType, package_path: str | Path) -> PackageConfiguration:
+        """The validated configuration of a package."""
+        configuration = configuration_from_documents(
+            package_type, self.load_documents(configuration_file(package_type, package_path))
+        )
+        configuration._directory = Path(package_path)  # noqa: SLF001
+        return configuration
+
+    def load_many(
+        self,
+        packages: Iterable[tuple[PackageType, str | Path]],
+        max_workers: int = MAX_WORKERS,
+    ) -> list[PackageConfiguration]:
+        """The configurations of the packages, given by their type and path, loaded in parallel and in order."""
+        packages = list(packages)
+        if not packages:
+            return []
+        with ThreadPoolExecutor(min(max_workers, len(packages))) as executor:
+            return list(executor.map(lambda package: self.load(*package), packages))
+
+
+configuration_cache = ConfigurationCache()
+
+
+def load_yaml_documents(path: str | Path) -> list:
+    """The documents of a yaml file, through the configuration cache."""
+    return configuration_cache.load_documents(path)
+
+
+def load_package_configuration(package_type: PackageType, package_path: str | Path) -> PackageConfiguration:
+    """The validated configuration of a package, through the configuration cache."""
+    return configuration_cache.load(package_type, package_path)
@@ -0,0 +1,186 @@
+"""Incrementally mirror package directories, only touching the files which differ."""
+
+import os
+import stat
+import shutil
+import contextlib
+from pathlib import Path
+from dataclasses import field, dataclass
+from concurrent.futures import ThreadPoolExecutor
+
+from auto_dev.cache import hash_file
+from auto_dev.utils import get_logger
+
+
+# the linux ioctl cloning a file into another, sharing their extents until either is written.
+FICLONE = 0x40049409
+MAX_WORKERS = 8
+
+logger = get_logger()
+
+
+@dataclass
+class SyncPlan:
+    """The changes mirroring a source directory into a target directory takes."""
+
+    source: Path | None
+    target: Path
+    copies: list[str] = field(default_factory=list)
+    removals: list[str] = field(default_factory=list)
+    stale_directories: list[str] = field(default_factory=list)
+    unchanged: int = 0
+    copy_bytes: int = 0
+
+    @property
+    def changed(self) -> bool:
+        """Whether the target differs from the source."""
+        return bool(self.copies or self.removals or self.stale_directories)
+
+    @property
+    def summary(self) -> str:
+        """The files and bytes the sync touches."""
+        return (
+            f"{len(self.copies)} files to copy ({self.copy_bytes} bytes), "
+            f"{len(self.removals)} to remove, {self.unchanged} unchanged"
+        )
+
+
+def _list_tree(root: Path | None) -> tuple[dict[str, os.stat_result], set[str]]:
+    """The stats of the files and the directories below a root, relative to it.
+
+    A symlinked directory is listed as a file, so the link itself is mirrored rather than the tree it points to.
+    """
+    files, directories = {}, set()
+    if root is None or not root.is_dir():
+        return files, directories
+    for directory, directory_names, file_names in os.walk(root):
+        relative = os.path.relpath(directory, root)
+        for name in directory_names:
+            path = os.path.normpath(os.path.join(relative, name))
+            if Path(directory, name).is_symlink():
+                files[path] = Path(directory, name).stat(follow_symlinks=False)
+            else:
+                directories.add(path)
+        for name in file_names:
+            path = os.path.normpath(os.path.join(relative, name))
+            files[path] = Path(directory, name).stat(follow_symlinks=False)
+    return files, directories
+
+
+def _same_file(source: Path, target: Path, source_stat: os.stat_result, target_stat: os.stat_result) -> bool:
+    """Whether two files have the same content, only hashing them when their sizes match."""
+    if (source_stat.st_dev, source_stat.st_ino) == (target_stat.st_dev, target_stat.st_ino):
+        return True
+    if stat.S_ISLNK(source_stat.st_mode) or stat.S_ISLNK(target_stat.st_mode):
+        return (
+            stat.S_ISLNK(source_stat.st_mode)
+            and stat.S_ISLNK(target_stat.st_mode)
+            and source.readlink() == target.readlink()
+        )
+    if source_stat.st_size != target_stat.st_size:
+        return False
+    return hash_file(source) == hash_file(target)
+
+
+def plan_sync(source: str | Path | None, target: str | Path) -> SyncPlan:
+    """Compare a source directory with a target directory by the sizes and hashes of their files.
+
+    Without a source, the package is to be removed, so every file of the target is stale.
+
+    :raises FileNotFoundError: when the source is not a directory.
+    """
+    source, target = (Path(source) if source is not None else None), Path(target)
+    if source is not None and not source.is_dir():
+        msg = f"Package {source} does not exist"
+        raise FileNotFoundError(msg)
+    plan = SyncPlan(source, target)
+    source_files, source_directories = _list_tree(source)
+    target_files, target_directories = _list_tree(target)
+    for path, source_stat in sorted(source_files.items()):
+        target_stat = target_files.get(path)
+        if target_stat is not None and _same_file(source / path, target / path, source_stat, target_stat):
+            plan.unchanged += 1
+            continue
+        plan.copies.append(path)
+        plan.copy_bytes += source_stat.st_size
+    plan.removals = sorted(set(target_files) - set(source_files))
+    # the deepest first, so every directory is empty once removed.
+    plan.stale_directories = sorted(target_directories - source_directories, key=lambda path: -path.count(os.sep))
+    return plan
+
+
+def _reflink(source: Path, target: Path) -> bool:
+    """Clone a file on file systems supporting it, such as btrfs and xfs."""
+    try:
+        import fcntl  # noqa: PLC0415
+    except ImportError:
+        return False
+    try:
+        with open(source, "rb") as source_file, open(target, "wb") as target_file:
+            fcntl.ioctl(target_file.fileno(), FICLONE, source_file.fileno())
+    except OSError:
+        # not supported by the file system, or across file systems; copying reports any other error.
+        with contextlib.suppress(OSError):
+            target.unlink()
+        return False
+    shutil.copystat(source, target)
+    return True
+
+
+def link_or_copy(source: Path, target: Path, hardlink: bool = False) -> None:
+    """Put the file at the target, as a hardlink when asked, a reflink when possible and a copy otherwise.
+
+    The target is replaced rather than written through, so a target hardlinked to another file leaves it intact.
+    """
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if target.exists() or target.is_symlink():
+        target.unlink()
+    if hardlink:
+        try:
+            os.link(source, target)
+            return
+        except OSError as error:
+            logger.debug(f"Unable to hardlink {source}, copying it instead: {error}")
+    if source.is_symlink():
+        target.symlink_to(source.readlink())
+        return
+    if not _reflink(source, target):
+        shutil.copy2(source, target)
+
+
+def apply_sync(plan: SyncPlan, hardlink: bool = False) -> None:
+    """Mirror the source into the target as planned, removing the stale paths before copying."""
+    for path in plan.removals:
+        with contextlib.suppress(FileNotFoundError):
+            (plan.target / path).unlink()
+    for path in plan.stale_directories:
+        shutil.rmtree(plan.target / path, ignore_errors=True)
+    if plan.source is None:
+        with contextlib.suppress(OSError):
+            plan.target.rmdir()
+    for path in plan.copies:
+        link_or_copy(plan.source / path, plan.target / path, hardlink=hardlink)
+
+
+def sync_packages(
+    pairs: list[tuple[Path | None, Path]],
+    dry_run: bool = False,
+    hardlink: bool = False,
+    max_workers: int = MAX_WORKERS,
+) -> list[SyncPlan]:
+    """Mirror every source directory into its target, the independent packages in parallel.
+
+    :param pairs: The source and target directory of every package, a package without a source is removed.
+    :param dry_run: Only plan the changes, without touching the targets.
+    :param hardlink: Hardlink the copied files, so the targets share them with the sources.
+    :return: The plan of every package, in the order of the pairs.
+    """
+
+    def sync(pair: tuple[Path | None, Path]) -> SyncPlan:
+        plan = plan_sync(*pair)
+        if not dry_run:
+            apply_sync(plan, hardlink=hardlink)
+        return plan
+
+    with ThreadPoolExecutor(max(min(max_workers, len(pairs)), 1)) as executor:
+        return list(executor.map(sync, pairs))
@@ -0,0 +1,185 @@
+"""Import-time profiling of the adev startup.
+
+This module must only depend on the standard library, as it is imported before anything else
+in `auto_dev.cli` so that the import hook sees every module adev loads.
+"""
+
+import sys
+import json
+import time
+import builtins
+import importlib
+import importlib.util
+from typing import Any
+from pathlib import Path
+from dataclasses import field, dataclass
+
+
+PROFILE_STARTUP_FLAG = "--profile-startup"
+DEFAULT_STARTUP_BUDGET_MS = 1000.0
+MIN_REPORTED_MS = 5.0
+
+
+@dataclass
+class ImportRecord:
+    """A module imported during startup along with the imports it triggered."""
+
+    name: str
+    cumulative_ms: float = 0.0
+    children: list["ImportRecord"] = field(default_factory=list)
+
+    @property
+    def self_ms(self) -> float:
+        """The time spent in the module itself, excluding its child imports."""
+        return max(self.cumulative_ms - sum(child.cumulative_ms for child in self.children), 0.0)
+
+    def sort(self) -> None:
+        """Sort the tree by cumulative import time, slowest first."""
+        self.children.sort(key=lambda child: child.cumulative_ms, reverse=True)
+        for child in self.children:
+            child.sort()
+
+    def walk(self):
+        """Iterate over all the records of the tree."""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def to_json(self) -> dict[str, Any]:
+        """Serialise the tree."""
+        return {
+            "name": self.name,
+            "cumulative_ms": round(self.cumulative_ms, 3),
+            "self_ms": round(self.self_ms, 3),
+            "children": [child.to_json() for child in self.children],
+        }
+
+
+@dataclass
+class StartupReport:
+    """The result of profiling the startup of adev."""
+
+    root: ImportRecord
+    total_ms: float
+    budget_ms: float
+    argv: list[str]
+
+    @property
+    def within_budget(self) -> bool:
+        """Whether the startup stayed within the budget."""
+        return self.total_ms <= self.budget_ms
+
+    def slowest(self, count: int = 20) -> list[ImportRecord]:
+        """The modules with the highest self time."""
+        records = [record for record in self.root.walk() if record is not self.root]
+        return sorted(records, key=lambda record: record.self_ms, reverse=True)[:count]
+
+    def to_json(self) -> dict[str, Any]:
+        """Serialise the report."""
+        return {
+            "argv": self.argv,
+            "total_ms": round(self.total_ms, 3),
+            "budget_ms": self.budget_ms,
+            "within_budget": self.within_budget,
+            "modules": sum(1 for _ in self.root.walk()) - 1,
+            "slowest": [{"name": record.name, "self_ms": round(record.self_ms, 3)} for record in self.slowest()],
+            "tree": self.root.to_json(),
+        }
+
+    def write(self, path: str | Path) -> Path:
+        """Write the report as json."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_json(), indent=2), encoding="utf-8")
+        return path
+
+    def render(self, min_ms: float = MIN_REPORTED_MS):
+        """Render the import tree, hiding modules cheaper than `min_ms`."""
+        from rich.tree import Tree  # noqa: PLC0415
+
+        status = "[green]within" if self.within_budget else "[red]over"
+        tree = Tree(f"adev startup: {self.total_ms:.1f} ms ({status} budget of {self.budget_ms:.0f} ms[/])")
+
+        def add(branch: Tree, record: ImportRecord) -> None:
+            for child in record.children:
+                if child.cumulative_ms < min_ms:
+                    continue
+                label = f"{child.name} [dim]{child.cumulative_ms:.1f} ms (self {child.self_ms:.1f} ms)[/dim]"
+                add(branch.add(label), child)
+
+        add(tree, self.root)
+        return tree
+
+
+class ImportProfiler:
+    """Profile imports by wrapping `builtins.__import__` and `importlib.import_module`.
+
+    Only imports which load new modules are recorded, so the tree reflects what adev
+    actually paid for rather than every repeated import statement. Wrapping `import_module`
+    covers the commands the cli loads lazily, which do not go through `__import__`.
+    """
+
+    current: "ImportProfiler | None" = None
+
+    def __init__(self) -> None:
+        self.root = ImportRecord("<adev>")
+        self._stack = [self.root]
+        self._original_import = builtins.__import__
+        self._original_import_module = importlib.import_module
+        self._started = time.perf_counter()
+        self._stopped = None
+
+    @classmethod
+    def install(cls) -> "ImportProfiler":
+        """Install the profiler, it stays active until stopped."""
+        if cls.current is None:
+            cls.current = cls()
+            builtins.__import__ = cls.current._import  # noqa: SLF001
+            importlib.import_module = cls.current._import_module  # noqa: SLF001
+        return cls.current
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        """Import the module, timing it if it is not already loaded."""
+        if level == 0 and name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+        module_name = name
+        if level:
+            package = (globals or {}).get("__package__") or ""
+            module_name = importlib.util.resolve_name("." * level + name, package)
+        return self._timed(module_name, self._original_import, name, globals, locals, fromlist, level)
+
+    def _import_module(self, name, package=None):
+        """Import the module by name, timing it if it is not already loaded."""
+        module_name = importlib.util.resolve_name(name, package) if name.startswith(".") else name
+        if module_name in sys.modules:
+            return self._original_import_module(name, package)
+        return self._timed(module_name, self._original_import_module, name, package)
+
+    def _timed(self, module_name, import_function, *args):
+        """Import with the function, recording the time under the module when it loads new modules."""
+        record = ImportRecord(module_name)
+        parent = self._stack[-1]
+        self._stack.append(record)
+        loaded = len(sys.modules)
+        start = time.perf_counter()
+        try:
+            return import_function(*args)
+        finally:
+            record.cumulative_ms = (time.perf_counter() - start) * 1000
+            self._stack.pop()
+            if len(sys.modules) > loaded:
+                parent.children.append(record)
+
+    def stop(self, budget_ms: float = DEFAULT_STARTUP_BUDGET_MS) -> StartupReport:
+        """Remove the hook and build the report."""
+        if builtins.__import__ == self._import:
+            builtins.__import__ = self._original_import
+        if importlib.import_module == self._import_module:
+            importlib.import_module = self._original_import_module
+        if self._stopped is None:
+            self._stopped = time.perf_counter()
+        if ImportProfiler.current is self:
+            ImportProfiler.current = None
+        self.root.cumulative_ms = (self._stopped - self._started) * 1000
+        self.root.sort()
+        return StartupReport(root=self.root, total_ms=self.root.cumulative_ms, budget_ms=budget_ms, argv=sys.argv[1:])
@@ -1,22 +1,41 @@
 """Protocol scaffolder."""
 
+import io
 import re
 import ast
+import copy
+import shutil
 import datetime
-import tempfile
 import textwrap
-import subprocess
 from pathlib import Path
+from functools import cache
 from itertools import starmap
 from collections import namedtuple
 
 import yaml
 from jinja2 import Environment, FileSystemLoader
+from aea.cli.fingerprint import fingerprint_package
+from aea.configurations.base import (
+    ProtocolSpecification as AeaProtocolSpecification,
+    ProtocolSpecificationParseError,
+)
+from aea.configurations.loader import ConfigLoader
+from aea.configurations.constants import DEFAULT_AEA_CONFIG_FILE, PROTOCOL_LANGUAGE_PYTHON
 from aea.protocols.generator.base import ProtocolGenerator
-
-from auto_dev.fmt import Formatter
+from aea.configurations.data_types import PackageType
+from aea.protocols.generator.common import (
+    PATH_TO_PACKAGES,
+    _to_camel_case,  # noqa: PLC2701
+    get_protoc_version,
+    check_prerequisites,
+)
+from aea.protocols.generator.validate import validate
+from aea.protocols.generator.extract_specification import extract
+
+from auto_dev.fmt import format_later, format_session, write_formatted
 from auto_dev.utils import currenttz, get_logger, remove_prefix, camel_to_snake, snake_to_camel
 from auto_dev.constants import DEFAULT_ENCODING, JINJA_TEMPLATE_FOLDER
+from auto_dev.package_config import file_key
 from auto_dev.data.connections.template import HEADER
 
 
@@ -38,8 +57,19 @@ README_TEMPLATE = """
 """
 
 
-def read_protocol(filepath: str) -> ProtocolSpecification:
-    """Read protocol specification."""
+def validate_protocol(content: str) -> AeaProtocolSpecification:
+    """Parse and validate a protocol specification as the aea protocol generator does, without running it."""
+    loader = ConfigLoader("protocol-specification_schema.json", AeaProtocolSpecification)
+    specification = loader.load_protocol_specification(io.StringIO(content))
+    valid, message = validate(specification)
+    if not valid:
+        raise ProtocolSpecificationParseError(message)
+    return specification
+
+
+@cache
+def _read_protocol(filepath: str, version: str) -> tuple[AeaProtocolSpecification, ProtocolSpecification]:  # noqa: ARG001
+    """Read a version of a protocol specification, the version only keying the cache."""
     content = Path(filepath).read_text(encoding=DEFAULT_ENCODING)
     if "```" in content:
         if content.count("```") != 2:
@@ -47,15 +77,50 @@ def read_protocol(filepath: str) -> ProtocolSpecification:
             raise ValueError(msg)
         content = remove_prefix(content.split("```")[1], "yaml")
 
-    # use ProtocolGenerator to validate the specification
+    specification = validate_protocol(content)
+    metadata, custom_types, speech_acts = yaml.safe_load_all(content)
+
+    return specification, ProtocolSpecification(metadata, custom_types, speech_acts)
 
-    with tempfile.NamedTemporaryFile(mode="w", delete=False, encoding="utf-8") as temp_file:
-        Path(temp_file.name).write_text(content, encoding=DEFAULT_ENCODING)
-        ProtocolGenerator(temp_file.name)
 
-    metadata, custom_types, speech_acts = yaml.safe_load_all(content)
+def read_protocol(filepath: str) -> ProtocolSpecification:
+    """Read protocol specification.
+
+    Every version of a file is parsed and validated once, each caller gets its own copy.
+    """
+    path = Path(filepath)
+    return copy.deepcopy(_read_protocol(str(path.resolve()), file_key(path))[1])
+
 
-    return ProtocolSpecification(metadata, custom_types, speech_acts)
+def load_protocol_specification(filepath: str) -> AeaProtocolSpecification:
+    """Load the validated aea protocol specification, from the same cache as `read_protocol`."""
+    path = Path(filepath)
+    return copy.deepcopy(_read_protocol(str(path.resolve()), file_key(path))[0])
+
+
+class SpecificationProtocolGenerator(ProtocolGenerator):
+    """The aea protocol generator, built from an already parsed and validated specification."""
+
+    def __init__(  # pylint: disable=super-init-not-called
+        self,
+        specification: AeaProtocolSpecification,
+        path_to_protocol_specification: str,
+        project_dir: str | None = None,
+    ) -> None:
+        """Set up the generator as `ProtocolGenerator` does, without loading and validating the file again."""
+        check_prerequisites()
+        self.protoc_version = get_protoc_version()
+        self.protocol_specification = specification
+        self.spec = extract(specification)
+        self.path_to_protocol_specification = path_to_protocol_specification
+        self.protocol_specification_in_camel_case = _to_camel_case(specification.name)
+        output_path = Path(project_dir or Path.cwd()) / PackageType.PROTOCOL.to_plural()
+        output_path.mkdir(parents=True, exist_ok=True)
+        self.path_to_generated_protocol_package = str(output_path / specification.name)
+        self.dotted_path_to_protocol_package = (
+            f"{PATH_TO_PACKAGES}.{specification.author}.protocols.{specification.name}"
+        )
+        self.indent = ""
 
 
 def get_dummy_data(field):
@@ -146,17 +211,13 @@ class EnumModifier:
 
         modified_code = ast.unparse(root)
         updated_content = self._update_content(content, modified_code)
-        self._format_and_write_to_file(custom_types_path, updated_content)
-        self.logger.info(f"Updated: {custom_types_path}")
+        if write_formatted(custom_types_path, updated_content):
+            self.logger.info(f"Updated: {custom_types_path}")
 
     def _update_content(self, content: str, modified_code: str):
         i = content.find(modified_code.split("\n")[0])
         return content[:i] + modified_code
 
-    def _format_and_write_to_file(self, file_path: Path, content: str) -> None:
-        file_path.write_text(content)
-        Formatter(verbose=False, remote=False).format(file_path)
-
     def _process_enum(self, node: ast.ClassDef, enums) -> None:
         camel_to_snake(node.name)
         node.bases = [ast.Name(id="Enum", ctx=ast.Load())]
@@ -333,58 +394,89 @@ class ProtocolScaffolder:
         self.protocol_specification_path = protocol_specification_path
         self.logger.info(f"Read protocol specification: {protocol_specification_path}")
 
-    def generate(self) -> None:
-        """Generate protocol."""
-        command = f"aea -s generate protocol {self.protocol_specification_path} --l {self.language}"
-        result = subprocess.run(command, shell=True, capture_output=True, check=False)
-        if result.returncode != 0:
-            msg = f"Protocol scaffolding failed: {result.stderr}"
+    def generate_package(self) -> Path:
+        """Generate the protocol package and add it to the agent, as `aea generate protocol` does, in process."""
+        agent_config_file = Path.cwd() / DEFAULT_AEA_CONFIG_FILE
+        if not agent_config_file.exists():
+            msg = f"Protocol scaffolding failed: {agent_config_file} not found, are you in an agent directory?"
             raise ValueError(msg)
+        generator = None
+        try:
+            generator = SpecificationProtocolGenerator(
+                load_protocol_specification(self.protocol_specification_path),
+                self.protocol_specification_path,
+                project_dir=str(Path.cwd()),
+            )
+            protocol_path = Path(generator.path_to_generated_protocol_package)
+            if protocol_path.exists():
+                msg = f"A directory with name '{protocol_path.name}' already exists."
+                raise FileExistsError(msg)
+            warning = generator.generate(
+                protobuf_only=self.language != PROTOCOL_LANGUAGE_PYTHON, language=self.language
+            )
+            if warning is not None:
+                self.logger.warning(warning)
+            if self.language == PROTOCOL_LANGUAGE_PYTHON:
+                loader = ConfigLoader.from_configuration_type(PackageType.AGENT)
+                with open(agent_config_file, encoding=DEFAULT_ENCODING) as file:
+                    agent_config = loader.load(file)
+                agent_config.protocols.add(generator.protocol_specification.public_id)
+                with open(agent_config_file, "w", encoding=DEFAULT_ENCODING) as file:
+                    loader.dump(agent_config, file)
+        except Exception as error:
+            if generator is not None and not isinstance(error, FileExistsError):
+                shutil.rmtree(generator.path_to_generated_protocol_package, ignore_errors=True)
+            msg = f"Protocol scaffolding failed: {error}"
+            raise ValueError(msg) from error
+        return protocol_path
 
+    def generate(self) -> None:
+        """Generate protocol."""
         protocol = read_protocol(self.protocol_specification_path)
         protocol_author = protocol.metadata["author"]
         protocol_name = protocol.metadata["name"]
-        protocol_version = protocol.metadata["version"]
-
-        protocol_path = Path.cwd() / "protocols" / protocol_name
-
-        readme = protocol_path / "README.md"
-        protocol_definition = Path(self.protocol_specification_path).read_text(encoding=DEFAULT_ENCODING)
-        kwargs = {
-            "name": " ".join(map(str.capitalize, protocol_name.split("_"))),
-            "protocol_definition": protocol_definition,
-        }
-        content = README_TEMPLATE.format(**kwargs)
-        readme.write_text(content.strip(), encoding=DEFAULT_ENCODING)
-
-        EnumModifier(protocol_path, self.logger).augment_enums()
-
-        self.cleanup_protocol(protocol_path, protocol_author, protocol_definition, protocol_name, protocol)
-        if protocol.custom_types is not None:
-            self.generate_pydantic_models(protocol_path, protocol_name, protocol)
-            self.clean_tests(
-                protocol_path,
-                protocol,
-            )
-        self.generate_base_models(protocol_path, protocol_name, protocol)
 
-        # We now update the protocol.yaml dependencies key to include 'pydantic'
+        with format_session() as session:
+            protocol_path = self.generate_package()
 
-        protocol_yaml = protocol_path / "protocol.yaml"
-        # We keey the order of the yaml file
-        content = yaml.safe_load(
-            protocol_yaml.read_text(encoding=DEFAULT_ENCODING),
-        )
-        content["dependencies"]["pydantic"] = {}
-        protocol_yaml.write_text(yaml.dump(content, sort_keys=False), encoding=DEFAULT_ENCODING)
+            readme = protocol_path / "README.md"
+            protocol_definition = Path(self.protocol_specification_path).read_text(encoding=DEFAULT_ENCODING)
+            kwargs = {
+                "name": " ".join(map(str.capitalize, protocol_name.split("_"))),
+                "protocol_definition": protocol_definition,
+            }
+            content = README_TEMPLATE.format(**kwargs)
+            readme.write_text(content.strip(), encoding=DEFAULT_ENCODING)
 
-        command = f"aea fingerprint protocol {protocol_author}/{protocol_name}:{protocol_version}"
-        result = subprocess.run(command, shell=True, capture_output=True, check=False)
-        if result.returncode != 0:
-            msg = f"Protocol fingerprinting failed: {result.stderr}"
-            raise ValueError(msg)
+            EnumModifier(protocol_path, self.logger).augment_enums()
 
-        protocol_path = Path.cwd() / "protocols" / protocol_name
+            self.cleanup_protocol(protocol_path, protocol_author, protocol_definition, protocol_name, protocol)
+            if protocol.custom_types is not None:
+                self.generate_pydantic_models(protocol_path, protocol_name, protocol)
+                self.clean_tests(
+                    protocol_path,
+                    protocol,
+                )
+            self.generate_base_models(protocol_path, protocol_name, protocol)
+
+            # We now update the protocol.yaml dependencies key to include 'pydantic'
+
+            protocol_yaml = protocol_path / "protocol.yaml"
+            # We keey the order of the yaml file
+            content = yaml.safe_load(
+                protocol_yaml.read_text(encoding=DEFAULT_ENCODING),
+            )
+            content["dependencies"]["pydantic"] = {}
+            protocol_yaml.write_text(yaml.dump(content, sort_keys=False), encoding=DEFAULT_ENCODING)
+
+            # the fingerprints are of the formatted files.
+            session.flush()
+
+        try:
+            fingerprint_package(protocol_path, PackageType.PROTOCOL)
+        except Exception as error:
+            msg = f"Protocol fingerprinting failed: {error}"
+            raise ValueError(msg) from error
 
         self.logger.info(f"New protocol scaffolded at {protocol_path}")
 
@@ -498,17 +590,13 @@ class ProtocolScaffolder:
         dialogues_class_str = ast.unparse(dialogues_class_ast)
 
         updated_content = content_lines + dialogues_class_str.split("\n")
-        custom_types.write_text("\n".join(updated_content), encoding=DEFAULT_ENCODING)
+        write_formatted(custom_types, "\n".join(updated_content))
 
         # We also need to update the dialogues tests
         dialogues_tests = protocol_path / "tests" / f"test_{protocol_name}_dialogues.py"
-        content = dialogues_tests.read_text(encoding=DEFAULT_ENCODING)
-        dialogues_tests.write_text(content, encoding=DEFAULT_ENCODING)
 
         # We just need to perform a simple updating of the dialogues.
-
-        Formatter(verbose=False, remote=False).format(dialogues_tests)
-        Formatter(verbose=False, remote=False).format(custom_types)
+        format_later(dialogues_tests)
 
     def _get_definition_of_custom_types(self, protocol, required_type_imports=None):
         """Get the definition of data types."""
@@ -645,8 +733,7 @@ class ProtocolScaffolder:
         updated_content_lines.insert(0, typing_import_line)
 
         updated_content = "\n".join(updated_content_lines)
-        custom_types_path.write_text(updated_content)
-        Formatter(verbose=False, remote=False).format(custom_types_path)
+        write_formatted(custom_types_path, updated_content)
 
     def clean_tests(
         self,
@@ -741,8 +828,7 @@ class ProtocolScaffolder:
             encoding=DEFAULT_ENCODING,
         )
 
-        tests_path.write_text(content, encoding=DEFAULT_ENCODING)
-        Formatter(verbose=False, remote=False).format(tests_path)
+        write_formatted(tests_path, content)
 
     def clean_tests_dialogues(
         self,
@@ -816,6 +902,4 @@ class ProtocolScaffolder:
         content = "\n".join(new_content)
 
         # We write the updated content to the file
-        tests_path.write_text(content, encoding=DEFAULT_ENCODING)
-
-        Formatter(verbose=False, remote=False).format(tests_path)
+        write_formatted(tests_path, content)
@@ -0,0 +1,266 @@
+"""Reconcile the dependency manifests of a repository with the versions they are required to pin.
+
+The manifests are each read once, the required versions are compared with all of them in a single pass and
+the changes are shown as one diff, then written at once or applied with a single `poetry add`.
+"""
+
+import re
+import copy
+import json
+import difflib
+from pathlib import Path
+from functools import cached_property
+from dataclasses import field, dataclass
+
+import toml
+from aea.configurations.data_types import Dependency
+
+from auto_dev.utils import FileType, get_logger, write_to_file
+from auto_dev.constants import DEFAULT_ENCODING
+from auto_dev.check_dependencies import Pipfile
+
+
+PYPROJECT = "pyproject.toml"
+PIPFILE = "Pipfile"
+PACKAGES_JSON = "packages/packages.json"
+POETRY_DEPENDENCIES_SECTION = "[tool.poetry.dependencies]"
+
+logger = get_logger()
+
+
+@dataclass
+class Change:
+    """A dependency of a manifest which does not pin the required version."""
+
+    manifest: str
+    name: str
+    current: str | None
+    expected: str
+
+    def __str__(self) -> str:
+        """The change, as shown to the user."""
+        return f"{self.manifest}: {self.name} {self.current or 'missing'} -> {self.expected}"
+
+
+@dataclass
+class PoetryRequirement:
+    """A python dependency required at a version, with its extras and the plugins released with it."""
+
+    version: str
+    extras: list[str] | None = None
+    plugins: list[str] = field(default_factory=list)
+
+
+def poetry_version(value: str | dict) -> str:
+    """The version of a poetry dependency, given either as a string or as a table."""
+    return value if isinstance(value, str) else str(value.get("version", ""))
+
+
+def poetry_value(version: str, extras: list[str] | None) -> str:
+    """The toml value of a poetry dependency."""
+    if not extras:
+        return json.dumps(version)
+    return f"{{version = {json.dumps(version)}, extras = {json.dumps(list(extras))}}}"
+
+
+class Manifests:
+    """The dependency manifests of a repository, each read once and kept as read."""
+
+    def __init__(self, root: str | Path = "."):
+        self.root = Path(root)
+        self._texts: dict[str, str | None] = {}
+
+    def read(self, manifest: str) -> str | None:
+        """The content of a manifest, relative to the root, None when it does not exist."""
+        if manifest not in self._texts:
+            path = self.root / manifest
+            self._texts[manifest] = path.read_text(encoding=DEFAULT_ENCODING) if path.is_file() else None
+        return self._texts[manifest]
+
+    @cached_property
+    def pyproject(self) -> dict:
+        """The parsed pyproject.toml, empty when there is none."""
+        text = self.read(PYPROJECT)
+        return toml.loads(text) if text is not None else {}
+
+    @property
+    def poetry_dependencies(self) -> dict[str, str | dict]:
+        """The poetry dependencies of the pyproject.toml."""
+        return self.pyproject.get("tool", {}).get("poetry", {}).get("dependencies", {})
+
+    @cached_property
+    def pipfile(self) -> Pipfile | None:
+        """The parsed Pipfile, None when there is none."""
+        text = self.read(PIPFILE)
+        if text is None:
+            return None
+        sources, sections = Pipfile.parse(text)
+        return Pipfile(
+            sources=sources,
+            packages=sections.get("[packages]", {}),
+            dev_packages=sections.get("[dev-packages]", {}),
+            file=self.root / PIPFILE,
+        )
+
+    @cached_property
+    def packages_json(self) -> dict[str, dict[str, str]] | None:
+        """The parsed packages.json, None when there is none."""
+        text = self.read(PACKAGES_JSON)
+        return json.loads(text) if text is not None else None
+
+
+class Reconciler:
+    """Collect the versions the manifests are required to pin, then compute and apply the changes at once."""
+
+    def __init__(self, manifests: Manifests):
+        self.manifests = manifests
+        self.poetry: dict[str, PoetryRequirement] = {}
+        self.package_hashes: dict[str, str] = {}
+
+    def require_poetry(
+        self,
+        name: str,
+        version: str,
+        extras: list[str] | None = None,
+        plugins: list[str] | None = None,
+    ) -> None:
+        """Require a python dependency, and the plugins released with it, at a version."""
+        self.poetry[name] = PoetryRequirement(version, extras, list(plugins or []))
+
+    def require_package_hash(self, package: str, package_hash: str) -> None:
+        """Require a third party package of the packages.json at a hash."""
+        self.package_hashes[package] = package_hash
+
+    def changes(self) -> list[Change]:
+        """The changes to every manifest, in a single pass over the requirements."""
+        changes = []
+        dependencies = self.manifests.poetry_dependencies
+        pipfile = self.manifests.pipfile
+        for name, requirement in self.poetry.items():
+            for package in [name, *requirement.plugins]:
+                current = dependencies.get(package)
+                # a version is pinned when the current specifier contains it, as in `==1.0.0,<2.0.0`.
+                if current is not None and requirement.version not in poetry_version(current):
+                    changes.append(Change(PYPROJECT, package, poetry_version(current), requirement.version))
+                if pipfile is None:
+                    continue
+                entry = pipfile.packages.get(package) or pipfile.dev_packages.get(package)
+                if isinstance(entry, Dependency) and requirement.version not in entry.version:
+                    changes.append(Change(PIPFILE, package, entry.version, requirement.version))
+        third_party = (self.manifests.packages_json or {}).get("third_party", {})
+        for package, package_hash in self.package_hashes.items():
+            if package in third_party and third_party[package] != package_hash:
+                changes.append(Change(PACKAGES_JSON, package, third_party[package], package_hash))
+        return changes
+
+    def _requirement(self, package: str) -> PoetryRequirement:
+        """The requirement of a dependency or of a plugin released with one."""
+        if package in self.poetry:
+            return self.poetry[package]
+        return next(requirement for requirement in self.poetry.values() if package in requirement.plugins)
+
+    def _updated_pyproject(self, changes: list[Change]) -> str:
+        lines = self.manifests.read(PYPROJECT).split("\n")
+        pending = {change.name for change in changes}
+        in_section = False
+        for index, line in enumerate(lines):
+            stripped = line.strip()
+            if stripped.startswith("["):
+                in_section = stripped == POETRY_DEPENDENCIES_SECTION
+                continue
+            match = re.match(r"^([A-Za-z0-9_.\-]+)\s*=", stripped)
+            if not in_section or match is None or match.group(1) not in pending:
+                continue
+            name = match.group(1)
+            requirement = self._requirement(name)
+            current = self.manifests.poetry_dependencies[name]
+            extras = requirement.extras if name in self.poetry else None
+            if extras is None and isinstance(current, dict):
+                extras = current.get("extras")
+            lines[index] = f"{name} = {poetry_value(requirement.version, extras)}"
+            pending.discard(name)
+        for name in sorted(pending):
+            logger.warning(f"Unable to update {name} in {PYPROJECT}, it is not an inline dependency.")
+        return "\n".join(lines)
+
+    def _updated_pipfile(self, changes: list[Change]) -> str:
+        # a copy, so the manifests stay as read and the changes can be computed again.
+        pipfile = copy.deepcopy(self.manifests.pipfile)
+        for change in changes:
+            section = pipfile.packages if change.name in pipfile.packages else pipfile.dev_packages
+            entry = section[change.name]
+            section[change.name] = Dependency(
+                name=entry.name,
+                version=change.expected,
+                index=entry.index,
+                git=entry.git,
+                ref=entry.ref,
+                extras=entry.extras,
+            )
+        return pipfile.compile()
+
+    def _updated_packages_json(self, changes: list[Change]) -> str:
+        packages = json.loads(self.manifests.read(PACKAGES_JSON))
+        for change in changes:
+            packages["third_party"][change.name] = change.expected
+        return json.dumps(packages, indent=4, separators=(",", ": "))
+
+    def updated_manifests(self, changes: list[Change] | None = None) -> dict[str, str]:
+        """The new content of every manifest with changes."""
+        changes = self.changes() if changes is None else changes
+        updaters = {
+            PYPROJECT: self._updated_pyproject,
+            PIPFILE: self._updated_pipfile,
+            PACKAGES_JSON: self._updated_packages_json,
+        }
+        updated = {}
+        for manifest, updater in updaters.items():
+            manifest_changes = [change for change in changes if change.manifest == manifest]
+            if manifest_changes:
+                updated[manifest] = updater(manifest_changes)
+        return updated
+
+    def diff(self, updated: dict[str, str] | None = None) -> str:
+        """One unified diff of the changes to all of the manifests."""
+        updated = self.updated_manifests() if updated is None else updated
+        return "".join(
+            "".join(
+                difflib.unified_diff(
+                    self.manifests.read(manifest).splitlines(keepends=True),
+                    content.splitlines(keepends=True),
+                    fromfile=f"a/{manifest}",
+                    tofile=f"b/{manifest}",
+                )
+            )
+            for manifest, content in updated.items()
+        )
+
+    def poetry_add_command(self, changes: list[Change] | None = None) -> str | None:
+        """A single `poetry add` of every python dependency to change, None when there are none.
+
+        The plugins released with a changed dependency are added at its version too, whether or not the
+        pyproject.toml lists them yet.
+        """
+        changes = self.changes() if changes is None else changes
+        arguments = {}
+        for change in changes:
+            if change.manifest != PYPROJECT:
+                continue
+            extras = self.poetry[change.name].extras if change.name in self.poetry else None
+            name = f"{change.name}[{','.join(extras)}]" if extras else change.name
+            arguments[change.name] = f"{name}@{change.expected}"
+            if change.name in self.poetry:
+                for plugin in self.poetry[change.name].plugins:
+                    arguments.setdefault(plugin, f"{plugin}@{change.expected}")
+        return f"poetry add {' '.join(arguments.values())}" if arguments else None
+
+    def write(self, updated: dict[str, str] | None = None, skip: tuple[str, ...] = ()) -> list[str]:
+        """Write every changed manifest but the skipped ones, returning those written."""
+        updated = self.updated_manifests() if updated is None else updated
+        written = []
+        for manifest, content in updated.items():
+            if manifest in skip:
+                continue
+            write_to_file(str(self.manifests.root / manifest), content, FileType.TEXT)
+            written.append(manifest)
+        return written
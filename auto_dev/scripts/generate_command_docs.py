@@ -19,6 +19,8 @@ COMMANDS = [
     "repo",
     "fsm",
     "augment",
+    "daemon",
+    "fmt_server",
 ]
 
 TEMPLATE = """# {command_title} Command
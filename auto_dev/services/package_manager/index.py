@@ -10,6 +10,7 @@ from aea.configurations.data_types import PackageType
 from auto_dev.utils import change_dir, get_logger, update_author, load_autonolas_yaml
 from auto_dev.exceptions import OperationError
 from auto_dev.cli_executor import CommandExecutor
+from auto_dev.venv_resolver import tool_command
 
 
 logger = get_logger()
@@ -41,7 +42,7 @@ class PackageManager:
         """
         if not Path("packages").exists():
             logger.info("Initializing local registry")
-            command = CommandExecutor(["poetry", "run", "autonomy", "packages", "init"])
+            command = CommandExecutor(tool_command("autonomy", "packages", "init"))
             result = command.execute(verbose=self.verbose)
             if not result:
                 msg = f"Command failed: {command.command}"
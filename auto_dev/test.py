@@ -1,16 +1,96 @@
 """Module for testing the project."""
 
+import os
+import sys
+import json
+import time
+import heapq
+import hashlib
+import contextlib
+import subprocess
+from fnmatch import fnmatch
 from pathlib import Path
+from functools import partial
+from xml.etree import ElementTree  # noqa: S405
+from statistics import median
+from dataclasses import field, dataclass
+from collections.abc import Iterator
 from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
 
 import pytest
 
+from auto_dev.cache import DiskCache, hash_file, get_tool_version
+from auto_dev.utils import get_logger, get_packages
+from auto_dev.constants import DEFAULT_ENCODING, AUTO_DEV_CACHE_DIR, AUTONOMY_PACKAGES_FILE
+from auto_dev.file_index import FileIndex
+from auto_dev.dependency_graph import read_dependencies
 
-COVERAGE_COMMAND = f"""coverage report \
-                    -m \
-                    --omit='{Path('**') / 'tests' / '*.py'!s}' \
-                    {Path() / '**' / '*.py'!s} > 'coverage-report.txt'
-"""
+
+COVERAGE_REPORT_FILE = "coverage-report.txt"
+COVERAGE_DATA_FILE = ".coverage"
+COVERAGE_DATA_DIR = AUTO_DEV_CACHE_DIR / "coverage"
+COVERAGE_OMIT = [str(Path("**") / "tests" / "*.py")]
+# the source root measured when testing a path which is not a package.
+DEFAULT_COVERAGE_SOURCE = "."
+MAX_COVERAGE_FILES = 1_000
+JUNIT_COUNTERS = ("tests", "failures", "errors", "skipped")
+LOCK_FILES = ("poetry.lock", "Pipfile.lock")
+MAX_CACHED_RESULTS = 5_000
+# the default `python_files` patterns pytest collects test modules with.
+TEST_FILE_PATTERNS = ("test_*.py", "*_test.py")
+# every file of a package, the gitignored ones aside, is part of its fingerprint.
+ALL_FILES = ("",)
+DURATIONS_FILE = AUTO_DEV_CACHE_DIR / "test_durations.json"
+# the duration assumed for packages never tested, when no package was.
+DEFAULT_DURATION = 1.0
+
+logger = get_logger()
+
+
+@dataclass
+class PackageResult:
+    """The outcome of the tests of a single package."""
+
+    package: str
+    passed: bool
+    tests: int = 0
+    failures: int = 0
+    errors: int = 0
+    skipped: int = 0
+    duration: float = 0.0
+    output: str = ""
+    junit_xml: str | None = None
+    test_durations: dict[str, float] = field(default_factory=dict)
+
+    @property
+    def summary(self) -> str:
+        """The counts of the tests, as reported next to the package."""
+        succeeded = self.tests - self.failures - self.errors - self.skipped
+        others = (("failed", self.failures), ("errors", self.errors), ("skipped", self.skipped))
+        counts = [f"{succeeded} passed", *(f"{count} {name}" for name, count in others if count)]
+        return f"{', '.join(counts)} in {self.duration:.1f}s"
+
+
+def has_tests(path: str, persist_index: bool = False) -> bool:
+    """Whether the path holds any pytest test modules."""
+    return any(
+        fnmatch(Path(file).name, pattern)
+        for file in FileIndex(path, persist=persist_index).files()
+        for pattern in TEST_FILE_PATTERNS
+    )
+
+
+def pytest_args(path: str, verbose: bool = False, watch: bool = False, workers: int | None = None) -> list[str]:
+    """The pytest arguments to test the path, distributing its tests over `workers` xdist processes when given."""
+    args = [path]
+    if verbose:
+        args.append("-v")
+    if watch:
+        args.append("-w")
+    if workers:
+        args.extend(("-n", str(workers)))
+    return args
 
 
 def test_path(
@@ -22,17 +102,356 @@ def test_path(
     """Check the path for linting errors.
     :param path: The path to check.
     """
-    extra_args = []
+    res = pytest.main(pytest_args(path, verbose=verbose, watch=watch, workers=cpu_count() if multiple else None))
+    return bool(res == 0)
 
-    if verbose:
-        extra_args.append("-v")
 
-    if watch:
-        extra_args.append("-w")
+def read_junit(result: PackageResult) -> PackageResult:
+    """Add the counts of the JUnit XML report of the package to its result."""
+    if result.junit_xml is None or not Path(result.junit_xml).exists():
+        return result
+    try:
+        root = ElementTree.parse(result.junit_xml).getroot()  # noqa: S314
+    except ElementTree.ParseError as error:
+        logger.debug(f"Unable to read the JUnit report of {result.package}: {error}")
+        return result
+    for suite in root.iter("testsuite"):
+        for counter in JUNIT_COUNTERS:
+            setattr(result, counter, getattr(result, counter) + int(suite.get(counter, 0)))
+    for case in root.iter("testcase"):
+        name = f"{result.package}::{case.get('classname', '')}::{case.get('name', '')}"
+        result.test_durations[name] = float(case.get("time", 0))
+    return result
 
-    if multiple:
-        extra_args.extend(("-n", str(cpu_count())))
 
-    args = [path, *extra_args]
-    res = pytest.main(args)
-    return bool(res == 0)
+def run_package_tests(
+    package: str,
+    junit_dir: str,
+    verbose: bool = False,
+    workers: int | None = None,
+    coverage: "CoverageCollector | None" = None,
+) -> PackageResult:
+    """Run the tests of a package in its own interpreter, so packages share no module state.
+
+    :param package: The path of the package.
+    :param junit_dir: The directory to write the JUnit XML report of the package to.
+    :param workers: The number of xdist processes to distribute the tests of the package over.
+    :param coverage: Collect the coverage of the package into its own data file.
+    :return: The result of the package, with the counts of its JUnit XML report.
+    """
+    junit_xml = str(Path(junit_dir) / f"{Path(package).as_posix().strip('/').replace('/', '.')}.xml")
+    command = [sys.executable, "-m", "pytest", *pytest_args(package, verbose=verbose, workers=workers)]
+    command.append(f"--junitxml={junit_xml}")
+    env = None
+    if coverage is not None:
+        command.extend(coverage.pytest_args(package))
+        env = coverage.env(package)
+    start = time.perf_counter()
+    process = subprocess.run(command, capture_output=True, text=True, check=False, env=env)
+    result = PackageResult(
+        package=package,
+        passed=process.returncode == 0,
+        duration=time.perf_counter() - start,
+        output=process.stdout + process.stderr,
+        junit_xml=junit_xml,
+    )
+    return read_junit(result)
+
+
+class TestDurations:
+    """The durations of the packages and their tests in previous runs, kept in a json file.
+
+    The file can be shared between the nodes of a CI run, so they all split the packages the same way.
+    """
+
+    __test__ = False
+
+    def __init__(self, path: str | Path = DURATIONS_FILE):
+        self.path = Path(path)
+        self.packages = {}
+        self.tests = {}
+        try:
+            data = json.loads(self.path.read_text(encoding=DEFAULT_ENCODING))
+            self.packages = data.get("packages", {})
+            self.tests = data.get("tests", {})
+        except (OSError, ValueError, AttributeError) as error:
+            logger.debug(f"No test durations read from {self.path}: {error}")
+
+    def estimate(self, package: str) -> float:
+        """The expected duration of a package.
+
+        Without a total for the package, the durations of its tests are summed, and without either the
+        median duration of the packages is used.
+        """
+        if str(package) in self.packages:
+            return self.packages[str(package)]
+        prefix = f"{package}::"
+        test_durations = [duration for name, duration in self.tests.items() if name.startswith(prefix)]
+        if test_durations:
+            return sum(test_durations)
+        return median(self.packages.values()) if self.packages else DEFAULT_DURATION
+
+    def update(self, results: list[PackageResult]) -> None:
+        """Record the durations of the tested packages and of their tests."""
+        for result in results:
+            self.packages[str(result.package)] = round(result.duration, 3)
+            self.tests.update({name: round(duration, 3) for name, duration in result.test_durations.items()})
+
+    def save(self) -> None:
+        """Write the durations to the file."""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            data = {"packages": dict(sorted(self.packages.items())), "tests": dict(sorted(self.tests.items()))}
+            self.path.write_text(json.dumps(data, indent=2), encoding=DEFAULT_ENCODING)
+        except OSError as error:
+            logger.warning(f"Unable to save the test durations to {self.path}: {error}")
+
+
+def schedule(packages: list[str], durations: TestDurations, num_shards: int) -> list[list[str]]:
+    """Split the packages into balanced shards, longest processing time first.
+
+    Every package, from the longest to the shortest, goes to the shard with the least work so far. Ties
+    are broken by name, so every node of a CI run computes the same shards from the same durations.
+    """
+    shards = [[] for _ in range(num_shards)]
+    loads = [(0.0, index) for index in range(num_shards)]
+    for package in sorted(packages, key=lambda package: (-durations.estimate(package), str(package))):
+        load, index = heapq.heappop(loads)
+        shards[index].append(package)
+        heapq.heappush(loads, (load + durations.estimate(package), index))
+    return shards
+
+
+def select_shard(packages: list[str], durations: TestDurations, shard: tuple[int, int]) -> list[str]:
+    """The packages of the `index` of `count` shards, from 1, in the order of the packages."""
+    index, count = shard
+    selected = set(schedule(packages, durations, count)[index - 1])
+    return [package for package in packages if package in selected]
+
+
+def run_tests(
+    packages: list[str],
+    junit_dir: str,
+    num_processes: int = 1,
+    verbose: bool = False,
+    multiple: bool = False,
+    durations: TestDurations | None = None,
+    coverage: "CoverageCollector | None" = None,
+) -> Iterator[PackageResult]:
+    """Run the tests of the packages across `num_processes` workers, yielding the results as they complete.
+
+    Every package is tested in an isolated pytest process; with `multiple` the cpus are shared out between
+    the concurrently tested packages with xdist. With the durations of previous runs the longest packages
+    start first, so a slow package does not start last and set the wall-clock time.
+    """
+    if durations is not None:
+        packages = sorted(packages, key=lambda package: (-durations.estimate(package), str(package)))
+    workers = max(cpu_count() // num_processes, 1) if multiple else None
+    # each pytest process does the work, so threads are enough to drive them.
+    with ThreadPool(max(min(num_processes, len(packages)), 1)) as pool:
+        yield from pool.imap_unordered(
+            partial(run_package_tests, junit_dir=junit_dir, verbose=verbose, workers=workers, coverage=coverage),
+            packages,
+        )
+
+
+def merge_junit(results: list[PackageResult], output: str | Path) -> None:
+    """Merge the JUnit XML reports of the packages into a single report, one testsuite per package."""
+    merged = ElementTree.Element("testsuites")
+    totals = dict.fromkeys(JUNIT_COUNTERS, 0)
+    duration = 0.0
+    for result in sorted(results, key=lambda result: result.package):
+        if result.junit_xml is None or not Path(result.junit_xml).exists():
+            continue
+        try:
+            root = ElementTree.parse(result.junit_xml).getroot()  # noqa: S314
+        except ElementTree.ParseError as error:
+            logger.debug(f"Unable to merge the JUnit report of {result.package}: {error}")
+            continue
+        for suite in root.iter("testsuite"):
+            suite.set("name", str(result.package))
+            merged.append(suite)
+        for counter in JUNIT_COUNTERS:
+            totals[counter] += getattr(result, counter)
+        duration += result.duration
+    for counter, total in totals.items():
+        merged.set(counter, str(total))
+    merged.set("time", f"{duration:.3f}")
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    ElementTree.ElementTree(merged).write(output, encoding="utf-8", xml_declaration=True)
+
+
+def read_package_hashes(packages_file: str = AUTONOMY_PACKAGES_FILE) -> dict[Path, str]:
+    """The hashes of the dev and third party packages of packages.json, none without the file."""
+    if not Path(packages_file).exists():
+        return {}
+    hashes = {}
+    for package_type in ("dev", "third_party"):
+        with contextlib.suppress(KeyError):
+            hashes.update(get_packages(packages_file, type=package_type, check=False, hashmap=True))
+    return hashes
+
+
+class TestResultCache:
+    """Remember the packages whose tests passed, keyed by a fingerprint of everything their tests depend on.
+
+    The fingerprint of a package covers its hash in packages.json and the content of its files, test files
+    included, as the hashes are only refreshed when the packages are locked. The fingerprints of its
+    dependencies, the interpreter and the lock files are part of it too, so changing any of them invalidates
+    the result.
+
+    Only the packages of packages.json are cached, as all of their sources are within their directory. Any
+    other path, such as a tests directory importing code from elsewhere, is always tested.
+    """
+
+    __test__ = False
+
+    def __init__(
+        self,
+        package_hashes: dict[Path, str] | None = None,
+        enabled: bool = True,
+        cache: DiskCache | None = None,
+        lock_files: tuple[str, ...] = LOCK_FILES,
+        persist_index: bool = False,
+    ):
+        self.enabled = enabled
+        self.persist_index = persist_index
+        self.package_hashes = {Path(package): package_hash for package, package_hash in (package_hashes or {}).items()}
+        self.cache = cache if cache is not None else DiskCache("tests", max_entries=MAX_CACHED_RESULTS)
+        salt = hashlib.sha256(f"{sys.implementation.name}:{sys.version}".encode())
+        for tool in ("pytest", "autonomy-dev"):
+            salt.update(f"{tool}=={get_tool_version(tool)}".encode())
+        for lock_file in lock_files:
+            if Path(lock_file).exists():
+                salt.update(hash_file(lock_file).encode())
+        self.salt = salt.hexdigest()
+        self._fingerprints = {}
+
+    def fingerprint(self, package: str | Path, visiting: frozenset[Path] = frozenset()) -> str:
+        """The fingerprint of a package, from its files and the fingerprints of its dependencies."""
+        package = Path(package)
+        if package in self._fingerprints:
+            return self._fingerprints[package]
+        digest = hashlib.sha256(f"{self.salt}:{self.package_hashes.get(package, '')}".encode())
+        for path in FileIndex(package, persist=self.persist_index).files(suffixes=ALL_FILES):
+            with contextlib.suppress(OSError):
+                digest.update(f"{Path(path).relative_to(package)}:{hash_file(path)}".encode())
+        visiting |= {package}
+        for dependency in sorted(read_dependencies(package) - visiting):
+            if dependency.exists():
+                digest.update(self.fingerprint(dependency, visiting).encode())
+            else:
+                digest.update(f"{dependency}:{self.package_hashes.get(dependency, '')}".encode())
+        self._fingerprints[package] = digest.hexdigest()
+        return self._fingerprints[package]
+
+    def is_cacheable(self, package: str | Path) -> bool:
+        """Whether the result of the package can be cached, only true of the packages of packages.json."""
+        return self.enabled and Path(package) in self.package_hashes
+
+    def filter_unknown(self, packages: list[str]) -> list[str]:
+        """The packages which are not known to pass."""
+        keys = {package: self.fingerprint(package) for package in packages if self.is_cacheable(package)}
+        known = self.cache.get_many(list(keys.values()))
+        return [package for package in packages if package not in keys or keys[package] not in known]
+
+    def record(self, results: dict[str, bool]) -> None:
+        """Remember the packages which passed."""
+        passed = [package for package, result in results.items() if result and self.is_cacheable(package)]
+        if passed:
+            self.cache.set_many({self.fingerprint(package): True for package in passed})
+
+
+class CoverageCollector:
+    """Collect the coverage of every package into its own data file, combined into a single report.
+
+    The data files are kept in the adev cache keyed by the fingerprints of the packages, so the coverage
+    of the packages skipped as known to pass is reused and the combined report stays complete.
+
+    The coverage of a package of packages.json is that of the package itself. Any other path, such as a
+    tests directory, measures the given source roots, the working directory by default.
+    """
+
+    def __init__(
+        self,
+        results: TestResultCache,
+        sources: tuple[str, ...] = (),
+        data_dir: str | Path = COVERAGE_DATA_DIR,
+        data_file: str | Path = COVERAGE_DATA_FILE,
+        report_file: str | Path = COVERAGE_REPORT_FILE,
+    ):
+        self.results = results
+        self.sources = tuple(sources)
+        self.data_dir = Path(data_dir)
+        self.data_file = Path(data_file)
+        self.report_file = Path(report_file)
+
+    def package_sources(self, package: str) -> list[str]:
+        """The source roots whose coverage the tests of the package measure."""
+        if self.sources:
+            return list(self.sources)
+        if Path(package) in self.results.package_hashes:
+            return [str(package)]
+        return [DEFAULT_COVERAGE_SOURCE]
+
+    def package_data_file(self, package: str) -> Path:
+        """The data file of the coverage of the current content of the package."""
+        sources = ",".join(str(Path(source).resolve()) for source in self.package_sources(package))
+        key = f"{self.results.fingerprint(package)}:{Path(package).resolve()}:{sources}"
+        return self.data_dir / hashlib.sha256(key.encode()).hexdigest()
+
+    def has_data(self, package: str) -> bool:
+        """Whether the coverage of the current content of the package was collected before."""
+        return self.package_data_file(package).exists()
+
+    def pytest_args(self, package: str) -> list[str]:
+        """The pytest-cov arguments to measure the coverage of the sources of the package, without a report."""
+        return [*(f"--cov={source}" for source in self.package_sources(package)), "--cov-report="]
+
+    def env(self, package: str) -> dict[str, str]:
+        """The environment of the pytest process of the package, writing to the data file of the package.
+
+        With xdist, pytest-cov combines the data of the workers into the same file.
+        """
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        return {**os.environ, "COVERAGE_FILE": str(self.package_data_file(package))}
+
+    def report(self, packages: list[str], tested: list[str]) -> float | None:
+        """Combine the coverage of the packages and write the report of all of them to the report file.
+
+        The report of the packages just tested is shown, as is the total coverage.
+
+        :return: The total coverage in percent, None when no coverage was collected.
+        """
+        from coverage import Coverage  # noqa: PLC0415
+        from coverage.exceptions import CoverageException  # noqa: PLC0415
+
+        data_files = [str(path) for path in map(self.package_data_file, packages) if path.exists()]
+        if not data_files:
+            logger.warning("No coverage was collected.")
+            return None
+        for data_file in data_files:
+            # keeps the reused data files the most recently used ones when pruning.
+            os.utime(data_file)
+        combined = Coverage(data_file=str(self.data_file), omit=COVERAGE_OMIT)
+        combined.erase()
+        combined.combine(data_files, keep=True)
+        combined.save()
+        try:
+            if tested:
+                sources = {Path(source).resolve() for package in tested for source in self.package_sources(package)}
+                combined.report(include=[f"{source}/*" for source in sorted(sources)], show_missing=True)
+            with open(self.report_file, "w", encoding=DEFAULT_ENCODING) as file:
+                total = combined.report(file=file, show_missing=True)
+        except CoverageException as error:
+            logger.warning(f"Unable to report the coverage: {error}")
+            return None
+        self.prune()
+        return total
+
+    def prune(self, max_files: int = MAX_COVERAGE_FILES) -> None:
+        """Remove the least recently used data files beyond the bound."""
+        files = sorted(self.data_dir.glob("*"), key=lambda path: path.stat().st_mtime, reverse=True)
+        for path in files[max_files:]:
+            with contextlib.suppress(OSError):
+                path.unlink()
@@ -5,22 +5,17 @@ import json
 import time
 import shutil
 import logging
-import operator
 import platform
 import tempfile
-import subprocess
-from glob import glob
 from typing import Any
 from pathlib import Path
 from datetime import timezone, timedelta
-from functools import reduce
 from contextlib import contextmanager
 from dataclasses import dataclass
 from collections.abc import Callable
 
 import yaml
 import rich_click as click
-from rich.logging import RichHandler
 from aea.skills.base import PublicId
 from aea.cli.utils.config import get_registry_path_from_cli_config
 from aea.cli.utils.context import Context
@@ -33,67 +28,12 @@ from aea.configurations.base import (
 from aea.configurations.data_types import PackageType
 from openapi_spec_validator.exceptions import OpenAPIValidationError
 
+from auto_dev.log import get_logger, reset_logging  # noqa: F401
 from auto_dev.enums import FileType, FileOperation
+from auto_dev.changes import get_changes, index_changes
 from auto_dev.constants import OS_ENV_MAP, DEFAULT_ENCODING, AUTONOMY_PACKAGES_FILE, SupportedOS
 from auto_dev.exceptions import NotFound, OperationError
-
-
-def reset_logging():
-    """Forcefully remove any existing logging configuration."""
-    # Clear all handlers from the root logger
-    for handler in logging.root.handlers[:]:
-        logging.root.removeHandler(handler)
-
-    # Optionally, reset the root logger's level
-    logging.root.setLevel(logging.NOTSET)
-
-
-# Call reset_logging before applying your new configuration
-
-
-LOGGER = None
-
-
-def get_logger(name: str = __name__, log_level: str = "INFO") -> logging.Logger:
-    """Get the configured logger.
-
-    Args:
-    ----
-        name (str): The name of the logger.
-        log_level (str): The logging level.
-
-    Returns:
-    -------
-        logging.Logger: Configured logger instance.
-
-    """
-    global LOGGER  # noqa
-    if LOGGER:
-        return LOGGER
-    reset_logging()
-    # Reset any existing logging configuration
-    for handler in logging.root.handlers[:]:
-        logging.root.removeHandler(handler)
-    logging.root.setLevel(logging.NOTSET)  # Reset root logger level
-
-    handler = RichHandler(
-        rich_tracebacks=True,
-        markup=True,
-        show_path=False,
-        tracebacks_show_locals=True,
-        enable_link_path=True,
-    )
-
-    datefmt = "%H:%M:%S"
-    logging.basicConfig(
-        level=getattr(logging, log_level.upper(), "INFO"),
-        datefmt=datefmt,
-        format="%(message)s",
-        handlers=[handler],
-    )
-    log = logging.getLogger(name)
-    log.setLevel(getattr(logging, log_level.upper(), "INFO"))
-    return log
+from auto_dev.file_index import index_files
 
 
 def get_packages(
@@ -117,27 +57,31 @@ def get_packages(
     return results
 
 
-def has_package_code_changed(package_path: Path):
+def has_package_code_changed(package_path: Path, base: str | None = None) -> list[str]:
     """We use git to effectively check if the code has changed.
-    We filter out any files that are ;
-    - not tracked by git
-    - have no changes to the code in;
-      - the package itself
-      - the tests for the package.
+    Returns the files of the package that are;
+    - staged, unstaged or untracked
+    - or changed since the merge-base with `base`, when given.
+    Deleted files are not returned.
 
     """
     if not package_path.exists():
         msg = f"Package {package_path} does not exist"
         raise FileNotFoundError(msg)
-    command = f"git status --short {package_path}"
-    result = subprocess.run(command, shell=True, capture_output=True, check=False)
-    changed_files = [f for f in result.stdout.decode().split("\n") if f != ""]
-    changed_files = [f.replace(" M ", "") for f in changed_files]
-    return [f.replace("?? ", "") for f in changed_files]
+    changes = index_changes(get_changes(base=base), [package_path]).get(package_path, [])
+    return [change.path for change in changes if not change.deleted]
+
+
+def is_lintable_file(file_path: str) -> bool:
+    """Whether the file is python code to lint and format, generated protobuf modules are not."""
+    name = Path(file_path).name
+    if "__pycache__" in file_path or not name.endswith(".py"):
+        return False
+    return not (name.endswith("_pb2.py") or name in {"message.py", "serialization.py"})
 
 
-def get_paths(path: str | None = None, changed_only: bool = False):
-    """Get the paths."""
+def get_paths(path: str | None = None, changed_only: bool = False, base: str | None = None, persist_index=False):
+    """Get the paths, listing them with the file index kept on disk when `persist_index`."""
     if not path and not Path(AUTONOMY_PACKAGES_FILE).exists():
         msg = "No path was provided and no default packages file found"
         raise FileNotFoundError(msg)
@@ -147,43 +91,20 @@ def get_paths(path: str | None = None, changed_only: bool = False):
         return [path]
 
     if changed_only:
-        all_changed_files = []
-        for package in packages:
-            changed_files = has_package_code_changed(package)
-            if changed_files:
-                all_changed_files += changed_files
-        packages = all_changed_files
+        # a single git call for all of the packages.
+        index = index_changes(get_changes(base=base), packages)
+        packages = [
+            change.path
+            for package in packages
+            for change in index.get(package, [])
+            if not change.deleted and Path(change.path).is_relative_to(package)
+        ]
     else:
-        python_files = [glob(f"{package}/**/*py", recursive=True) for package in packages]
-        if not python_files:
-            return []
-        packages = reduce(operator.add, python_files)
+        packages = index_files(packages, persist=persist_index)
     if not packages:
         return []
 
-    def filter_git_interferace_files(file_path: str):
-        regexs = [
-            "M  ",
-            "A  ",
-            "MM ",
-            "AM ",
-        ]
-        for regex in regexs:
-            if regex in file_path:
-                return file_path.replace(regex, "")
-        return file_path
-
-    def filter_protobuf_files(file_path: str) -> bool:
-        regexs = [
-            "_pb2.py",
-            "message.py",
-            "serialization.py",
-        ]
-        return any(regex in file_path for regex in regexs)
-
-    python_files = [f for f in packages if "__pycache__" not in f and f.endswith(".py")]
-    python_files = [filter_git_interferace_files(f) for f in python_files]
-    return [f for f in python_files if not filter_protobuf_files(f)]
+    return [f for f in packages if is_lintable_file(f)]
 
 
 @contextmanager
@@ -313,7 +234,9 @@ def load_autonolas_yaml(package_type: PackageType, directory: str | Path | None
         msg = f"Could not find {config_path}, are you in the correct directory?"
         raise FileNotFoundError(msg)
 
-    return list(yaml.safe_load_all(config_path.read_text(encoding=DEFAULT_ENCODING)))
+    from auto_dev.package_config import load_yaml_documents  # noqa: PLC0415
+
+    return load_yaml_documents(config_path)
 
 
 def load_aea_ctx(func: Callable[[click.Context, Any, Any], Any]) -> Callable[[click.Context, Any, Any], Any]:
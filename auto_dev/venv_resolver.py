@@ -0,0 +1,90 @@
+"""Resolve the binaries of the project virtualenv.
+
+Prefixing every command with `poetry run` costs a full poetry resolution per subprocess. Instead,
+the virtualenv of the project is asked from poetry once per `poetry.lock`, remembered on disk and
+in memory, and the binaries are executed directly. When the virtualenv cannot be resolved the
+commands fall back to `poetry run`.
+"""
+
+import os
+import shutil
+import hashlib
+import subprocess
+from pathlib import Path
+from functools import cache
+
+from auto_dev.cache import DiskCache, hash_file
+from auto_dev.utils import get_logger
+
+
+POETRY_LOCK_FILE = "poetry.lock"
+PYPROJECT_FILE = "pyproject.toml"
+
+logger = get_logger()
+
+
+def find_project_dir(start: str | Path = ".") -> Path | None:
+    """Find the poetry project containing the directory, as poetry itself does."""
+    start = Path(start).resolve()
+    for directory in (start, *start.parents):
+        if (directory / PYPROJECT_FILE).exists():
+            return directory
+    return None
+
+
+@cache
+def _hash_lock_file(lock_file: Path, mtime_ns: int, size: int) -> str:
+    """Hash the lock file, once per version of it."""
+    del mtime_ns, size
+    return hash_file(lock_file)
+
+
+@cache
+def _resolve_venv(project_dir: Path, lock_hash: str, virtual_env: str | None) -> Path | None:
+    """Resolve the virtualenv of the project, asking poetry only on a cache miss."""
+    disk_cache = DiskCache("venv")
+    key = hashlib.sha256(f"{project_dir}:{lock_hash}:{virtual_env}".encode()).hexdigest()
+    cached = disk_cache.get(key)
+    if cached and Path(cached).is_dir():
+        return Path(cached)
+    try:
+        result = subprocess.run(
+            ["poetry", "env", "info", "--path"],
+            capture_output=True,
+            cwd=project_dir,
+            check=False,
+        )
+    except OSError as error:
+        logger.debug(f"Unable to resolve the virtualenv of {project_dir}: {error}")
+        return None
+    venv = Path(result.stdout.decode("utf-8").strip())
+    if result.returncode != 0 or not venv.is_dir():
+        logger.debug(f"Unable to resolve the virtualenv of {project_dir}: {result.stderr.decode('utf-8')}")
+        return None
+    disk_cache.set(key, str(venv))
+    return venv
+
+
+def resolve_venv(cwd: str | Path = ".") -> Path | None:
+    """The virtualenv `poetry run` would use from the directory, None when it cannot be resolved."""
+    project_dir = find_project_dir(cwd)
+    if project_dir is None:
+        return None
+    lock_file = project_dir / POETRY_LOCK_FILE
+    lock_hash = ""
+    if lock_file.exists():
+        stat = lock_file.stat()
+        lock_hash = _hash_lock_file(lock_file, stat.st_mtime_ns, stat.st_size)
+    return _resolve_venv(project_dir, lock_hash, os.environ.get("VIRTUAL_ENV"))
+
+
+def tool_command(tool: str, *args: str, cwd: str | Path = ".") -> list[str]:
+    """The command to run a tool of the project virtualenv, falling back to `poetry run`."""
+    venv = resolve_venv(cwd)
+    if venv is None:
+        return ["poetry", "run", tool, *args]
+    # poetry run puts the virtualenv first on the PATH, so tools missing from it come from the PATH.
+    binary = shutil.which(tool, path=os.pathsep.join([str(venv / "bin"), os.environ.get("PATH", "")]))
+    if binary is None:
+        return ["poetry", "run", tool, *args]
+    return [binary, *args]
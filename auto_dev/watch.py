@@ -0,0 +1,184 @@
+"""Watch package trees for changed files, with inotify on linux and polling elsewhere."""
+
+import os
+import sys
+import time
+import ctypes
+import select
+import struct
+import contextlib
+import ctypes.util
+from pathlib import Path
+from collections.abc import Callable, Iterator
+
+import rich_click as click
+
+from auto_dev.utils import get_logger
+from auto_dev.file_index import SKIPPED_DIRECTORIES, FileIndex
+
+
+# debounces the bursts of events of editors and formatters saving many files at once.
+DEFAULT_DEBOUNCE = 0.3
+POLL_INTERVAL = 0.5
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")
+
+logger = get_logger()
+
+
+class InotifyWatcher:
+    """Watch the directories of trees with inotify, adding the directories created while watching.
+
+    A file root is watched through its parent directory, only the events of the file being kept.
+    """
+
+    def __init__(self, roots: list[str | Path]):
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK)
+        if self.fd < 0:
+            msg = f"inotify_init1 failed: {os.strerror(ctypes.get_errno())}"
+            raise OSError(msg)
+        self.directories = {}
+        # the only names watched in the directories of file roots, every name of the other directories is watched.
+        self.names: dict[int, set[str]] = {}
+        for root in roots:
+            self._add_tree(Path(root))
+
+    def _add_tree(self, root: Path) -> None:
+        """Watch a directory and the directories below it, or the parent directory of a file."""
+        if root.is_file():
+            descriptor = self.libc.inotify_add_watch(self.fd, os.fsencode(root.parent), WATCH_MASK)
+            if descriptor >= 0 and (descriptor not in self.directories or descriptor in self.names):
+                self.directories[descriptor] = str(root.parent)
+                self.names.setdefault(descriptor, set()).add(root.name)
+            return
+        if not root.is_dir():
+            return
+        for directory, directory_names, _ in os.walk(root):
+            directory_names[:] = [name for name in directory_names if name not in SKIPPED_DIRECTORIES]
+            descriptor = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+            if descriptor >= 0:
+                self.directories[descriptor] = directory
+                self.names.pop(descriptor, None)
+
+    def read(self, timeout: float | None) -> set[str]:
+        """The paths changed within the timeout, an empty set when nothing changed."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            descriptor, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0").decode(errors="replace")
+            offset += length
+            if descriptor not in self.directories or not name:
+                continue
+            if descriptor in self.names and name not in self.names[descriptor]:
+                continue
+            path = os.path.join(self.directories[descriptor], name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and name not in SKIPPED_DIRECTORIES:
+                    self._add_tree(Path(path))
+                    changed.update(FileIndex(path).files())
+                continue
+            changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        """Stop watching."""
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Watch the files of trees by polling their mtimes."""
+
+    def __init__(self, roots: list[str | Path], interval: float = POLL_INTERVAL):
+        self.roots = roots
+        self.interval = interval
+        self.snapshot = self._snapshot()
+
+    def _snapshot(self) -> dict[str, int]:
+        """The mtimes of the watched files."""
+        snapshot = {}
+        for root in self.roots:
+            for path in FileIndex(root).files():
+                with contextlib.suppress(OSError):
+                    snapshot[path] = Path(path).stat().st_mtime_ns
+        return snapshot
+
+    def read(self, timeout: float | None) -> set[str]:
+        """The paths changed within the timeout, an empty set when nothing changed."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            time.sleep(self.interval if deadline is None else max(min(self.interval, deadline - time.monotonic()), 0))
+            snapshot = self._snapshot()
+            changed = {
+                path for path in snapshot.keys() | self.snapshot.keys() if snapshot.get(path) != self.snapshot.get(path)
+            }
+            self.snapshot = snapshot
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self) -> None:
+        """Stop watching."""
+
+
+def get_watcher(roots: list[str | Path]) -> InotifyWatcher | PollingWatcher:
+    """Watch with inotify when available, polling otherwise."""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(roots)
+        except (OSError, AttributeError, TypeError) as error:
+            logger.debug(f"inotify is unavailable, polling for changes instead: {error}")
+    return PollingWatcher(roots)
+
+
+def watch_changes(roots: list[str | Path], debounce: float = DEFAULT_DEBOUNCE) -> Iterator[set[str]]:
+    """Yield the batches of paths changed below the roots, once no further change happened for `debounce` seconds."""
+    watcher = get_watcher(roots)
+    try:
+        while True:
+            changed = watcher.read(timeout=None)
+            while more := watcher.read(timeout=debounce):
+                changed |= more
+            if changed:
+                yield changed
+    finally:
+        watcher.close()
+
+
+def watch(
+    roots: list[str | Path],
+    callback: Callable[[list[str]], None],
+    path_filter: Callable[[str], bool],
+    debounce: float = DEFAULT_DEBOUNCE,
+) -> None:
+    """Run the callback on the existing changed files accepted by the filter, until interrupted."""
+    logger.info(f"Watching {len(roots)} paths for changes, press Ctrl+C to stop...")
+    try:
+        for changed in watch_changes(roots, debounce=debounce):
+            paths = sorted(path for path in changed if Path(path).is_file() and path_filter(path))
+            if paths:
+                callback(paths)
+    except KeyboardInterrupt:
+        logger.info("Stopped watching.")
+
+
+def report_results(results: dict[str, bool]) -> None:
+    """Report the result of every file."""
+    for file_path, result in results.items():
+        click.echo(f"{'👌' if result else '❗'} - {file_path}")
@@ -34,6 +34,8 @@ COMMANDS = [
     "repo",
     "fsm",
     "augment",
+    "daemon",
+    "fmt_server",
 ]
 
 
@@ -60,12 +62,12 @@ class DocTemplates:
 ## Usage
 
 ```bash
-adev {command_name} [OPTIONS] [ARGS]
+adev {cli_name} [OPTIONS] [ARGS]
 ```
 
 Additionally, you can view the parameters for the command using:
 ```bash
-adev {command_name} --help
+adev {cli_name} --help
 ```
 
 {subcommands}"""
@@ -169,7 +171,10 @@ class CommandDocGenerator:
 
         try:
             doc_path.write_text(
-                self.templates.COMMAND.format(command_name=command, subcommands=subcommands_text), encoding="utf-8"
+                self.templates.COMMAND.format(
+                    command_name=command, cli_name=command.replace("_", "-"), subcommands=subcommands_text
+                ),
+                encoding="utf-8",
             )
             logger.info(f"Generated documentation for {command}")
         except OSError as e:
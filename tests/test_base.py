@@ -0,0 +1,75 @@
+"""Tests for the lazily loaded cli."""
+
+import sys
+import subprocess
+
+from auto_dev.base import CommandManifest, LazyCommandGroup
+from auto_dev.constants import DEFAULT_ENCODING
+
+
+COMMAND_SOURCE = '''
+import rich_click as click
+
+
+@click.command()
+def {name}() -> None:
+    """{help}"""
+    click.echo("{name} ran")
+'''
+
+
+def write_command(folder, name, help_text):
+    """Write a plugin command to the folder."""
+    (folder / f"{name}.py").write_text(COMMAND_SOURCE.format(name=name, help=help_text), encoding=DEFAULT_ENCODING)
+
+
+def test_manifest_reads_help_without_importing(tmp_path):
+    """Test the manifest extracts the help text of the commands."""
+    plugin_folder = tmp_path / "commands"
+    plugin_folder.mkdir()
+    write_command(plugin_folder, "hello", "Say hello.")
+    manifest = CommandManifest(plugin_folder=str(plugin_folder), cache_dir=tmp_path / "cache").load()
+    assert manifest.commands["hello"]["help"] == "Say hello."
+    assert manifest.path.exists()
+    assert "hello" not in sys.modules
+
+
+def test_manifest_regenerates_changed_commands(tmp_path):
+    """Test the manifest picks up changed and removed commands."""
+    plugin_folder = tmp_path / "commands"
+    plugin_folder.mkdir()
+    write_command(plugin_folder, "hello", "Say hello.")
+    write_command(plugin_folder, "bye", "Say bye.")
+    cache_dir = tmp_path / "cache"
+    CommandManifest(plugin_folder=str(plugin_folder), cache_dir=cache_dir).load()
+
+    write_command(plugin_folder, "hello", "Say hello loudly.")
+    (plugin_folder / "bye.py").unlink()
+    manifest = CommandManifest(plugin_folder=str(plugin_folder), cache_dir=cache_dir).load()
+    assert manifest.commands["hello"]["help"] == "Say hello loudly."
+    assert "bye" not in manifest.commands
+
+
+def test_lazy_group_loads_command_on_resolve(tmp_path):
+    """Test the group only loads a plugin command when it is resolved."""
+    plugin_folder = tmp_path / "commands"
+    plugin_folder.mkdir()
+    write_command(plugin_folder, "hello", "Say hello.")
+    manifest = CommandManifest(plugin_folder=str(plugin_folder), cache_dir=tmp_path / "cache").load()
+    group = LazyCommandGroup(name="cli", manifest=manifest)
+
+    ctx = group.make_context("cli", ["hello"])
+    assert group.list_commands(ctx) == ["hello"]
+    assert "hello" not in group.commands
+    assert group.get_command(ctx, "hello").get_short_help_str() == "Say hello."
+
+    _, command, _ = group.resolve_command(ctx, ["hello"])
+    assert command.callback is not None
+    assert group.commands["hello"] is command
+
+
+def test_cli_imports_without_aea():
+    """Test the root group imports none of aea, which alone takes most of a second."""
+    code = "import sys, auto_dev.cli; print(sorted({m.split('.')[0] for m in sys.modules} & {'aea', 'web3'}))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
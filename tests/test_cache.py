@@ -0,0 +1,58 @@
+"""Tests for the on-disk caches."""
+
+from auto_dev.cache import DiskCache, FileResultCache
+from auto_dev.constants import DEFAULT_ENCODING
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    """Test the cache keeps the most recently used entries within its bound."""
+    cache = DiskCache("test", path=tmp_path / "cache.sqlite", max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", {"value": 2})
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get_many(["a", "c"]) == {"a": 1, "c": 3}
+
+
+def test_disk_cache_namespaces_are_isolated(tmp_path):
+    """Test namespaces do not share entries."""
+    lint = DiskCache("lint", path=tmp_path / "cache.sqlite")
+    fmt = DiskCache("fmt", path=tmp_path / "cache.sqlite")
+    lint.set("key", True)
+    assert fmt.get("key") is None
+    lint.clear()
+    assert lint.get("key") is None
+
+
+def test_file_result_cache_invalidates_on_content(tmp_path):
+    """Test a file is only known to pass until its content changes."""
+    config = tmp_path / "ruff.toml"
+    config.write_text("line-length = 120\n", encoding=DEFAULT_ENCODING)
+    source = tmp_path / "module.py"
+    source.write_text("VALUE = 1\n", encoding=DEFAULT_ENCODING)
+    cache = FileResultCache("lint", config_files=(config,), cache=DiskCache("lint", path=tmp_path / "cache.sqlite"))
+    assert cache.filter_unknown([str(source)]) == [str(source)]
+    cache.record({str(source): True})
+    assert cache.filter_unknown([str(source)]) == []
+
+    source.write_text("VALUE = 2\n", encoding=DEFAULT_ENCODING)
+    assert cache.filter_unknown([str(source)]) == [str(source)]
+
+
+def test_file_result_cache_invalidates_on_config(tmp_path):
+    """Test changing the configuration invalidates the results."""
+    config = tmp_path / "ruff.toml"
+    config.write_text("line-length = 120\n", encoding=DEFAULT_ENCODING)
+    source = tmp_path / "module.py"
+    source.write_text("VALUE = 1\n", encoding=DEFAULT_ENCODING)
+    disk_cache = DiskCache("lint", path=tmp_path / "cache.sqlite")
+    FileResultCache("lint", config_files=(config,), cache=disk_cache).record({str(source): True})
+
+    config.write_text("line-length = 80\n", encoding=DEFAULT_ENCODING)
+    cache = FileResultCache("lint", config_files=(config,), cache=disk_cache)
+    assert cache.filter_unknown([str(source)]) == [str(source)]
+    assert FileResultCache("lint", config_files=(config,), cache=disk_cache, enabled=False).filter_unknown(
+        [str(source)]
+    ) == [str(source)]
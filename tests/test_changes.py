@@ -0,0 +1,83 @@
+"""Tests for the git change detection."""
+
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from auto_dev.changes import FileChange, get_changes, index_changes
+from auto_dev.constants import DEFAULT_ENCODING
+
+
+def git(repo, *args):
+    """Run git in the repository."""
+    subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=repo,
+        check=True,
+        capture_output=True,
+    )
+
+
+def write(path, content="VALUE = 1\n"):
+    """Write a file, creating its parents."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding=DEFAULT_ENCODING)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """A repository with two packages and a single commit."""
+    for name in (
+        "packages/author/skills/alpha/a.py",
+        "packages/author/skills/beta/b.py",
+        "packages/author/skills/beta/gone.py",
+        "top.py",
+    ):
+        write(tmp_path / name)
+    git(tmp_path, "init", "-q", "-b", "main")
+    git(tmp_path, "add", ".")
+    git(tmp_path, "commit", "-q", "-m", "initial")
+    return tmp_path
+
+
+def test_get_changes_from_status(repo):
+    """Test staged, unstaged, untracked, renamed and deleted files are reported from a single status."""
+    write(repo / "packages/author/skills/alpha/a.py", "VALUE = 2\n")
+    git(repo, "mv", "top.py", "packages/author/skills/alpha/moved.py")
+    (repo / "packages/author/skills/beta/gone.py").unlink()
+    write(repo / "packages/author/skills/beta/new dir/new.py")
+
+    changes = {change.path: change for change in get_changes(cwd=repo)}
+    assert changes["packages/author/skills/alpha/a.py"] == FileChange(
+        "packages/author/skills/alpha/a.py", unstaged=True
+    )
+    assert changes["packages/author/skills/alpha/moved.py"] == FileChange(
+        "packages/author/skills/alpha/moved.py", staged=True, original_path="top.py"
+    )
+    assert changes["packages/author/skills/beta/gone.py"].deleted
+    assert changes["packages/author/skills/beta/new dir/new.py"].untracked
+
+
+def test_get_changes_since_base(repo):
+    """Test the changes since the merge-base with a ref include the committed ones."""
+    git(repo, "checkout", "-q", "-b", "feature")
+    write(repo / "packages/author/skills/beta/b.py", "VALUE = 2\n")
+    git(repo, "commit", "-q", "-am", "change beta")
+    write(repo / "packages/author/skills/alpha/untracked.py")
+
+    assert get_changes(cwd=repo) == [FileChange("packages/author/skills/alpha/untracked.py", untracked=True)]
+    assert {change.path for change in get_changes(base="main", cwd=repo)} == {
+        "packages/author/skills/beta/b.py",
+        "packages/author/skills/alpha/untracked.py",
+    }
+
+
+def test_index_changes():
+    """Test the changes are indexed by their packages, renames under both packages."""
+    alpha, beta = Path("packages/author/skills/alpha"), Path("packages/author/skills/beta")
+    renamed = FileChange(f"{beta}/moved.py", staged=True, original_path=f"{alpha}/moved.py")
+    changes = [FileChange(f"{alpha}/tests/test_a.py", unstaged=True), renamed, FileChange("top.py", unstaged=True)]
+
+    index = index_changes(changes, [alpha, beta])
+    assert index == {alpha: [changes[0], renamed], beta: [renamed]}
@@ -0,0 +1,72 @@
+"""Tests for the warm adev daemon."""
+
+import os
+import time
+import socket
+import multiprocessing
+
+import rich_click as click
+
+from auto_dev.daemon import AdevDaemon, forward, send_message, receive_message, request_control
+
+
+@click.group()
+def dummy_cli() -> None:
+    """Dummy cli served by the daemon."""
+
+
+@dummy_cli.command()
+@click.argument("name")
+def hello(name) -> None:
+    """Greet from the cwd of the client."""
+    click.echo(f"hello {name} from {os.getcwd()}")
+
+
+@dummy_cli.command()
+def fail() -> None:
+    """Fail."""
+    msg = "failed"
+    raise click.ClickException(msg)
+
+
+def test_messages_pass_file_descriptors(tmp_path):
+    """Test messages carry the file descriptors of the sender."""
+    output = tmp_path / "output.txt"
+    left, right = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+    with left, right, open(output, "w", encoding="utf-8") as file:
+        send_message(left, {"argv": ["lint"]}, fds=[file.fileno()])
+        message, fds = receive_message(right, maxfds=1)
+        os.write(fds[0], b"written by the receiver")
+        os.close(fds[0])
+    assert message == {"argv": ["lint"]}
+    assert output.read_text(encoding="utf-8") == "written by the receiver"
+
+
+def test_daemon_runs_invocations_with_client_stdio(tmp_path, monkeypatch):
+    """Test the daemon runs the command in the cwd of the client, writing to its stdio."""
+    socket_path = tmp_path / "adev.sock"
+    server = multiprocessing.get_context("fork").Process(
+        target=AdevDaemon(socket_path, cli=dummy_cli).serve_forever, daemon=True
+    )
+    server.start()
+    try:
+        while request_control("status", socket_path) is None:
+            time.sleep(0.05)
+        workdir = tmp_path / "workdir"
+        workdir.mkdir()
+        monkeypatch.chdir(workdir)
+        stdout, stderr = tmp_path / "stdout.txt", tmp_path / "stderr.txt"
+        with (
+            open(os.devnull, encoding="utf-8") as stdin,
+            open(stdout, "w", encoding="utf-8") as out,
+            open(stderr, "w", encoding="utf-8") as err,
+        ):
+            fds = (stdin.fileno(), out.fileno(), err.fileno())
+            assert forward(["hello", "adev"], socket_path, fds=fds) == 0
+            assert forward(["fail"], socket_path, fds=fds) == 1
+        assert stdout.read_text(encoding="utf-8") == f"hello adev from {workdir}\n"
+        assert "failed" in stderr.read_text(encoding="utf-8")
+    finally:
+        request_control("stop", socket_path)
+        server.join(timeout=10)
+    assert not socket_path.exists()
@@ -0,0 +1,116 @@
+"""Tests for the package dependency graph."""
+
+import subprocess
+from pathlib import Path
+
+import yaml
+
+from auto_dev.cache import DiskCache
+from auto_dev.constants import DEFAULT_ENCODING
+from auto_dev.dependency_graph import (
+    DependencyIndex,
+    find_cycles,
+    find_dependents,
+    affected_packages,
+    read_dependencies,
+    topological_order,
+    build_dependency_graph,
+)
+
+
+HASH = "bafybeigdyrzt5sfp7udm7hu76uh7y26nf3efuylqabf3oclgtqy55fbzdi"
+PROTOCOL = Path("packages/author/protocols/proto")
+CONTRACT = Path("packages/author/contracts/token")
+SKILL = Path("packages/author/skills/alpha")
+AGENT = Path("packages/author/agents/agent")
+SERVICE = Path("packages/author/services/service")
+PACKAGES = [PROTOCOL, CONTRACT, SKILL, AGENT, SERVICE]
+
+
+def write_config(root, package, file_name, config):
+    """Write the configuration of a package."""
+    (root / package).mkdir(parents=True, exist_ok=True)
+    (root / package / file_name).write_text(yaml.safe_dump(config), encoding=DEFAULT_ENCODING)
+
+
+def make_packages(root):
+    """A protocol and contract used by a skill, used by an agent run by a service."""
+    write_config(root, PROTOCOL, "protocol.yaml", {"name": "proto"})
+    write_config(root, CONTRACT, "contract.yaml", {"name": "token", "contracts": []})
+    write_config(
+        root,
+        SKILL,
+        "skill.yaml",
+        {
+            "protocols": [f"author/proto:0.1.0:{HASH}", f"valory/abci:0.1.0:{HASH}"],
+            "contracts": [f"author/token:0.1.0:{HASH}"],
+        },
+    )
+    write_config(root, AGENT, "aea-config.yaml", {"skills": [f"author/alpha:0.1.0:{HASH}"]})
+    write_config(root, SERVICE, "service.yaml", {"agent": f"author/agent:0.1.0:{HASH}"})
+
+
+def test_dependency_graph(tmp_path, monkeypatch):
+    """Test the dependencies are read from the configurations and the dependents are transitive."""
+    make_packages(tmp_path)
+    assert read_dependencies(tmp_path / SKILL) == {
+        tmp_path / PROTOCOL,
+        tmp_path / "packages/valory/protocols/abci",
+        tmp_path / CONTRACT,
+    }
+    assert read_dependencies(tmp_path / SERVICE) == {tmp_path / AGENT}
+
+    monkeypatch.chdir(tmp_path)
+    graph = build_dependency_graph(PACKAGES)
+    assert graph[SKILL] == {PROTOCOL, CONTRACT}
+    assert find_dependents(graph, [CONTRACT]) == {CONTRACT, SKILL, AGENT, SERVICE}
+    assert find_dependents(graph, [SERVICE]) == {SERVICE}
+
+
+def test_affected_packages(tmp_path, monkeypatch):
+    """Test the changed packages and their dependents are affected, in the order of the packages."""
+    make_packages(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    for args in (("init", "-q"), ("add", "."), ("commit", "-q", "-m", "initial")):
+        subprocess.run(
+            ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args], check=True, capture_output=True
+        )
+    assert affected_packages(PACKAGES) == []
+
+    (tmp_path / SKILL / "handlers.py").write_text("VALUE = 1\n", encoding=DEFAULT_ENCODING)
+    assert affected_packages(PACKAGES) == [SKILL, AGENT, SERVICE]
+
+    (tmp_path / "README.md").write_text("# Packages\n", encoding=DEFAULT_ENCODING)
+    assert affected_packages(PACKAGES) == [SKILL, AGENT, SERVICE]
+    (tmp_path / "poetry.lock").write_text("[[package]]\n", encoding=DEFAULT_ENCODING)
+    assert affected_packages(PACKAGES) == PACKAGES
+
+
+def test_dependency_index(tmp_path):
+    """Test the index is kept on disk, refreshed from the changed configurations only, and answers queries."""
+    make_packages(tmp_path)
+    packages_dir = tmp_path / "packages"
+    cache = DiskCache("dependency_graph", path=tmp_path / "cache.sqlite")
+    index = DependencyIndex(packages_dir, cache=cache).refresh()
+    assert index.refreshed == len(PACKAGES)
+    graph = index.graph
+    assert graph[tmp_path / SKILL] == {tmp_path / PROTOCOL, tmp_path / CONTRACT}
+    assert topological_order(graph) == [
+        tmp_path / CONTRACT,
+        tmp_path / PROTOCOL,
+        tmp_path / SKILL,
+        tmp_path / AGENT,
+        tmp_path / SERVICE,
+    ]
+    assert find_cycles(graph) == []
+    assert index.resolve("skill/author/alpha:0.1.0") == tmp_path / SKILL
+    assert index.resolve(str(tmp_path / SKILL)) == tmp_path / SKILL
+    assert index.resolve("skill/author/missing") is None
+
+    assert DependencyIndex(packages_dir, cache=cache).refresh().refreshed == 0
+    write_config(tmp_path, PROTOCOL, "protocol.yaml", {"name": "proto", "skills": [f"author/alpha:0.1.0:{HASH}"]})
+    index = DependencyIndex(packages_dir, cache=cache).refresh()
+    assert index.refreshed == 1
+    graph = index.graph
+    assert find_cycles(graph) == [[tmp_path / PROTOCOL, tmp_path / SKILL]]
+    assert topological_order(graph) == [tmp_path / CONTRACT]
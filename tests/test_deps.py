@@ -0,0 +1,105 @@
+"""Tests for the dependency lookups of adev deps and their http cache."""
+
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from auto_dev.commands import deps
+from auto_dev.exceptions import NetworkTimeoutError
+from auto_dev.http_cache import HttpCache
+from auto_dev.commands.deps import (
+    GitDependency,
+    DependencyLocation,
+    fetch_latest_release,
+    prefetch_dependencies,
+    fetch_autonomy_packages,
+)
+
+
+ETAG = '"v1"'
+
+
+class GitHubHandler(BaseHTTPRequestHandler):
+    """Serve the releases and packages.json of any repository, counting the requests."""
+
+    def do_GET(self):  # noqa: N802
+        """Serve the github api endpoints used by the dependencies, unchanged ones with a 304."""
+        self.server.requests.append(self.path)
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        host = f"http://{self.headers['Host']}"
+        if self.path.endswith("/releases"):
+            body = [{"tag_name": "v1.2.3"}]
+        elif "/contents/packages/packages.json" in self.path:
+            body = {"download_url": f"{host}/raw{self.path.split('/contents')[0]}/packages.json"}
+        elif self.path.endswith("/packages.json"):
+            body = {"dev": {"protocol/valory/abci/0.1.0": "bafy"}}
+        else:
+            self.send_error(404)
+            return
+        content = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.send_header("ETag", ETAG)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        """Keep the test output clean."""
+
+
+@pytest.fixture
+def github(tmp_path, monkeypatch):
+    """A stand-in for the github api, listening on a free port, with an empty http cache."""
+    monkeypatch.setattr(deps, "http_cache", HttpCache(path=tmp_path / "cache.sqlite"))
+    server = ThreadingHTTPServer(("localhost", 0), GitHubHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    fetch_latest_release.cache_clear()
+    fetch_autonomy_packages.cache_clear()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_prefetch_looks_up_every_repository_once(github):
+    """Test the lookups of the dependencies are memoized per repository within a run."""
+    url = f"http://localhost:{github.server_address[1]}/repos/valory/open-autonomy"
+    autonomy = GitDependency("open-autonomy", "0.1.0", DependencyLocation.REMOTE, url=url)
+    poetry = GitDependency("open-autonomy", "0.1.0", DependencyLocation.REMOTE, url=url)
+    local = GitDependency("local", "0.1.0", DependencyLocation.LOCAL, url=f"{url}-local")
+
+    prefetch_dependencies([autonomy], [poetry, local])
+    assert poetry.get_latest_version() == "v1.2.3"
+    assert local.get_latest_version() == "0.1.0"
+    assert autonomy.get_all_autonomy_packages() == {"protocol/valory/abci/0.1.0": "bafy"}
+    assert sorted(github.requests) == [
+        "/raw/repos/valory/open-autonomy/packages.json",
+        "/repos/valory/open-autonomy/contents/packages/packages.json?ref=v1.2.3",
+        "/repos/valory/open-autonomy/releases",
+    ]
+
+
+def test_http_cache_revalidates_and_serves_offline(github, tmp_path):
+    """Test responses are revalidated with their ETag by default, and served from the cache within a ttl or offline."""
+    url = f"http://localhost:{github.server_address[1]}/repos/valory/open-aea/releases"
+    cache = HttpCache(path=tmp_path / "http.sqlite")
+    response = cache.get(url)
+    assert (response.status_code, response.from_cache) == (200, False)
+
+    revalidated = cache.get(url)
+    assert (revalidated.json(), revalidated.from_cache) == ([{"tag_name": "v1.2.3"}], True)
+    assert len(github.requests) == 2
+
+    assert HttpCache(ttl=60, path=tmp_path / "http.sqlite").get(url).from_cache
+    offline = HttpCache(offline=True, path=tmp_path / "http.sqlite")
+    assert offline.get(url).json() == [{"tag_name": "v1.2.3"}]
+    assert len(github.requests) == 2
+    with pytest.raises(NetworkTimeoutError):
+        offline.get(f"{url}/missing")
@@ -0,0 +1,48 @@
+"""Tests for the file index."""
+
+from auto_dev.cache import DiskCache
+from auto_dev.constants import DEFAULT_ENCODING
+from auto_dev.file_index import FileIndex, is_ignored, parse_gitignore
+
+
+def touch(path):
+    """Create a file and its parents."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("", encoding=DEFAULT_ENCODING)
+
+
+def test_parse_gitignore():
+    """Test the gitignore patterns match as git does."""
+    rules = parse_gitignore("# comment\n*.log\n/build/\ndocs/**/*.md\n!keep.log\n")
+    assert is_ignored(rules, "a/b/debug.log", is_dir=False)
+    assert not is_ignored(rules, "a/keep.log", is_dir=False)
+    assert is_ignored(rules, "build", is_dir=True)
+    assert not is_ignored(rules, "build", is_dir=False)
+    assert not is_ignored(rules, "a/build", is_dir=True)
+    assert is_ignored(rules, "docs/a/b/index.md", is_dir=False)
+    assert not is_ignored(rules, "docs/index.py", is_dir=False)
+
+
+def test_file_index_skips_ignored_trees(tmp_path):
+    """Test ignored and vendored trees are not listed."""
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".gitignore").write_text("generated/\n", encoding=DEFAULT_ENCODING)
+    package = tmp_path / "packages" / "author" / "skills" / "alpha"
+    for name in ("a.py", "tests/test_a.py", "__pycache__/a.py", "vendor/lib.py", "generated/b.py", "data.yaml"):
+        touch(package / name)
+    (package / "tests" / ".gitignore").write_text("test_*.py\n!test_a.py\n", encoding=DEFAULT_ENCODING)
+    touch(package / "tests" / "test_b.py")
+
+    assert FileIndex(package).files() == [str(package / "a.py"), str(package / "tests" / "test_a.py")]
+    assert FileIndex(package).files(suffixes=(".yaml",)) == [str(package / "data.yaml")]
+
+
+def test_persisted_file_index_is_invalidated_by_mtimes(tmp_path):
+    """Test a persisted listing is reused until its directory changes."""
+    root = tmp_path / "root"
+    touch(root / "a.py")
+    cache = DiskCache("file_index", path=tmp_path / "cache.sqlite")
+    assert FileIndex(root, persist=True, cache=cache).files() == [str(root / "a.py")]
+
+    touch(root / "nested" / "b.py")
+    assert FileIndex(root, persist=True, cache=cache).files() == [str(root / "a.py"), str(root / "nested" / "b.py")]
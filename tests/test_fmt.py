@@ -0,0 +1,61 @@
+"""Tests for the formatting pipeline."""
+
+from unittest.mock import patch
+
+from auto_dev.fmt import Formatter, format_later, format_session, write_formatted
+from auto_dev.constants import DEFAULT_ENCODING
+
+
+UNSORTED = "import sys\nimport os\nVALUE=1\n"
+
+
+def test_format_paths_reports_changed_files(tmp_path):
+    """Test a batch is sorted and formatted at once, reporting the files which changed."""
+    unformatted = tmp_path / "unformatted.py"
+    unformatted.write_text(UNSORTED, encoding=DEFAULT_ENCODING)
+    formatted = tmp_path / "formatted.py"
+    formatted.write_text("VALUE = 1\n", encoding=DEFAULT_ENCODING)
+    broken = tmp_path / "broken.py"
+    broken.write_text("def (:\n", encoding=DEFAULT_ENCODING)
+    paths = [str(unformatted), str(formatted), str(broken)]
+
+    result = Formatter(verbose=False, remote=False).format_paths(paths)
+    assert result.results == {str(unformatted): True, str(formatted): True, str(broken): False}
+    assert result.changed == [str(unformatted)]
+    assert unformatted.read_text(encoding=DEFAULT_ENCODING) == "import os\nimport sys\n\n\nVALUE = 1\n"
+
+
+def test_write_skips_unchanged_output(tmp_path):
+    """Test the file is only written when the formatted content differs."""
+    path = tmp_path / "module.py"
+    formatter = Formatter(verbose=False, remote=False)
+    assert formatter.write(path, UNSORTED)
+    modified = path.stat().st_mtime_ns
+    assert not formatter.write(path, UNSORTED)
+    assert path.stat().st_mtime_ns == modified
+
+
+def test_format_session_formats_once_when_done(tmp_path):
+    """Test the files of a session are written as is, then formatted in one batch when the outermost session exits."""
+    module = tmp_path / "module.py"
+    other = tmp_path / "other.py"
+    other.write_text(UNSORTED, encoding=DEFAULT_ENCODING)
+    removed = tmp_path / "removed.py"
+
+    with patch.object(Formatter, "format_paths", autospec=True, side_effect=Formatter.format_paths) as format_paths:
+        with format_session():
+            assert write_formatted(module, UNSORTED)
+            with format_session():
+                assert write_formatted(module, "import sys\nimport os\nVALUE=2\n")
+                format_later(other, removed)
+            assert module.read_text(encoding=DEFAULT_ENCODING) == "import sys\nimport os\nVALUE=2\n"
+            format_paths.assert_not_called()
+        assert format_paths.call_count == 1
+        assert format_paths.call_args.args[1] == [str(module), str(other)]
+
+        assert module.read_text(encoding=DEFAULT_ENCODING) == "import os\nimport sys\n\n\nVALUE = 2\n"
+        assert other.read_text(encoding=DEFAULT_ENCODING) == "import os\nimport sys\n\n\nVALUE = 1\n"
+
+        # without a session, the files are formatted right away.
+        format_later(other)
+        assert format_paths.call_count == 2
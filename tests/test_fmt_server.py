@@ -0,0 +1,44 @@
+"""Tests for the format server and its client."""
+
+import threading
+
+import pytest
+
+from auto_dev.fmt import Formatter
+from auto_dev.constants import DEFAULT_ENCODING
+from auto_dev.fmt_server import FormatServer
+
+
+@pytest.fixture
+def format_server():
+    """A format server listening on a free port."""
+    server = FormatServer("localhost", 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://localhost:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_format_remote_batches_files(format_server, tmp_path):
+    """Test the files are formatted by the server, the broken ones falling back locally."""
+    unformatted = tmp_path / "unformatted.py"
+    unformatted.write_text("import sys\nimport os\nVALUE=1\n", encoding=DEFAULT_ENCODING)
+    formatted = tmp_path / "formatted.py"
+    formatted.write_text("VALUE = 1\n", encoding=DEFAULT_ENCODING)
+    broken = tmp_path / "broken.py"
+    broken.write_text("def (:\n", encoding=DEFAULT_ENCODING)
+    paths = [str(unformatted), str(formatted), str(broken)]
+
+    result = Formatter(verbose=False, remote=True, url=format_server).format_remote(paths)
+    assert result.results == {str(unformatted): True, str(formatted): True, str(broken): False}
+    assert result.changed == [str(unformatted)]
+    assert unformatted.read_text(encoding=DEFAULT_ENCODING) == "import os\nimport sys\n\n\nVALUE = 1\n"
+
+
+def test_format_remote_falls_back_locally(tmp_path):
+    """Test the files are formatted locally when the server is unavailable."""
+    path = tmp_path / "module.py"
+    path.write_text("VALUE=1\n", encoding=DEFAULT_ENCODING)
+    assert Formatter(verbose=False, remote=True, url="http://localhost:1").format(path)
+    assert path.read_text(encoding=DEFAULT_ENCODING) == "VALUE = 1\n"
@@ -0,0 +1,45 @@
+"""Tests for the batched linting."""
+
+from auto_dev.lint import MAX_CHUNK_SIZE, check_paths, chunk_paths, collect_results
+from auto_dev.constants import DEFAULT_ENCODING
+
+
+def test_chunk_paths():
+    """Test the paths are split over the chunks."""
+    paths = [f"file_{i}.py" for i in range(10)]
+    assert chunk_paths([], 4) == []
+    assert chunk_paths(paths, 1) == [paths]
+    assert [len(chunk) for chunk in chunk_paths(paths, 4)] == [3, 3, 3, 1]
+    assert [len(chunk) for chunk in chunk_paths(paths, 0)] == [10]
+
+
+def test_chunk_paths_is_bounded():
+    """Test a chunk never exceeds the maximum size."""
+    paths = [f"file_{i}.py" for i in range(MAX_CHUNK_SIZE * 2 + 1)]
+    assert [len(chunk) for chunk in chunk_paths(paths, 1)] == [MAX_CHUNK_SIZE, MAX_CHUNK_SIZE, 1]
+
+
+def test_check_paths_reports_per_file(tmp_path):
+    """Test a single ruff run reports the result of each file."""
+    (tmp_path / "__init__.py").write_text('"""Package."""\n', encoding=DEFAULT_ENCODING)
+    clean = tmp_path / "clean.py"
+    clean.write_text('"""Clean module."""\n\nVALUE = 1\n', encoding=DEFAULT_ENCODING)
+    broken = tmp_path / "broken.py"
+    broken.write_text('"""Broken module."""\n\nVALUE = undefined_name\n', encoding=DEFAULT_ENCODING)
+    results = check_paths([str(clean), str(broken)])
+    assert results == {str(clean): True, str(broken): False}
+
+
+def test_collect_results_stops_at_max_failures():
+    """Test no further chunk is consumed once the failures reach the limit."""
+    consumed = []
+
+    def chunk_results():
+        for i, chunk_result in enumerate([{"a": True, "b": False}, {"c": False}, {"d": True}]):
+            consumed.append(i)
+            yield chunk_result
+
+    assert collect_results(chunk_results(), 3, "Linting...") == {"a": True, "b": False, "c": False, "d": True}
+    consumed.clear()
+    assert collect_results(chunk_results(), 3, "Linting...", max_failures=2) == {"a": True, "b": False, "c": False}
+    assert consumed == [0, 1]
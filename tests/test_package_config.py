@@ -0,0 +1,70 @@
+"""Tests for the cached loading of package configurations."""
+
+import os
+
+import yaml
+import pytest
+from aea.exceptions import AEAValidationError
+from aea.configurations.data_types import PackageType
+
+from auto_dev.constants import DEFAULT_ENCODING
+from auto_dev.package_config import ConfigurationCache
+
+
+PROTOCOL = {
+    "name": "proto",
+    "author": "author",
+    "version": "0.1.0",
+    "type": "protocol",
+    "description": "A protocol.",
+    "protocol_specification_id": "author/proto:0.1.0",
+    "license": "Apache-2.0",
+    "aea_version": ">=1.0.0, <2.0.0",
+    "fingerprint": {},
+    "fingerprint_ignore_patterns": [],
+    "dependencies": {"protobuf": {"version": "<4.25.0,>=4.21.6"}},
+}
+
+
+def write_protocol(root, name, config):
+    """Write the configuration of a protocol, returning its package path."""
+    package_path = root / "packages" / "author" / "protocols" / name
+    package_path.mkdir(parents=True, exist_ok=True)
+    (package_path / "protocol.yaml").write_text(yaml.safe_dump({**config, "name": name}), encoding=DEFAULT_ENCODING)
+    return package_path
+
+
+def test_documents_are_cached_until_the_file_changes(tmp_path):
+    """Test a file is parsed once per version, across caches sharing a database, and copies are handed out."""
+    path = tmp_path / "config.yaml"
+    path.write_text("name: first\n---\nkey: value\n", encoding=DEFAULT_ENCODING)
+    cache = ConfigurationCache(path=tmp_path / "cache.sqlite")
+    documents = cache.load_documents(path)
+    assert documents == [{"name": "first"}, {"key": "value"}]
+    documents[0]["name"] = "modified"
+    assert cache.load_documents(path)[0]["name"] == "first"
+
+    # a new process finds the documents on disk, without parsing the file.
+    stat = path.stat()
+    path.write_text("name: other\n---\nkey: value\n", encoding=DEFAULT_ENCODING)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert ConfigurationCache(path=tmp_path / "cache.sqlite").load_documents(path)[0]["name"] == "first"
+
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert cache.load_documents(path)[0]["name"] == "other"
+    with pytest.raises(FileNotFoundError):
+        cache.load_documents(tmp_path / "missing.yaml")
+
+
+def test_load_many_validates_configurations_in_order(tmp_path):
+    """Test the configurations are validated and returned in the order of the packages."""
+    cache = ConfigurationCache(path=tmp_path / "cache.sqlite")
+    packages = [write_protocol(tmp_path, f"proto_{index}", PROTOCOL) for index in range(5)]
+    configurations = cache.load_many((PackageType.PROTOCOL, package) for package in packages)
+    assert [configuration.name for configuration in configurations] == [package.name for package in packages]
+    assert configurations[0].directory == packages[0]
+    assert configurations[0].dependencies["protobuf"].version == "<4.25.0,>=4.21.6"
+
+    invalid = write_protocol(tmp_path, "invalid", {key: value for key, value in PROTOCOL.items() if key != "license"})
+    with pytest.raises(AEAValidationError, match="license"):
+        cache.load(PackageType.PROTOCOL, invalid)
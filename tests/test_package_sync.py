@@ -0,0 +1,81 @@
+"""Tests for the incremental package sync."""
+
+import os
+
+from auto_dev.constants import DEFAULT_ENCODING
+from auto_dev.package_sync import plan_sync, sync_packages
+
+
+def write_tree(root, files):
+    """Write the files of a tree, relative to its root."""
+    for name, content in files.items():
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_text(content, encoding=DEFAULT_ENCODING)
+
+
+def read_tree(root):
+    """The content of the files of a tree, relative to its root."""
+    return {
+        os.path.relpath(os.path.join(directory, name), root): (root / directory / name).read_text(
+            encoding=DEFAULT_ENCODING
+        )
+        for directory, _, names in os.walk(root)
+        for name in names
+    }
+
+
+def test_sync_only_touches_differing_files(tmp_path):
+    """Test only the changed files are copied, the stale ones removed and the dry run changes nothing."""
+    source, target = tmp_path / "parent" / "skill", tmp_path / "child" / "skill"
+    write_tree(source, {"same.py": "VALUE = 1\n", "changed.py": "VALUE = 2\n", "new/module.py": "NEW = 1\n"})
+    write_tree(target, {"same.py": "VALUE = 1\n", "changed.py": "VALUE = 1\n", "stale/old.py": "OLD = 1\n"})
+    unchanged_inode = (target / "same.py").stat().st_ino
+
+    plan = plan_sync(source, target)
+    assert (plan.copies, plan.removals, plan.stale_directories) == (
+        ["changed.py", "new/module.py"],
+        ["stale/old.py"],
+        ["stale"],
+    )
+    assert plan.copy_bytes == len("VALUE = 2\n") + len("NEW = 1\n")
+
+    [dry_run] = sync_packages([(source, target)], dry_run=True)
+    assert dry_run.summary == plan.summary == f"2 files to copy ({plan.copy_bytes} bytes), 1 to remove, 1 unchanged"
+    assert "stale/old.py" in read_tree(target)
+
+    sync_packages([(source, target)])
+    assert read_tree(target) == read_tree(source)
+    assert (target / "same.py").stat().st_ino == unchanged_inode
+    assert not plan_sync(source, target).changed
+
+
+def test_sync_hardlinks_into_new_targets(tmp_path):
+    """Test hardlinked files are shared with the source and replaced rather than written through."""
+    source, target = tmp_path / "parent" / "skill", tmp_path / "child" / "skill"
+    write_tree(source, {"module.py": "VALUE = 1\n"})
+
+    sync_packages([(source, target)], hardlink=True)
+    assert (target / "module.py").stat().st_ino == (source / "module.py").stat().st_ino
+
+    (source / "module.py").unlink()
+    write_tree(source, {"module.py": "VALUE = 2\n"})
+    write_tree(tmp_path / "other", {"module.py": "VALUE = 3\n"})
+    sync_packages([(tmp_path / "other", target)])
+    assert (source / "module.py").read_text(encoding=DEFAULT_ENCODING) == "VALUE = 2\n"
+    assert (target / "module.py").read_text(encoding=DEFAULT_ENCODING) == "VALUE = 3\n"
+
+
+def test_sync_mirrors_symlinked_directories_and_removals(tmp_path):
+    """Test a symlinked directory is mirrored as a link, and a package without a source is removed."""
+    source, target = tmp_path / "parent" / "skill", tmp_path / "child" / "skill"
+    write_tree(source, {"module.py": "VALUE = 1\n", "shared/data.py": "DATA = 1\n"})
+    (source / "linked").symlink_to("shared", target_is_directory=True)
+
+    assert plan_sync(source, target).copies == ["linked", "module.py", "shared/data.py"]
+    sync_packages([(source, target)])
+    assert (target / "linked").readlink() == (source / "linked").readlink()
+    assert not plan_sync(source, target).changed
+
+    [removal] = sync_packages([(None, target)])
+    assert removal.removals == ["linked", "module.py", "shared/data.py"]
+    assert not target.exists()
@@ -0,0 +1,69 @@
+"""Tests for the startup import profiler."""
+
+import sys
+import json
+import logging
+import importlib
+
+import pytest
+import rich_click as click
+
+from auto_dev.base import report_startup
+from auto_dev.constants import DEFAULT_ENCODING
+from auto_dev.profiling import ImportProfiler
+
+
+def test_import_profiler_records_new_modules(tmp_path, monkeypatch):
+    """Test the profiler builds a tree of the modules loaded while it was installed."""
+    (tmp_path / "profiled_parent.py").write_text("import profiled_child\n", encoding=DEFAULT_ENCODING)
+    (tmp_path / "profiled_child.py").write_text("VALUE = 1\n", encoding=DEFAULT_ENCODING)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    importlib.invalidate_caches()
+
+    profiler = ImportProfiler.install()
+    try:
+        import json as _json  # noqa: F401, PLC0415
+
+        import profiled_parent  # noqa: F401, PLC0415
+    finally:
+        report = profiler.stop(budget_ms=0.0)
+        sys.modules.pop("profiled_parent", None)
+        sys.modules.pop("profiled_child", None)
+
+    assert ImportProfiler.current is None
+    (parent,) = report.root.children
+    assert parent.name == "profiled_parent"
+    assert [child.name for child in parent.children] == ["profiled_child"]
+    assert not report.within_budget
+
+
+def test_startup_report_writes_json(tmp_path):
+    """Test the report is written as json."""
+    profiler = ImportProfiler.install()
+    report = profiler.stop(budget_ms=10_000.0)
+    output = report.write(tmp_path / "profile.json")
+    data = json.loads(output.read_text(encoding=DEFAULT_ENCODING))
+    assert data["within_budget"]
+    assert data["budget_ms"] == 10_000.0
+    assert data["tree"]["name"] == "<adev>"
+
+
+def test_lazily_loaded_commands_are_profiled_and_the_budget_enforced(tmp_path, monkeypatch):
+    """Test modules loaded with import_module are in the profile, and exceeding the budget fails."""
+    (tmp_path / "profiled_command.py").write_text("VALUE = 1\n", encoding=DEFAULT_ENCODING)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    importlib.invalidate_caches()
+
+    ImportProfiler.install()
+    try:
+        importlib.import_module("profiled_command")
+        with pytest.raises(click.ClickException, match="exceeding the budget"):
+            report_startup(logging.getLogger(__name__), budget_ms=0.0, output=str(tmp_path / "profile.json"))
+    finally:
+        if ImportProfiler.current is not None:
+            ImportProfiler.current.stop()
+        sys.modules.pop("profiled_command", None)
+
+    data = json.loads((tmp_path / "profile.json").read_text(encoding=DEFAULT_ENCODING))
+    assert "profiled_command" in [child["name"] for child in data["tree"]["children"]]
+    assert importlib.import_module.__module__ == "importlib"
@@ -0,0 +1,79 @@
+"""Tests for the reconciliation of the dependency manifests."""
+
+import json
+
+from auto_dev.constants import DEFAULT_ENCODING
+from auto_dev.reconcile import PIPFILE, PYPROJECT, PACKAGES_JSON, Change, Manifests, Reconciler
+
+
+PYPROJECT_CONTENT = """[tool.poetry]
+name = "example"
+
+[tool.poetry.dependencies]
+python = ">=3.9,<3.12"
+open-autonomy = "==0.18.3"
+open-aea = {version = "==1.59.0", extras = ["all"]}
+open-aea-ledger-ethereum = "==1.59.0"
+requests = "2.28.1"
+
+[tool.poetry.group.dev.dependencies]
+open-autonomy = "==0.18.3"
+"""
+PIPFILE_CONTENT = """[packages]
+open-aea-ledger-ethereum = "==1.59.0"
+requests = "==2.28.1"
+
+[dev-packages]
+pytest = "==7.4.0"
+"""
+PACKAGES = {"dev": {"skill/author/alpha/0.1.0": "bafy_dev"}, "third_party": {"protocol/valory/abci/0.1.0": "bafy_old"}}
+
+
+def make_repo(root):
+    """Write a pyproject.toml, Pipfile and packages.json."""
+    (root / PYPROJECT).write_text(PYPROJECT_CONTENT, encoding=DEFAULT_ENCODING)
+    (root / PIPFILE).write_text(PIPFILE_CONTENT, encoding=DEFAULT_ENCODING)
+    (root / "packages").mkdir()
+    (root / PACKAGES_JSON).write_text(json.dumps(PACKAGES, indent=4), encoding=DEFAULT_ENCODING)
+
+
+def test_reconcile_all_manifests_at_once(tmp_path):
+    """Test the changes to every manifest are found in one pass, shown as one diff and written at once."""
+    make_repo(tmp_path)
+    reconciler = Reconciler(Manifests(tmp_path))
+    reconciler.require_poetry("open-autonomy", "==0.18.4")
+    reconciler.require_poetry("open-aea", "==1.60.0", plugins=["open-aea-ledger-ethereum"])
+    reconciler.require_poetry("requests", "2.28.1")
+    reconciler.require_package_hash("protocol/valory/abci/0.1.0", "bafy_new")
+    reconciler.require_package_hash("protocol/valory/missing/0.1.0", "bafy_new")
+
+    changes = reconciler.changes()
+    assert changes == [
+        Change(PYPROJECT, "open-autonomy", "==0.18.3", "==0.18.4"),
+        Change(PYPROJECT, "open-aea", "==1.59.0", "==1.60.0"),
+        Change(PYPROJECT, "open-aea-ledger-ethereum", "==1.59.0", "==1.60.0"),
+        Change(PIPFILE, "open-aea-ledger-ethereum", "==1.59.0", "==1.60.0"),
+        Change(PACKAGES_JSON, "protocol/valory/abci/0.1.0", "bafy_old", "bafy_new"),
+    ]
+    assert reconciler.poetry_add_command(changes) == (
+        "poetry add open-autonomy@==0.18.4 open-aea@==1.60.0 open-aea-ledger-ethereum@==1.60.0"
+    )
+    diff = reconciler.diff()
+    for manifest in (PYPROJECT, PIPFILE, PACKAGES_JSON):
+        assert f"+++ b/{manifest}" in diff
+
+    assert reconciler.write(skip=(PACKAGES_JSON,)) == [PYPROJECT, PIPFILE]
+    pyproject = (tmp_path / PYPROJECT).read_text(encoding=DEFAULT_ENCODING)
+    assert 'open-aea = {version = "==1.60.0", extras = ["all"]}' in pyproject
+    assert pyproject.endswith('[tool.poetry.group.dev.dependencies]\nopen-autonomy = "==0.18.3"\n')
+    assert 'open-aea-ledger-ethereum = "==1.60.0"' in (tmp_path / PIPFILE).read_text(encoding=DEFAULT_ENCODING)
+    assert json.loads((tmp_path / PACKAGES_JSON).read_text(encoding=DEFAULT_ENCODING)) == PACKAGES
+
+    plugins = Reconciler(Manifests(tmp_path))
+    plugins.require_poetry("open-autonomy", "==0.18.5", plugins=["open-aea-test-autonomy"])
+    assert plugins.poetry_add_command() == "poetry add open-autonomy@==0.18.5 open-aea-test-autonomy@==0.18.5"
+
+    reconciled = Reconciler(Manifests(tmp_path))
+    reconciled.require_poetry("open-aea", "==1.60.0", plugins=["open-aea-ledger-ethereum"])
+    assert reconciled.changes() == []
+    assert reconciled.poetry_add_command() is None
@@ -9,14 +9,14 @@ from unittest.mock import Mock, MagicMock, patch
 import yaml
 import pytest
 from aea.cli import cli as aea_cli
-from aea.configurations.base import PublicId
+from aea.configurations.base import PublicId, ProtocolSpecificationParseError
 
 from auto_dev.cli import cli
 from auto_dev.utils import get_logger
 from auto_dev.constants import DEFAULT_ENCODING
 from auto_dev.dao.scaffolder import DAOScaffolder
 from auto_dev.handler.scaffolder import HandlerScaffolder, HandlerScaffoldBuilder
-from auto_dev.protocols.scaffolder import read_protocol
+from auto_dev.protocols.scaffolder import read_protocol, load_protocol_specification
 from auto_dev.handler.openapi_models import (
     Schema,
     OpenAPI,
@@ -106,6 +106,24 @@ def test_scaffold_protocol(cli_runner, dummy_agent_tim, caplog):
     assert original_content in readme_path.read_text(encoding=DEFAULT_ENCODING)
 
 
+def test_read_protocol_validates_every_version_once(tmp_path):
+    """Test a specification is parsed once per version, handed out as copies and validated in process."""
+    content = (Path(__file__).parent / "data" / "dummy_protocol.yaml").read_text(encoding=DEFAULT_ENCODING)
+    path = tmp_path / "dummy_protocol.yaml"
+    path.write_text(content, encoding=DEFAULT_ENCODING)
+    protocol = read_protocol(str(path))
+    protocol.metadata["name"] = "changed"
+    assert read_protocol(str(path)).metadata["name"] == "dummy_protocol"
+    specification = load_protocol_specification(str(path))
+    assert specification.name == "dummy_protocol"
+    assert specification is not load_protocol_specification(str(path))
+    assert not (tmp_path / "protocols").exists()
+
+    path.write_text(content.replace("template: pt:str", "template: pt:unknown"), encoding=DEFAULT_ENCODING)
+    with pytest.raises(ProtocolSpecificationParseError):
+        read_protocol(str(path))
+
+
 @pytest.mark.skip(reason="Needs changes to scaffolder to handle directory structure")
 def test_scaffold_handler(dummy_agent_tim, openapi_test_case):
     """Test scaffold handler."""
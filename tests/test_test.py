@@ -0,0 +1,206 @@
+"""Tests for the parallel package test runner and its result cache."""
+
+import json
+from xml.etree import ElementTree  # noqa: S405
+
+from click.testing import CliRunner
+
+from auto_dev.cli import cli
+from auto_dev.test import (
+    PackageResult,
+    TestDurations,
+    TestResultCache,
+    CoverageCollector,
+    schedule,
+    has_tests,
+    run_tests,
+    merge_junit,
+    select_shard,
+)
+from auto_dev.cache import DiskCache
+from auto_dev.constants import DEFAULT_ENCODING
+
+
+def write_package(root, name, body):
+    """Write a package with a single test module."""
+    package = root / name
+    (package / "tests").mkdir(parents=True)
+    (package / "tests" / f"test_{name}.py").write_text(body, encoding=DEFAULT_ENCODING)
+    return str(package)
+
+
+def test_run_tests_isolates_packages(tmp_path):
+    """Test every package runs in its own process, with its results and JUnit report collected."""
+    module_state = "import sys\n\ndef test_state():\n    assert not hasattr(sys, 'shared')\n    sys.shared = True\n"
+    alpha = write_package(
+        tmp_path, "alpha", module_state + "\n\ndef test_skip():\n    import pytest\n    pytest.skip()\n"
+    )
+    beta = write_package(tmp_path, "beta", module_state)
+    gamma = write_package(tmp_path, "gamma", "def test_fails():\n    assert False\n")
+    junit_dir = tmp_path / "junit"
+    junit_dir.mkdir()
+
+    results = {result.package: result for result in run_tests([alpha, beta, gamma], str(junit_dir), num_processes=2)}
+    assert {package: result.passed for package, result in results.items()} == {alpha: True, beta: True, gamma: False}
+    assert (results[alpha].tests, results[alpha].skipped) == (2, 1)
+    assert results[alpha].summary.startswith("1 passed, 1 skipped")
+    assert results[gamma].failures == 1
+
+    merge_junit(list(results.values()), tmp_path / "report.xml")
+    merged = ElementTree.parse(tmp_path / "report.xml").getroot()  # noqa: S314
+    assert [suite.get("name") for suite in merged] == [alpha, beta, gamma]
+    assert (merged.get("tests"), merged.get("failures")) == ("4", "1")
+
+
+def test_result_cache_invalidates_on_fingerprint(tmp_path, monkeypatch):
+    """Test a package is known to pass until its files, hash or dependencies change."""
+    monkeypatch.chdir(tmp_path)
+    skill = tmp_path / "packages/author/skills/alpha"
+    protocol = tmp_path / "packages/author/protocols/proto"
+    (skill / "tests").mkdir(parents=True)
+    protocol.mkdir(parents=True)
+    (skill / "skill.yaml").write_text("protocols:\n- author/proto:0.1.0\n", encoding=DEFAULT_ENCODING)
+    (skill / "tests" / "test_alpha.py").write_text("VALUE = 1\n", encoding=DEFAULT_ENCODING)
+    (protocol / "protocol.yaml").write_text("name: proto\n", encoding=DEFAULT_ENCODING)
+    package = str(skill)
+
+    def new_cache(package_hash="hash"):
+        disk_cache = DiskCache("tests", path=tmp_path / "cache.sqlite")
+        return TestResultCache({skill: package_hash}, cache=disk_cache)
+
+    new_cache().record({package: True})
+    assert new_cache().filter_unknown([package]) == []
+    assert new_cache("other").filter_unknown([package]) == [package]
+    assert TestResultCache(enabled=False).filter_unknown([package]) == [package]
+
+    (skill / "tests" / "test_alpha.py").write_text("VALUE = 2\n", encoding=DEFAULT_ENCODING)
+    assert new_cache().filter_unknown([package]) == [package]
+    new_cache().record({package: True})
+
+    (protocol / "protocol.yaml").write_text("name: changed\n", encoding=DEFAULT_ENCODING)
+    assert new_cache().filter_unknown([package]) == [package]
+
+
+def test_has_tests_matches_the_pytest_file_patterns(tmp_path):
+    """Test both the `test_*.py` and the `*_test.py` modules pytest collects are found."""
+    package = tmp_path / "package"
+    (package / "tests").mkdir(parents=True)
+    (package / "tests" / "helpers.py").write_text("", encoding=DEFAULT_ENCODING)
+    assert not has_tests(str(package))
+    (package / "tests" / "handlers_test.py").write_text("", encoding=DEFAULT_ENCODING)
+    assert has_tests(str(package))
+
+
+def test_result_cache_only_caches_packages_json_packages(tmp_path):
+    """Test a path outside packages.json is always tested, as its sources may live anywhere."""
+    tests = write_package(tmp_path, "tests", "def test_value():\n    assert True\n")
+    results = TestResultCache(cache=DiskCache("tests", path=tmp_path / "cache.sqlite"))
+    results.record({tests: True})
+    assert results.filter_unknown([tests]) == [tests]
+
+
+def test_schedule_balances_shards_longest_first(tmp_path):
+    """Test the packages are split into balanced shards from their recorded durations."""
+    durations = TestDurations(tmp_path / "durations.json")
+    durations.update(
+        [
+            PackageResult("a", passed=True, duration=8, test_durations={"a::tests::test_a": 8}),
+            PackageResult("b", passed=True, duration=5),
+            PackageResult("c", passed=True, duration=4),
+            PackageResult("d", passed=True, duration=3),
+        ]
+    )
+    durations.save()
+    durations = TestDurations(tmp_path / "durations.json")
+    assert durations.tests == {"a::tests::test_a": 8}
+    # never tested packages are expected to take the median duration.
+    assert durations.estimate("e") == 4.5
+
+    assert schedule(["e", "d", "c", "b", "a"], durations, 2) == [["a", "c"], ["b", "e", "d"]]
+    assert select_shard(["a", "b", "c", "d", "e"], durations, (2, 2)) == ["b", "d", "e"]
+
+
+def test_shards_test_every_package_once(tmp_path, monkeypatch):
+    """Test the shards of a run cover every package exactly once, the shared durations being left as they are."""
+    monkeypatch.chdir(tmp_path)
+    names = ["a", "b", "c", "d"]
+    for name in names:
+        write_package(tmp_path / "packages" / "author" / "skills", name, "def test_passes():\n    pass\n")
+    packages = {f"skill/author/{name}/0.1.0": "bafy" for name in names}
+    (tmp_path / "packages" / "packages.json").write_text(json.dumps({"dev": packages}), encoding=DEFAULT_ENCODING)
+    durations = tmp_path / "durations.json"
+    content = json.dumps({"packages": {"packages/author/skills/a": 8, "packages/author/skills/b": 5}})
+    durations.write_text(content, encoding=DEFAULT_ENCODING)
+
+    runner = CliRunner()
+    assert runner.invoke(cli, ["test", "--shard", "1/2"]).exit_code != 0
+    tested = []
+    for shard in ("1/2", "2/2"):
+        args = ["test", "--no-cache", "--no-coverage-report", "--shard", shard, "--durations", str(durations)]
+        result = runner.invoke(cli, args)
+        assert result.exit_code == 0, result.output
+        tested.extend(line.split(" ")[2] for line in result.output.splitlines() if line.startswith("👌"))
+    assert sorted(tested) == [f"packages/author/skills/{name}" for name in names]
+    assert durations.read_text(encoding=DEFAULT_ENCODING) == content
+
+
+def test_estimate_falls_back_to_the_test_durations(tmp_path):
+    """Test a package without a recorded total is estimated from the durations of its tests."""
+    path = tmp_path / "durations.json"
+    tests = {"a::tests::test_a": 2, "a::tests::test_b": 3, "ab::tests::test_c": 7}
+    path.write_text(json.dumps({"packages": {"c": 1}, "tests": tests}), encoding=DEFAULT_ENCODING)
+    durations = TestDurations(path)
+    assert durations.estimate("a") == 5
+    assert durations.estimate("ab") == 7
+    assert durations.estimate("c") == 1
+    assert durations.estimate("d") == 1
+
+
+def test_coverage_is_combined_with_the_reused_data(tmp_path, monkeypatch):
+    """Test the coverage of every package is kept apart and combined with the data of previous runs."""
+    monkeypatch.chdir(tmp_path)
+    for name in ("alpha", "beta"):
+        (tmp_path / name / "tests").mkdir(parents=True)
+        (tmp_path / name / "__init__.py").touch()
+        (tmp_path / name / "tests" / "__init__.py").touch()
+        (tmp_path / name / "code.py").write_text("def value():\n    return 1\n", encoding=DEFAULT_ENCODING)
+        (tmp_path / name / "tests" / f"test_{name}.py").write_text(
+            f"from {name}.code import value\n\n\ndef test_value():\n    assert value() == 1\n",
+            encoding=DEFAULT_ENCODING,
+        )
+    results = TestResultCache(cache=DiskCache("tests", path=tmp_path / "cache.sqlite"))
+    coverage = CoverageCollector(results, data_dir=tmp_path / "data")
+    (tmp_path / "junit").mkdir()
+
+    assert all(result.passed for result in run_tests(["alpha"], str(tmp_path / "junit"), coverage=coverage))
+    assert coverage.has_data("alpha")
+    assert not coverage.has_data("beta")
+    assert all(result.passed for result in run_tests(["beta"], str(tmp_path / "junit"), coverage=coverage))
+
+    assert coverage.report(["alpha", "beta"], tested=["beta"]) == 100.0
+    report = (tmp_path / "coverage-report.txt").read_text(encoding=DEFAULT_ENCODING)
+    assert "alpha/code.py" in report
+    assert "beta/code.py" in report
+    assert "tests" not in report
+
+
+def test_coverage_of_a_path_measures_the_code_it_tests(tmp_path, monkeypatch):
+    """Test the coverage of a tests directory measures the working directory, not only the tests."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "lib").mkdir()
+    (tmp_path / "lib" / "__init__.py").touch()
+    (tmp_path / "lib" / "code.py").write_text("def value():\n    return 1\n", encoding=DEFAULT_ENCODING)
+    tests = tmp_path / "tests"
+    tests.mkdir()
+    (tests / "__init__.py").touch()
+    (tests / "test_lib.py").write_text(
+        "from lib.code import value\n\n\ndef test_value():\n    assert value() == 1\n", encoding=DEFAULT_ENCODING
+    )
+    results = TestResultCache(cache=DiskCache("tests", path=tmp_path / "cache.sqlite"))
+    coverage = CoverageCollector(results, data_dir=tmp_path / "data")
+    (tmp_path / "junit").mkdir()
+
+    assert coverage.pytest_args("tests") == ["--cov=.", "--cov-report="]
+    assert all(result.passed for result in run_tests(["tests"], str(tmp_path / "junit"), coverage=coverage))
+    assert coverage.report(["tests"], tested=["tests"]) == 100.0
+    assert "lib/code.py" in (tmp_path / "coverage-report.txt").read_text(encoding=DEFAULT_ENCODING)
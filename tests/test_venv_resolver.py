@@ -0,0 +1,47 @@
+"""Tests for the resolution of the project virtualenv."""
+
+import os
+import stat
+
+from auto_dev.constants import DEFAULT_ENCODING
+from auto_dev.venv_resolver import tool_command, find_project_dir
+
+
+def make_executable(path, content):
+    """Write an executable script."""
+    path.write_text(content, encoding=DEFAULT_ENCODING)
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+
+
+def test_find_project_dir(tmp_path):
+    """Test the project is found from a nested directory."""
+    (tmp_path / "pyproject.toml").write_text("", encoding=DEFAULT_ENCODING)
+    nested = tmp_path / "a" / "b"
+    nested.mkdir(parents=True)
+    assert find_project_dir(nested) == tmp_path.resolve()
+
+
+def test_tool_command_uses_the_venv_binary(tmp_path, monkeypatch):
+    """Test poetry is asked for the virtualenv once and its binaries are run directly."""
+    project = tmp_path / "project"
+    project.mkdir()
+    (project / "pyproject.toml").write_text("", encoding=DEFAULT_ENCODING)
+    (project / "poetry.lock").write_text("# lock", encoding=DEFAULT_ENCODING)
+    venv_bin = tmp_path / "venv" / "bin"
+    venv_bin.mkdir(parents=True)
+    make_executable(venv_bin / "ruff", "#!/bin/sh\n")
+    fake_bin = tmp_path / "bin"
+    fake_bin.mkdir()
+    calls = tmp_path / "calls"
+    make_executable(fake_bin / "poetry", f"#!/bin/sh\necho called >> {calls}\necho {venv_bin.parent}\n")
+    monkeypatch.setenv("PATH", f"{fake_bin}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.delenv("VIRTUAL_ENV", raising=False)
+
+    assert tool_command("ruff", "check", cwd=project) == [str(venv_bin / "ruff"), "check"]
+    assert tool_command("ruff", "format", cwd=project) == [str(venv_bin / "ruff"), "format"]
+    assert calls.read_text(encoding=DEFAULT_ENCODING).count("called") == 1
+
+
+def test_tool_command_falls_back_to_poetry_run(tmp_path):
+    """Test `poetry run` is used outside of a poetry project."""
+    assert tool_command("ruff", "check", cwd=tmp_path) == ["poetry", "run", "ruff", "check"]
@@ -0,0 +1,52 @@
+"""Tests for the file watchers."""
+
+import sys
+
+import pytest
+
+from auto_dev.watch import InotifyWatcher, PollingWatcher
+from auto_dev.constants import DEFAULT_ENCODING
+
+
+WATCHERS = [PollingWatcher]
+if sys.platform.startswith("linux"):
+    WATCHERS.append(InotifyWatcher)
+
+
+@pytest.mark.parametrize("watcher_class", WATCHERS)
+def test_watcher_reports_changed_files(watcher_class, tmp_path):
+    """Test modified files and the files of new directories are reported."""
+    existing = tmp_path / "existing.py"
+    existing.write_text("VALUE = 1\n", encoding=DEFAULT_ENCODING)
+    watcher = watcher_class([tmp_path])
+    try:
+        assert watcher.read(timeout=0.1) == set()
+
+        existing.write_text("VALUE = 2\n", encoding=DEFAULT_ENCODING)
+        assert watcher.read(timeout=2) == {str(existing)}
+
+        nested = tmp_path / "nested"
+        nested.mkdir()
+        assert watcher.read(timeout=1) == set()
+        (nested / "new.py").write_text("VALUE = 3\n", encoding=DEFAULT_ENCODING)
+        assert watcher.read(timeout=2) == {str(nested / "new.py")}
+    finally:
+        watcher.close()
+
+
+@pytest.mark.parametrize("watcher_class", WATCHERS)
+def test_watcher_reports_a_changed_file_root(watcher_class, tmp_path):
+    """Test a file root is watched, without reporting the other files of its directory."""
+    watched = tmp_path / "watched.py"
+    other = tmp_path / "other.py"
+    watched.write_text("VALUE = 1\n", encoding=DEFAULT_ENCODING)
+    other.write_text("VALUE = 1\n", encoding=DEFAULT_ENCODING)
+    watcher = watcher_class([watched])
+    try:
+        other.write_text("VALUE = 2\n", encoding=DEFAULT_ENCODING)
+        assert watcher.read(timeout=1) == set()
+
+        watched.write_text("VALUE = 2\n", encoding=DEFAULT_ENCODING)
+        assert watcher.read(timeout=2) == {str(watched)}
+    finally:
+        watcher.close()